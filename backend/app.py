@@ -1,8 +1,22 @@
 # backend/app.py
-from flask import Flask, request, jsonify
-from src.file_classifier import classify_file
-from src.extract_data import extract_data
+from flask import Flask, Response, g, request, jsonify, send_file, url_for
+from src.pipeline import run_pipeline
+from src.batch import expand_batch_uploads, run_batch
+from src.consolidate import (CONSOLIDATION_MAX_RESPONSE_ROWS, consolidate_extractions, consolidation_file,
+                             count_records, write_consolidation)
+from src.history_store import append_snapshot, list_snapshots, query_sku_history
+from src.match_cache import match_cache_stats
+from src.scenarios import register_dataset, run_scenario, dataset_projection_timeline
+from src.profiling import PROFILE_HEADER, should_profile, run_profiled
+from src.memory import estimate_upload_memory
+from src.admission import ADMISSION, estimate_request_cost, sum_request_costs
+from src.deadline import DEADLINE_HEADER, request_deadline
+from src.metrics import REGISTRY, REQUESTS, REQUEST_LATENCY, ERRORS, observe_stage, stage_timer
+from src.csv_engine import read_csv_top_rows, sniff_csv_format
 from src.errors import *
+import logging
+import os
+import time
 from io import BytesIO
 import pandas as pd
 
@@ -11,98 +25,199 @@ app = Flask(__name__)
 # File size limit (20MB)
 MAX_FILE_SIZE = 20 * 1024 * 1024
 
+# Optional SQLite history store; uploads are only recorded when a path is configured
+HISTORY_DB_PATH = os.environ.get("INVENTORY_HISTORY_DB")
+
+# Log level of the backend's diagnostics (DEBUG adds column mappings per sheet)
+LOG_LEVEL = os.environ.get("INVENTORY_LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    started = g.get("request_started")
+    if started is not None:
+        REQUEST_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint)
+
+    # Error responses record their type as they are built (see error_response)
+    error_type = g.get("error_type")
+    if error_type:
+        ERRORS.inc(error_type=error_type)
+    return response
+
+@app.teardown_request
+def release_admission(exc):
+    # Uploads hold their admission until the response is built, whatever the outcome
+    cost = g.pop("admission_cost", None)
+    if cost is not None:
+        ADMISSION.release(cost)
+
+def request_flag(name):
+    # Boolean option given as a query parameter or form field
+    return str(request.args.get(name, request.form.get(name, ''))).lower() in ('1', 'true', 'yes')
+
+def error_response(body, status):
+    """
+    JSON error response; its error_type is counted in the metrics after the request.
+    """
+    g.error_type = body["error_type"]
+    return jsonify(body), status
+
+def admission_rejected_response(e):
+    g.error_type = "server_busy"
+    response = jsonify({
+        "error": str(e),
+        "error_type": "server_busy",
+        "details": e.details,
+        "suggestions": [f"Retry in {e.details['retry_after']} seconds"]
+    })
+    response.headers["Retry-After"] = str(e.details["retry_after"])
+    return response, 429
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
+    # Past the deadline the response carries whatever is finished, marked partial
+    deadline = request_deadline(request.headers.get(DEADLINE_HEADER))
     try:
         # Validate request has file
         if 'file' not in request.files:
-            return jsonify({
+            return error_response({
                 "error": "No file provided",
                 "error_type": "missing_file",
                 "suggestions": ["Please select a file before uploading"]
-            }), 400
+            }, 400)
             
         uploaded_file = request.files['file']
         
         # Validate file name
         if uploaded_file.filename == '':
-            return jsonify({
+            return error_response({
                 "error": "Empty file name",
                 "error_type": "invalid_file",
                 "suggestions": ["Please select a file before uploading"]
-            }), 400
+            }, 400)
             
         # Validate file extension
         if not uploaded_file.filename.endswith(('.xlsx', '.xls', '.csv')):
-            return jsonify({
+            return error_response({
                 "error": "Invalid file type",
                 "error_type": "invalid_file_type",
                 "suggestions": ["Please upload an Excel file (.xlsx, .xls) or CSV file"]
-            }), 400
+            }, 400)
             
-        # Check file size
-        file_bytes = uploaded_file.read()
-        if len(file_bytes) > MAX_FILE_SIZE:
-            return jsonify({
+        is_csv = uploaded_file.filename.endswith('.csv')
+        read_started = time.perf_counter()
+
+        # Every stage reads straight from the spooled upload stream (large uploads are
+        # spooled to disk), so the file isn't also held in memory as bytes
+        upload_stream = uploaded_file.stream
+        upload_stream.seek(0, os.SEEK_END)
+        file_size = upload_stream.tell()
+        upload_stream.seek(0)
+
+        def open_upload():
+            upload_stream.seek(0)
+            return upload_stream
+
+        # Check file size. CSV files are parsed in chunks, but every extracted record is
+        # still returned in one response, so they share the workbook limit.
+        if file_size > MAX_FILE_SIZE:
+            return error_response({
                 "error": "File too large",
                 "error_type": "file_too_large",
                 "suggestions": ["Please upload a file smaller than 10MB", 
                                "Consider splitting large workbooks into smaller ones"]
-            }), 400
+            }, 400)
             
         # Initialize debug logs
         debug_logs = {}
 
+        # Wait for capacity before opening the workbook; the cost is estimated from
+        # the file size and the sheet dimensions in the package
+        memory_estimate = estimate_upload_memory(open_upload(), uploaded_file.filename)
+        cost = estimate_request_cost(memory_estimate)
+        try:
+            waited = ADMISSION.acquire(cost)
+        except AdmissionRejectedError as e:
+            return admission_rejected_response(e)
+        g.admission_cost = cost
+        debug_logs['admission'] = {"waited_seconds": round(waited, 3), "cost": cost}
+
         # Verify file integrity
         try:
-            if uploaded_file.filename.endswith('.csv'):
+            if is_csv:
                 # Handle CSV files
-                df = pd.read_csv(BytesIO(file_bytes), nrows=5)
+                csv_stream = open_upload()
+                df_top, _ = read_csv_top_rows(csv_stream, sniff_csv_format(csv_stream), max_rows=5)
+                if df_top.empty:
+                    raise EmptyFileError("CSV file has no rows")
                 debug_logs['file_type'] = 'csv'
             else:
                 # Handle Excel files
-                xl = pd.ExcelFile(BytesIO(file_bytes))
-                sheet_names = xl.sheet_names
+                with pd.ExcelFile(open_upload()) as xl:
+                    sheet_names = xl.sheet_names
                 if not sheet_names:
                     raise EmptyFileError("Excel file has no sheets")
                 debug_logs['sheets'] = sheet_names
                 debug_logs['file_type'] = 'excel'
         except EmptyFileError as e:
-            return jsonify({
+            return error_response({
                 "error": str(e),
                 "error_type": "empty_file",
                 "suggestions": ["Please upload a file with data sheets"]
-            }), 400
+            }, 400)
         except Exception as e:
             raise InvalidFileTypeError(f"Could not read file: {str(e)}")
+        observe_stage("read", time.perf_counter() - read_started)
 
-        # Classify the file and extract data
+        # Classify the file and extract data; the planning state is only kept (for
+        # scenarios and projection timelines) when the client asks for it
+        planning_state = {} if request_flag('keep_dataset') else None
+        classification_result = None
         try:
-            classification_result = classify_file(BytesIO(file_bytes))
+            run = lambda: run_pipeline(
+                open_upload, filename=uploaded_file.filename, debug_logs=debug_logs,
+                planning_state=planning_state, memory_estimate=memory_estimate, deadline=deadline
+            )
+            # Opt-in profiling; the profile is saved and summarized in debug_logs['profile']
+            if should_profile(request.headers.get(PROFILE_HEADER)):
+                (classification_result, extracted_data, has_data), debug_logs['profile'] = run_profiled(
+                    run, request_id=request.headers.get("X-Request-ID")
+                )
+            else:
+                classification_result, extracted_data, has_data = run()
             business_type = classification_result.get("business_type", "generic")
-            
-            # Pass the detected business type into the extraction function
-            extracted_data = extract_data(BytesIO(file_bytes), business_type=business_type)
-            
-            # Check if we have any successful extractions
-            has_data = any(len(extracted_data.get(category, [])) > 0 
-                          for category in ['inventory_on_hand', 'sales_history', 
-                                          'purchase_orders', 'item_master'])
-            
-            if not has_data and classification_result.get("is_inventory_planning", False):
-                debug_logs['extraction_warning'] = "File classified as inventory planning but no data extracted"
+
+            # Record this upload in the history store (never fails the upload)
+            if HISTORY_DB_PATH and has_data:
+                try:
+                    debug_logs['history_snapshot'] = append_snapshot(
+                        HISTORY_DB_PATH, extracted_data,
+                        source=uploaded_file.filename, business_type=business_type
+                    )
+                except HistoryStoreError as e:
+                    debug_logs['history_error'] = str(e)
                 
         except FileReadError as e:
-            return jsonify({
+            return error_response({
                 "error": str(e),
                 "error_type": "file_read_error",
                 "details": e.details,
                 "suggestions": ["Check if the file is password protected", 
                                "Ensure the file is not corrupted"]
-            }), 400
+            }, 400)
         except DataExtractionError as e:
             # Return partial results with error info
-            return jsonify({
+            return error_response({
                 "classification": classification_result,
                 "extracted_data": {},
                 "error": str(e),
@@ -110,44 +225,250 @@ def upload_file():
                 "details": e.details,
                 "suggestions": ["Try simplifying the workbook structure", 
                                "Ensure data is in a tabular format"]
-            }), 200
+            }, 200)
         except Exception as e:
             raise DataExtractionError(f"Unexpected error during processing: {str(e)}")
 
+        debug_logs['match_cache'] = match_cache_stats()
+
+        # Keep the planning state so what-if scenarios can run without a re-upload
+        dataset_id = register_dataset(extracted_data, planning_state) if planning_state is not None else None
+
         # Return success response
-        return jsonify({
-            "classification": classification_result,
-            "extracted_data": extracted_data,
-            "debug_logs": debug_logs
-        })
+        with stage_timer("serialization"):
+            response = jsonify({
+                "classification": classification_result,
+                "extracted_data": extracted_data,
+                "dataset_id": dataset_id,
+                "partial": bool(extracted_data.get("partial")),
+                "skipped_sheets": extracted_data.get("skipped_sheets", []),
+                "debug_logs": debug_logs
+            })
+        return response
         
     except InvalidFileTypeError as e:
-        return jsonify({
+        return error_response({
             "error": str(e),
             "error_type": "invalid_file_type",
             "suggestions": ["Make sure the file is a valid Excel or CSV file",
                            "Try resaving the file in a different Excel format"]
-        }), 400
+        }, 400)
     except FileSizeLimitError as e:
-        return jsonify({
+        return error_response({
             "error": str(e),
             "error_type": "file_too_large",
             "suggestions": ["Please upload a file smaller than 10MB"]
-        }), 400
+        }, 400)
     except DataExtractionError as e:
-        return jsonify({
+        return error_response({
             "error": str(e),
             "error_type": "extraction_error",
             "details": e.details if hasattr(e, 'details') else {},
             "suggestions": ["Check the file format", "Ensure data is in a tabular format"]
-        }), 500
+        }, 500)
     except Exception as e:
         # Catch-all for unexpected errors
-        return jsonify({
+        return error_response({
             "error": f"An unexpected error occurred: {str(e)}",
             "error_type": "unexpected_error",
             "suggestions": ["Try a different file", "Contact support if the problem persists"]
-        }), 500
+        }, 500)
+
+@app.route('/api/upload/batch', methods=['POST'])
+def upload_batch():
+    # Past the deadline, files not yet started are returned as skipped
+    deadline = request_deadline(request.headers.get(DEADLINE_HEADER))
+
+    # Accept several files under 'files' (or 'file'); zip archives are unpacked
+    uploads = request.files.getlist('files') + request.files.getlist('file')
+    uploads = [f for f in uploads if f.filename]
+    if not uploads:
+        return error_response({
+            "error": "No files provided",
+            "error_type": "missing_file",
+            "suggestions": ["Please select one or more files or a zip archive"]
+        }, 400)
+
+    try:
+        concurrency = int(request.args.get('concurrency', request.form.get('concurrency', 0))) or None
+    except ValueError:
+        concurrency = None
+
+    try:
+        files, skipped = expand_batch_uploads(
+            [(f.filename, f.read()) for f in uploads], MAX_FILE_SIZE
+        )
+    except InvalidFileTypeError as e:
+        return error_response({
+            "error": str(e),
+            "error_type": "invalid_file_type",
+            "suggestions": ["Make sure zip archives are valid and contain Excel or CSV files"]
+        }, 400)
+    except FileSizeLimitError as e:
+        return error_response({
+            "error": str(e),
+            "error_type": "file_too_large",
+            "details": e.details,
+            "suggestions": ["Split the batch into smaller uploads"]
+        }, 400)
+
+    if not files:
+        return error_response({
+            "error": "No supported files in batch",
+            "error_type": "invalid_file_type",
+            "skipped": skipped,
+            "suggestions": ["Please upload Excel files (.xlsx, .xls) or CSV files"]
+        }, 400)
+
+    # The batch is admitted as a whole, at the summed cost of its files
+    cost = sum_request_costs([estimate_request_cost(estimate_upload_memory(BytesIO(data), name))
+                              for name, data in files])
+    try:
+        waited = ADMISSION.acquire(cost)
+    except AdmissionRejectedError as e:
+        return admission_rejected_response(e)
+    g.admission_cost = cost
+
+    results, timing_report = run_batch(files, concurrency=concurrency, deadline=deadline)
+    timing_report["admission"] = {"waited_seconds": round(waited, 3), "cost": cost}
+
+    # Record each file in the history store (never fails the batch)
+    if HISTORY_DB_PATH:
+        for result in results:
+            if not result.get("has_data"):
+                continue
+            try:
+                result["debug_logs"]['history_snapshot'] = append_snapshot(
+                    HISTORY_DB_PATH, result["extracted_data"], source=result["filename"],
+                    business_type=result["classification"].get("business_type")
+                )
+            except HistoryStoreError as e:
+                result["debug_logs"]['history_error'] = str(e)
+
+    response = {
+        "results": results,
+        "skipped": skipped,
+        "partial": any(r.get("error_type") == "deadline_exceeded" or r.get("extracted_data", {}).get("partial")
+                       for r in results),
+        "timing": timing_report
+    }
+
+    # Optionally merge all files into one dataset per category
+    if request_flag('consolidate'):
+        sources = [(r["filename"], r["extracted_data"]) for r in results if r.get("has_data")]
+        if count_records(sources) <= CONSOLIDATION_MAX_RESPONSE_ROWS:
+            response["consolidated_data"], response["consolidation"] = consolidate_extractions(sources)
+        else:
+            # Too large to return inline: stream to CSV files and link them instead
+            consolidation_id, response["consolidated_data"], stats = write_consolidation(sources)
+            for category, category_stats in stats.items():
+                category_stats["download_url"] = url_for(
+                    'consolidation_download', consolidation_id=consolidation_id, category=category)
+            response["consolidation_id"], response["consolidation"] = consolidation_id, stats
+
+    return jsonify(response)
+
+@app.route('/api/consolidations/<consolidation_id>/<category>.csv', methods=['GET'])
+def consolidation_download(consolidation_id, category):
+    path = consolidation_file(consolidation_id, category)
+    if path is None:
+        return error_response({
+            "error": "Consolidated file not found",
+            "error_type": "consolidation_not_found",
+            "suggestions": ["Consolidated files expire after an hour; run the batch upload again"]
+        }, 404)
+    return send_file(path, mimetype="text/csv", as_attachment=True, download_name=f"{category}.csv")
+
+@app.route('/api/datasets/<dataset_id>/scenarios', methods=['POST'])
+def dataset_scenario(dataset_id):
+    # Overrides are given as {"overrides": [...]} or as a single override object
+    body = request.get_json(silent=True) or {}
+    overrides = body.get("overrides", body) if isinstance(body, dict) else body
+
+    try:
+        result = run_scenario(dataset_id, overrides)
+    except ScenarioError as e:
+        return error_response({
+            "error": str(e),
+            "error_type": "invalid_scenario",
+            "details": e.details,
+            "suggestions": ['Use overrides like {"type": "demand", "percent": 15, "category": "Rings"}',
+                            'or {"type": "lead_time", "days": 14, "vendor": "Acme"}']
+        }, 400)
+
+    if result is None:
+        return error_response({
+            "error": "Dataset not found",
+            "error_type": "dataset_not_found",
+            "suggestions": ["Upload the file again with keep_dataset=1; cached datasets expire when the cache is full"]
+        }, 404)
+    return jsonify(result)
+
+@app.route('/api/datasets/<dataset_id>/projection', methods=['GET'])
+def dataset_projection(dataset_id):
+    # Upload responses only carry projection summaries; timelines are fetched per SKU
+    try:
+        result = dataset_projection_timeline(dataset_id, request.args.getlist('sku'))
+    except ScenarioError as e:
+        return error_response({
+            "error": str(e),
+            "error_type": "invalid_projection_request",
+            "details": e.details,
+            "suggestions": ["Pass SKUs as query parameters, e.g. ?sku=A100&sku=B200"]
+        }, 400)
+
+    if result is None:
+        return error_response({
+            "error": "Dataset not found",
+            "error_type": "dataset_not_found",
+            "suggestions": ["Upload the file again with keep_dataset=1; cached datasets expire when the cache is full"]
+        }, 404)
+    return jsonify(result)
+
+@app.route('/api/history/snapshots', methods=['GET'])
+def history_snapshots():
+    if not HISTORY_DB_PATH:
+        return error_response({
+            "error": "History store is not enabled",
+            "error_type": "history_disabled",
+            "suggestions": ["Set INVENTORY_HISTORY_DB to enable upload history"]
+        }, 404)
+
+    try:
+        return jsonify({"snapshots": list_snapshots(HISTORY_DB_PATH)})
+    except HistoryStoreError as e:
+        return error_response({
+            "error": str(e),
+            "error_type": "history_error",
+            "details": e.details
+        }, 500)
+
+@app.route('/api/history/sku/<path:sku>', methods=['GET'])
+def history_sku(sku):
+    if not HISTORY_DB_PATH:
+        return error_response({
+            "error": "History store is not enabled",
+            "error_type": "history_disabled",
+            "suggestions": ["Set INVENTORY_HISTORY_DB to enable upload history"]
+        }, 404)
+
+    category = request.args.get('category', 'inventory_on_hand')
+    location = request.args.get('location')
+    try:
+        series = query_sku_history(HISTORY_DB_PATH, sku, category=category, location=location)
+    except HistoryStoreError as e:
+        return error_response({
+            "error": str(e),
+            "error_type": "history_error",
+            "details": e.details
+        }, 400)
+
+    return jsonify({
+        "sku": sku,
+        "category": category,
+        "location": location,
+        "series": series
+    })
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,385 @@
+"""
+Concurrent load test of /api/upload against locally started app workers.
+
+    python -m benchmarks.load_test run --workers 2 --concurrency 8 --rate 4 \
+        --requests 200 --output load.json
+    python -m benchmarks.load_test compare baseline.json load.json
+
+Each worker is a separate single-threaded app process on its own port (from
+--base-port up, or picked by the OS with --base-port 0); requests are spread over
+them round-robin. With --rate, arrivals are open-loop (Poisson at
+that rate, at most --concurrency in flight) and latency is measured from the
+scheduled arrival, so queueing behind slow requests is counted. Without it every
+client sends its next request as soon as the last one returns.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.workbook_generator import generate_corpus
+
+# Where workers listen by default: LOAD_TEST_BASE_PORT, LOAD_TEST_BASE_PORT + 1, ...
+# A base port of 0 lets the OS pick free ports instead
+LOAD_TEST_HOST = "127.0.0.1"
+LOAD_TEST_BASE_PORT = 5400
+
+# How long to wait for a worker to start answering, and for one upload
+WORKER_STARTUP_TIMEOUT_SECONDS = 60
+REQUEST_TIMEOUT_SECONDS = 300
+
+# Generated corpus used when no --corpus directory is given
+DEFAULT_CORPUS_SIZE = 12
+DEFAULT_CORPUS_ROWS = 2000
+
+# Latency percentiles in the report
+LOAD_TEST_PERCENTILES = [50, 90, 99]
+
+# Worker memory is sampled this often (peak RSS also comes from the kernel where available)
+MEMORY_SAMPLE_INTERVAL_SECONDS = 0.25
+
+# compare flags a regression when latency or peak memory grows, or throughput
+# drops, by more than this share, or when the error rate rises by more than
+# LOAD_TEST_ERROR_RATE_TOLERANCE
+DEFAULT_REGRESSION_THRESHOLD = 0.2
+LOAD_TEST_ERROR_RATE_TOLERANCE = 0.01
+
+def serve(port, host=LOAD_TEST_HOST):
+    """
+    Run one app worker without the reloader or debugger.
+    """
+    from app import app
+    app.run(host=host, port=port, debug=False, threaded=False, use_reloader=False)
+
+def _port_is_free(port, host=LOAD_TEST_HOST):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind((host, port))
+        except OSError:
+            return False
+    return True
+
+def worker_ports(count, base_port=LOAD_TEST_BASE_PORT, host=LOAD_TEST_HOST):
+    """
+    Ports for count workers: base_port, base_port + 1, ... after checking none is
+    taken, or free ports picked by the OS when base_port is 0.
+    """
+    if base_port == 0:
+        sockets = [socket.socket(socket.AF_INET, socket.SOCK_STREAM) for _ in range(count)]
+        try:
+            # Hold every socket until all are bound so the OS hands out distinct ports
+            for sock in sockets:
+                sock.bind((host, 0))
+            return [sock.getsockname()[1] for sock in sockets]
+        finally:
+            for sock in sockets:
+                sock.close()
+
+    ports = list(range(base_port, base_port + count))
+    busy = [port for port in ports if not _port_is_free(port, host)]
+    if busy:
+        raise RuntimeError(f"Port(s) {', '.join(map(str, busy))} already in use; "
+                           "pass another --base-port, or --base-port 0 to pick free ports")
+    return ports
+
+def _memory_kb(pid, field):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _rss_kb(pid):
+    rss = _memory_kb(pid, "VmRSS")
+    if rss is not None:
+        return rss
+    try:
+        output = subprocess.run(["ps", "-o", "rss=", "-p", str(pid)], capture_output=True, text=True)
+        return int(output.stdout.strip() or 0) or None
+    except (OSError, ValueError):
+        return None
+
+class Worker:
+    """
+    One app process: started on a port, polled until it answers, watched for memory.
+    """
+    def __init__(self, port, env):
+        self.port = port
+        self.peak_rss_kb = 0
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.load_test", "serve", "--port", str(port)],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+    def wait_until_ready(self, timeout=WORKER_STARTUP_TIMEOUT_SECONDS):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Worker on port {self.port} exited with code {self.process.returncode}")
+            try:
+                connection = http.client.HTTPConnection(LOAD_TEST_HOST, self.port, timeout=2)
+                connection.request("GET", "/metrics")
+                if connection.getresponse().status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"Worker on port {self.port} did not start within {timeout}s")
+
+    def sample_memory(self):
+        rss = _rss_kb(self.process.pid)
+        if rss:
+            self.peak_rss_kb = max(self.peak_rss_kb, rss)
+
+    def peak_memory_mb(self):
+        # VmHWM is the kernel's own high-water mark, so short spikes between samples count
+        peak = max(self.peak_rss_kb, _memory_kb(self.process.pid, "VmHWM") or 0)
+        return round(peak / 1024, 1) if peak else None
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+def _multipart_body(filename, content):
+    boundary = uuid.uuid4().hex
+    head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+            "Content-Type: application/octet-stream\r\n\r\n").encode()
+    return head + content + f"\r\n--{boundary}--\r\n".encode(), f"multipart/form-data; boundary={boundary}"
+
+def send_upload(port, filename, content):
+    """
+    POST one workbook to /api/upload. Returns (status, error_type); status is None
+    when the request failed before a response arrived.
+    """
+    body, content_type = _multipart_body(filename, content)
+    connection = http.client.HTTPConnection(LOAD_TEST_HOST, port, timeout=REQUEST_TIMEOUT_SECONDS)
+    try:
+        connection.request("POST", "/api/upload", body=body, headers={"Content-Type": content_type})
+        response = connection.getresponse()
+        payload = response.read()
+    except OSError as e:
+        return None, type(e).__name__
+    finally:
+        connection.close()
+    error_type = None
+    if response.status >= 400:
+        try:
+            error_type = json.loads(payload).get("error_type")
+        except (ValueError, AttributeError):
+            pass
+        error_type = error_type or f"http_{response.status}"
+    return response.status, error_type
+
+def load_corpus(directory):
+    files = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith((".xlsx", ".xls", ".csv")):
+            with open(os.path.join(directory, name), "rb") as f:
+                files.append((name, f.read()))
+    if not files:
+        raise ValueError(f"No workbooks found in {directory}")
+    return files
+
+def _arrival_offsets(count, rate, seed):
+    if not rate:
+        return None
+    rng = random.Random(seed)
+    offsets, t = [], 0.0
+    for _ in range(count):
+        offsets.append(t)
+        t += rng.expovariate(rate)
+    return offsets
+
+def summarize(samples, elapsed):
+    """
+    Latency percentiles, throughput and error counts for a list of
+    (latency seconds, status, error_type) samples.
+    """
+    latencies = np.array([s[0] for s in samples]) if samples else np.zeros(0)
+    ok = [s for s in samples if s[1] is not None and s[1] < 400]
+    errors = {}
+    for _, status, error_type in samples:
+        if error_type:
+            errors[error_type] = errors.get(error_type, 0) + 1
+    summary = {
+        "requests": len(samples),
+        "succeeded": len(ok),
+        "error_rate": round(1 - len(ok) / len(samples), 4) if samples else 0.0,
+        "errors": errors,
+        "throughput_rps": round(len(ok) / elapsed, 3) if elapsed > 0 else 0.0,
+        "latency": None
+    }
+    if len(latencies):
+        summary["latency"] = {f"p{p}": round(float(np.percentile(latencies, p)), 4) for p in LOAD_TEST_PERCENTILES}
+        summary["latency"].update({"mean": round(float(latencies.mean()), 4), "max": round(float(latencies.max()), 4)})
+    return summary
+
+def run_load_test(corpus, workers=2, concurrency=4, rate=None, requests=None, seed=0, env=None,
+                  base_port=LOAD_TEST_BASE_PORT):
+    """
+    Start the workers, replay the corpus (cycled up to `requests` uploads) and
+    return the JSON-ready report.
+    """
+    requests = requests or len(corpus)
+    plan_dir = tempfile.mkdtemp(prefix="load_test_plans_")
+    worker_env = dict(os.environ if env is None else env)
+    worker_env.setdefault("EXTRACTION_PLAN_DIR", plan_dir)
+    worker_env.pop("INVENTORY_HISTORY_DB", None)
+
+    pool = [Worker(port, worker_env) for port in worker_ports(workers, base_port)]
+    stop_sampling = threading.Event()
+    try:
+        for worker in pool:
+            worker.wait_until_ready()
+
+        def sample_memory():
+            while not stop_sampling.wait(MEMORY_SAMPLE_INTERVAL_SECONDS):
+                for worker in pool:
+                    worker.sample_memory()
+        sampler = threading.Thread(target=sample_memory, daemon=True)
+        sampler.start()
+
+        offsets = _arrival_offsets(requests, rate, seed)
+        samples = [None] * requests
+        started = time.perf_counter()
+
+        def upload(i):
+            name, content = corpus[i % len(corpus)]
+            scheduled = started + offsets[i] if offsets else None
+            if scheduled is not None:
+                time.sleep(max(0.0, scheduled - time.perf_counter()))
+            sent = time.perf_counter()
+            status, error_type = send_upload(pool[i % len(pool)].port, name, content)
+            samples[i] = (time.perf_counter() - (scheduled or sent), status, error_type)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(upload, range(requests)))
+        elapsed = time.perf_counter() - started
+        stop_sampling.set()
+        sampler.join()
+
+        report = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {"workers": workers, "concurrency": concurrency, "rate": rate, "requests": requests,
+                       "corpus_files": len(corpus), "corpus_bytes": sum(len(c) for _, c in corpus)},
+            "elapsed_seconds": round(elapsed, 3),
+            "summary": summarize(samples, elapsed),
+            "workers": [{"port": w.port, "peak_memory_mb": w.peak_memory_mb()} for w in pool]
+        }
+        peaks = [w["peak_memory_mb"] for w in report["workers"] if w["peak_memory_mb"]]
+        report["summary"]["peak_worker_memory_mb"] = max(peaks) if peaks else None
+        return report
+    finally:
+        stop_sampling.set()
+        for worker in pool:
+            worker.stop()
+        shutil.rmtree(plan_dir, ignore_errors=True)
+
+def compare_reports(baseline, current, threshold=DEFAULT_REGRESSION_THRESHOLD):
+    """
+    Compare two load test summaries. Returns (metric, baseline, current, regression) rows.
+    """
+    before, after = baseline["summary"], current["summary"]
+    rows = []
+    for p in LOAD_TEST_PERCENTILES:
+        key = f"p{p}"
+        old = (before.get("latency") or {}).get(key)
+        new = (after.get("latency") or {}).get(key)
+        if old is not None and new is not None:
+            rows.append((f"latency_{key}", old, new, new > old * (1 + threshold)))
+    rows.append(("throughput_rps", before["throughput_rps"], after["throughput_rps"],
+                 after["throughput_rps"] < before["throughput_rps"] * (1 - threshold)))
+    rows.append(("error_rate", before["error_rate"], after["error_rate"],
+                 after["error_rate"] > before["error_rate"] + LOAD_TEST_ERROR_RATE_TOLERANCE))
+    old, new = before.get("peak_worker_memory_mb"), after.get("peak_worker_memory_mb")
+    if old and new:
+        rows.append(("peak_worker_memory_mb", old, new, new > old * (1 + threshold)))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /api/upload")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Start workers, replay a corpus and write a JSON report")
+    run.add_argument("--corpus", help="Directory of workbooks (generated when omitted)")
+    run.add_argument("--corpus-size", type=int, default=DEFAULT_CORPUS_SIZE)
+    run.add_argument("--rows", type=int, default=DEFAULT_CORPUS_ROWS, help="Rows per sheet of generated workbooks")
+    run.add_argument("--workers", type=int, default=2)
+    run.add_argument("--concurrency", type=int, default=4, help="Most requests in flight at once")
+    run.add_argument("--rate", type=float, help="Open-loop arrivals per second (closed loop when omitted)")
+    run.add_argument("--requests", type=int, help="Uploads to send (default: one per corpus file)")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--base-port", type=int, default=LOAD_TEST_BASE_PORT,
+                     help="First worker port (0 picks free ports; the chosen ports are in the report)")
+    run.add_argument("--output", default="load_test_results.json")
+
+    compare = commands.add_parser("compare", help="Flag regressions between two reports")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD)
+
+    worker = commands.add_parser("serve", help=argparse.SUPPRESS)
+    worker.add_argument("--port", type=int, required=True)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.port)
+        return 0
+
+    if args.command == "run":
+        corpus_dir = args.corpus
+        generated = None
+        if not corpus_dir:
+            generated = corpus_dir = tempfile.mkdtemp(prefix="load_test_corpus_")
+            generate_corpus(corpus_dir, args.corpus_size, seed=args.seed, rows=args.rows)
+        try:
+            corpus = load_corpus(corpus_dir)
+        finally:
+            if generated:
+                shutil.rmtree(generated, ignore_errors=True)
+        report = run_load_test(corpus, args.workers, args.concurrency, args.rate, args.requests, args.seed,
+                               base_port=args.base_port)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        summary = report["summary"]
+        print(json.dumps(summary, indent=2))
+        print(f"Workers listened on port(s) {', '.join(str(w['port']) for w in report['workers'])}")
+        print(f"Wrote {args.output}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare_reports(baseline, current, args.threshold)
+    for metric, old, new, regression in rows:
+        print(f"{metric:<24} {old:>12} -> {new:>12}  {'REGRESSION' if regression else ''}")
+    regressions = [r for r in rows if r[3]]
+    print(f"{len(regressions)} regression(s) (threshold {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
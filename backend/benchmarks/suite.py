@@ -0,0 +1,236 @@
+"""
+Micro-benchmarks of the extraction hot paths on synthetic workbooks.
+
+    python -m benchmarks.suite run --tiers small,medium --output results.json
+    python -m benchmarks.suite compare baseline.json results.json --threshold 0.2
+
+Every repeat starts cold: the match and sheet result caches are cleared and
+extraction plans are written to a scratch directory that is emptied between runs.
+Progress output and warnings from the extractor are suppressed while timing.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+
+from benchmarks.workbook_generator import generate_workbook
+from src import extraction_plans
+from src.extract_data import (
+    EXTRACTION_SCHEMAS, HEADER_SCAN_ROWS, SHEET_RESULT_CACHE, FIELD_MAPPINGS, clean_extracted_data,
+    detect_column_data_types, discover_sheet_plan, extract_data, fuzzy_match, get_field_mappings,
+    identify_header_row, normalize_pivot_table
+)
+from src.file_classifier import classify_file
+from src.match_cache import MATCH_CACHE
+
+# Workbook shapes per size tier
+TIERS = {
+    "small": {"rows": 200, "sheets": 4, "extra_columns": 2},
+    "medium": {"rows": 5000, "sheets": 6, "extra_columns": 4},
+    "large": {"rows": 50000, "sheets": 8, "extra_columns": 6}
+}
+DEFAULT_TIERS = ["small", "medium"]
+
+# Layout every benchmark workbook uses, so tiers differ only in size
+BENCHMARK_LAYOUT = {"business_type": "retail", "pivot": True, "banner_rows": 2, "messy_dates": True, "seed": 7}
+
+# Timed runs per benchmark; the median is compared
+DEFAULT_REPEAT = 3
+
+# A benchmark regresses when its median grows by more than the threshold share
+# and by more than the minimum delta (so sub-millisecond noise isn't flagged)
+DEFAULT_REGRESSION_THRESHOLD = 0.2
+REGRESSION_MIN_DELTA_SECONDS = 0.005
+
+@contextlib.contextmanager
+def _cold_state(plan_dir):
+    """
+    Clear the process caches and the scratch plan directory, and silence the
+    extractor's progress output for the duration of a timed run.
+    """
+    MATCH_CACHE.clear()
+    SHEET_RESULT_CACHE.clear()
+    shutil.rmtree(plan_dir, ignore_errors=True)
+    os.makedirs(plan_dir, exist_ok=True)
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+def prepare_inputs(workbook, business_type, plan_dir):
+    """
+    Parse a workbook once and collect the per-sheet inputs of the function benchmarks:
+    raw top rows, discovery plans, loaded frames and pivot tables.
+    """
+    field_mappings = get_field_mappings(business_type)
+    xl = pd.ExcelFile(BytesIO(workbook))
+    sheets = []
+    with _cold_state(plan_dir):
+        for sheet in xl.sheet_names:
+            plan, df = discover_sheet_plan(xl, sheet, business_type, field_mappings)
+            if not plan or not plan.get("category") or df is None:
+                continue
+            schema = EXTRACTION_SCHEMAS[plan["category"]]
+            sheets.append({
+                "name": sheet,
+                "plan": plan,
+                "schema": schema,
+                "required_fields": [f for f, s in schema.items() if s["required"]],
+                "top": xl.parse(sheet, header=None, nrows=HEADER_SCAN_ROWS),
+                "frame": df,
+                "raw": xl.parse(sheet, header=plan["header_row"]) if plan["is_pivot"] else None
+            })
+    headers = [str(c) for s in sheets for c in s["plan"]["columns"]]
+    return {"business_type": business_type, "field_mappings": field_mappings, "sheets": sheets, "headers": headers}
+
+def benchmark_functions(workbook, inputs):
+    """
+    Name -> zero-argument callable for each benchmarked function.
+    """
+    sheets = inputs["sheets"]
+    field_mappings = inputs["field_mappings"]
+    candidate_lists = list(FIELD_MAPPINGS["generic"].values())
+    return {
+        "fuzzy_match": lambda: [fuzzy_match(h, c) for h in inputs["headers"] for c in candidate_lists],
+        "identify_header_row": lambda: [identify_header_row(s["top"], s["required_fields"], field_mappings)
+                                        for s in sheets],
+        "detect_column_data_types": lambda: [detect_column_data_types(s["frame"]) for s in sheets],
+        "clean_extracted_data": lambda: [clean_extracted_data(s["frame"], s["plan"]["field_map"], s["schema"])
+                                         for s in sheets],
+        "normalize_pivot_table": lambda: [normalize_pivot_table(s["raw"], s["plan"]["pivot_structure"])
+                                          for s in sheets if s["raw"] is not None],
+        "classify_file": lambda: classify_file(BytesIO(workbook), "benchmark.xlsx"),
+        "extract_data": lambda: extract_data(BytesIO(workbook), inputs["business_type"], filename="benchmark.xlsx")
+    }
+
+def time_function(func, repeat, plan_dir):
+    timings = []
+    for _ in range(repeat):
+        with _cold_state(plan_dir):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    return {
+        "repeat": repeat,
+        "min": round(min(timings), 6),
+        "median": round(statistics.median(timings), 6),
+        "mean": round(statistics.mean(timings), 6)
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(tiers=DEFAULT_TIERS, repeat=DEFAULT_REPEAT, only=None):
+    """
+    Run every benchmark (or those named in only) at each tier. Returns a JSON-ready
+    report whose results are keyed "<tier>/<function>".
+    """
+    plan_dir = tempfile.mkdtemp(prefix="benchmark_plans_")
+    original_plan_dir = extraction_plans.EXTRACTION_PLAN_DIR
+    extraction_plans.EXTRACTION_PLAN_DIR = plan_dir
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "tiers": {tier: TIERS[tier] for tier in tiers},
+        "results": {}
+    }
+    try:
+        for tier in tiers:
+            shape = TIERS[tier]
+            workbook = generate_workbook(**shape, **BENCHMARK_LAYOUT)
+            inputs = prepare_inputs(workbook, BENCHMARK_LAYOUT["business_type"], plan_dir)
+            print(f"[{tier}] {len(workbook)} bytes, {len(inputs['sheets'])} sheets")
+            for name, func in benchmark_functions(workbook, inputs).items():
+                if only and name not in only:
+                    continue
+                result = time_function(func, repeat, plan_dir)
+                report["results"][f"{tier}/{name}"] = result
+                print(f"  {name:<26} median {result['median'] * 1000:10.2f} ms  min {result['min'] * 1000:10.2f} ms")
+    finally:
+        extraction_plans.EXTRACTION_PLAN_DIR = original_plan_dir
+        shutil.rmtree(plan_dir, ignore_errors=True)
+    return report
+
+def compare_reports(baseline, current, threshold=DEFAULT_REGRESSION_THRESHOLD, min_delta=REGRESSION_MIN_DELTA_SECONDS):
+    """
+    Compare median timings of two reports. Returns one row per benchmark found in
+    both, with the ratio current / baseline and whether it counts as a regression.
+    """
+    rows = []
+    for key, result in current["results"].items():
+        previous = baseline["results"].get(key)
+        if previous is None:
+            continue
+        before, after = previous["median"], result["median"]
+        ratio = after / before if before > 0 else float("inf")
+        rows.append({
+            "benchmark": key,
+            "baseline": before,
+            "current": after,
+            "ratio": round(ratio, 3),
+            "regression": ratio > 1 + threshold and after - before > min_delta
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Extraction micro-benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the benchmarks and write a JSON report")
+    run.add_argument("--tiers", default=",".join(DEFAULT_TIERS), help=f"Comma-separated: {', '.join(TIERS)}")
+    run.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    run.add_argument("--only", help="Comma-separated function names to run")
+    run.add_argument("--output", default="benchmark_results.json")
+
+    compare = commands.add_parser("compare", help="Flag regressions between two reports")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                         help="Allowed slowdown as a share of the baseline median")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        tiers = [t.strip() for t in args.tiers.split(",") if t.strip()]
+        unknown = [t for t in tiers if t not in TIERS]
+        if unknown:
+            parser.error(f"Unknown tiers: {', '.join(unknown)}")
+        only = set(args.only.split(",")) if args.only else None
+        report = run_suite(tiers, args.repeat, only)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare_reports(baseline, current, args.threshold)
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{row['benchmark']:<36} {row['baseline'] * 1000:10.2f} ms -> {row['current'] * 1000:10.2f} ms"
+              f"  x{row['ratio']:<6} {flag}")
+    regressions = [r for r in rows if r["regression"]]
+    print(f"{len(regressions)} regression(s) in {len(rows)} benchmarks (threshold {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Synthetic inventory planning workbooks for benchmarks and load tests.
+
+    python -m benchmarks.workbook_generator out.xlsx --rows 5000 --sheets 6 \
+        --business-type retail --pivot --banner-rows 3 --messy-dates
+"""
+import argparse
+import os
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from src.extract_data import SHEET_MAPPINGS, FIELD_MAPPINGS
+
+# Categories in the order sheets are added; extra sheets cycle through them
+GENERATED_CATEGORIES = ["inventory_on_hand", "sales_history", "purchase_orders", "item_master"]
+
+# Fields written per category (the extractor's schema fields)
+GENERATED_FIELDS = {
+    "inventory_on_hand": ["sku", "quantity", "location"],
+    "sales_history": ["sku", "time_period", "quantity", "revenue", "channel", "location"],
+    "purchase_orders": ["purchase_order_id", "sku", "quantity", "order_date", "arrival_date",
+                        "vendor", "cost", "has_arrived"],
+    "item_master": ["sku", "category", "vendor", "price", "cost"]
+}
+
+# Header synonyms are drawn from the first few entries of the mapping tables
+HEADER_CHOICES = 3
+
+# Date spellings used for messy dates, plus blanks
+MESSY_DATE_FORMATS = ["%Y-%m-%d", "%m/%d/%Y", "%d %B %Y", "%b %d, %Y", "%m-%d-%y"]
+MESSY_BLANK_RATE = 0.02
+
+LOCATIONS = ["East DC", "West DC", "Central", "Store 12", "Store 40"]
+CHANNELS = ["web", "store", "wholesale", "marketplace"]
+VENDORS = ["Acme Supply", "Globex", "Initech", "Umbrella Foods", "Stark Components"]
+PRODUCT_CATEGORIES = ["Rings", "Watches", "Straps", "Snacks", "Beverages", "Parts"]
+
+def _sheet_name(category, business_type, index, rng, used):
+    names = list(SHEET_MAPPINGS.get(business_type, {}).get(category, [])) + SHEET_MAPPINGS["generic"][category]
+    for name in [names[int(rng.integers(len(names)))]] + names:
+        title = name.title()[:31]
+        if title not in used:
+            return title
+    return f"{category.replace('_', ' ').title()} {index}"[:31]
+
+def _header(field, business_type, rng, used):
+    synonyms = FIELD_MAPPINGS.get(business_type, {}).get(field) or FIELD_MAPPINGS["generic"][field]
+    for name in [synonyms[int(rng.integers(min(HEADER_CHOICES, len(synonyms))))]] + synonyms:
+        if name.title() not in used:
+            return name.title()
+    return field.replace("_", " ").title()
+
+def _dates(rng, rows, start="2024-01-01", days=365, messy=False):
+    dates = pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days, rows), unit="D")
+    if not messy:
+        return dates
+    formats = rng.integers(0, len(MESSY_DATE_FORMATS), rows)
+    values = [d.strftime(MESSY_DATE_FORMATS[f]) for d, f in zip(dates, formats)]
+    for i in np.flatnonzero(rng.random(rows) < MESSY_BLANK_RATE):
+        values[i] = None
+    return values
+
+def _field_values(field, category, rows, skus, rng, messy_dates):
+    if field == "sku":
+        return rng.choice(skus, rows) if category != "item_master" else skus[:rows]
+    if field == "quantity":
+        return rng.integers(0 if category == "inventory_on_hand" else 1, 500, rows)
+    if field == "location":
+        return rng.choice(LOCATIONS, rows)
+    if field in ("time_period", "order_date"):
+        return _dates(rng, rows, messy=messy_dates)
+    if field == "arrival_date":
+        return _dates(rng, rows, start="2024-02-01", days=400, messy=messy_dates)
+    if field == "revenue":
+        return np.round(rng.uniform(5, 900, rows), 2)
+    if field in ("cost", "price"):
+        return np.round(rng.uniform(1, 120, rows), 2)
+    if field == "channel":
+        return rng.choice(CHANNELS, rows)
+    if field == "vendor":
+        return rng.choice(VENDORS, rows)
+    if field == "category":
+        return rng.choice(PRODUCT_CATEGORIES, rows)
+    if field == "purchase_order_id":
+        return [f"PO-{n:07d}" for n in rng.integers(0, 10 ** 7, rows)]
+    if field == "has_arrived":
+        return rng.choice(["Received", "Pending"], rows)
+    return rng.integers(0, 100, rows)
+
+def generate_sheet(category, rows, skus, rng, business_type="generic", extra_columns=0, messy_dates=False):
+    """
+    One table of a category with headers drawn from the business type's vocabulary,
+    plus extra_columns of unrelated data.
+    """
+    if category == "item_master":
+        rows = min(rows, len(skus))
+    columns = {}
+    for field in GENERATED_FIELDS[category]:
+        columns[_header(field, business_type, rng, columns)] = _field_values(
+            field, category, rows, skus, rng, messy_dates)
+    for i in range(extra_columns):
+        columns[f"Notes {i + 1}"] = rng.choice(["", "check", "hold", "ok"], rows)
+    return pd.DataFrame(columns)
+
+def write_pivot_sheet(writer, name, skus, rng, months=12):
+    """
+    Sales laid out as a pivot: a measure banner over a row of month labels, a blank
+    corner, then one row per SKU with a column per month.
+    """
+    table = pd.DataFrame(rng.integers(0, 200, (len(skus), months)))
+    table.insert(0, "sku", skus)
+    table.to_excel(writer, sheet_name=name, index=False, header=False, startrow=2)
+    worksheet = writer.sheets[name]
+    worksheet.cell(row=1, column=2, value="Units Sold")
+    labels = pd.date_range("2024-01-01", periods=months, freq="MS").strftime("%b %Y")
+    for column, label in enumerate(labels, start=2):
+        worksheet.cell(row=2, column=column, value=label)
+
+def generate_workbook(rows=1000, sheets=4, business_type="generic", extra_columns=0, pivot=False,
+                      banner_rows=0, messy_dates=False, sku_count=None, seed=0):
+    """
+    Build an .xlsx workbook in memory and return its bytes. Sheets cycle through the
+    four data categories; pivot adds a month-by-SKU sales pivot, banner_rows puts
+    title rows above every table, and messy_dates mixes date spellings and blanks.
+    """
+    rng = np.random.default_rng(seed)
+    sku_count = sku_count or max(10, rows // 10)
+    skus = np.array([f"SKU-{i:06d}" for i in range(sku_count)], dtype=object)
+
+    output = BytesIO()
+    used = set()
+    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+        for index in range(sheets):
+            category = GENERATED_CATEGORIES[index % len(GENERATED_CATEGORIES)]
+            name = _sheet_name(category, business_type, index, rng, used)
+            used.add(name)
+            table = generate_sheet(category, rows, skus, rng, business_type, extra_columns, messy_dates)
+            table.to_excel(writer, sheet_name=name, index=False, startrow=banner_rows)
+            worksheet = writer.sheets[name]
+            for row in range(banner_rows):
+                worksheet.cell(row=row + 1, column=1,
+                               value=f"{name} report" if row == 0 else f"Generated for planning run {seed}")
+        if pivot:
+            write_pivot_sheet(writer, "Sales By Month", skus[:min(len(skus), rows)], rng)
+    return output.getvalue()
+
+def generate_corpus(output_dir, count=10, seed=0, **options):
+    """
+    Write count workbooks with varied layouts to output_dir. Returns their paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    business_types = list(SHEET_MAPPINGS)
+    paths = []
+    for i in range(count):
+        workbook = generate_workbook(**{
+            "business_type": business_types[i % len(business_types)],
+            "pivot": i % 3 == 0,
+            "banner_rows": i % 4,
+            "messy_dates": i % 2 == 1,
+            "seed": seed + i,
+            **options
+        })
+        path = os.path.join(output_dir, f"workbook_{i:03d}.xlsx")
+        with open(path, "wb") as f:
+            f.write(workbook)
+        paths.append(path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic inventory planning workbooks")
+    parser.add_argument("output", help="Output .xlsx path, or a directory with --corpus")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--sheets", type=int, default=4)
+    parser.add_argument("--business-type", default="generic", choices=list(SHEET_MAPPINGS))
+    parser.add_argument("--extra-columns", type=int, default=0)
+    parser.add_argument("--pivot", action="store_true")
+    parser.add_argument("--banner-rows", type=int, default=0)
+    parser.add_argument("--messy-dates", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus", type=int, default=0, help="Write this many varied workbooks instead")
+    args = parser.parse_args()
+
+    if args.corpus:
+        paths = generate_corpus(args.output, args.corpus, seed=args.seed, rows=args.rows,
+                                sheets=args.sheets, extra_columns=args.extra_columns)
+        print(f"Wrote {len(paths)} workbooks to {args.output}")
+        return
+
+    workbook = generate_workbook(args.rows, args.sheets, args.business_type, args.extra_columns, args.pivot,
+                                 args.banner_rows, args.messy_dates, seed=args.seed)
+    with open(args.output, "wb") as f:
+        f.write(workbook)
+    print(f"Wrote {args.output} ({len(workbook)} bytes)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+
+from src.errors import AdmissionRejectedError
+from src.extract_data import SHEET_CACHE_MAX_BYTES
+from src.scenarios import SCENARIO_CACHE_MAX_BYTES
+from src.memory import MEMORY_BUDGET_BYTES
+from src.metrics import (
+    ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_MEMORY_RESERVED, ADMISSION_WAIT, ADMISSION_REJECTED
+)
+
+# Uploads processed at once; each pipeline run keeps about one core busy
+ADMISSION_CPU_SLOTS = int(os.environ.get("INVENTORY_ADMISSION_CPU_SLOTS", os.cpu_count() or 2))
+
+# Estimated memory of all uploads in flight (one upload over it still runs, alone)
+ADMISSION_MEMORY_BUDGET_BYTES = int(float(os.environ.get("INVENTORY_ADMISSION_MEMORY_MB", "4096")) * 1024 * 1024)
+
+# Memory the per-process result caches can hold; it is taken off the admission budget
+ADMISSION_CACHE_BYTES = SHEET_CACHE_MAX_BYTES + SCENARIO_CACHE_MAX_BYTES
+
+# Uploads allowed to wait, and how long each may wait before it is turned away
+ADMISSION_MAX_QUEUE = int(os.environ.get("INVENTORY_ADMISSION_MAX_QUEUE", "16"))
+ADMISSION_MAX_WAIT_SECONDS = float(os.environ.get("INVENTORY_ADMISSION_MAX_WAIT_SECONDS", "30"))
+
+# Processing time model, calibrated on generated workbooks: a fixed cost plus a cost per
+# worksheet cell (or per CSV byte). Only used to suggest Retry-After values.
+ADMISSION_BASE_SECONDS = 1.5
+ADMISSION_SECONDS_PER_CELL = 3.5e-5
+ADMISSION_SECONDS_PER_CSV_BYTE = 4e-6
+
+def estimate_request_cost(memory_estimate, memory_budget=MEMORY_BUDGET_BYTES):
+    """
+    Memory and CPU seconds an upload is expected to take, from its memory estimate
+    (see src.memory.estimate_upload_memory). Uploads over the per-request budget are
+    sampled down to it, so their cost is scaled down the same way.
+    """
+    estimated = memory_estimate["estimated_bytes"]
+    scale = min(1.0, memory_budget / estimated) if estimated else 1.0
+    if memory_estimate["kind"] == "csv":
+        work = memory_estimate["file_bytes"] * ADMISSION_SECONDS_PER_CSV_BYTE
+    else:
+        cells = sum(s["rows"] * s["columns"] for s in memory_estimate["sheets"].values())
+        work = cells * ADMISSION_SECONDS_PER_CELL
+    return {
+        "memory_bytes": int(min(estimated, memory_budget)),
+        "cpu_seconds": round(ADMISSION_BASE_SECONDS + work * scale, 2)
+    }
+
+def sum_request_costs(costs):
+    """
+    Combined cost of several uploads admitted together (a batch).
+    """
+    return {
+        "memory_bytes": sum(c["memory_bytes"] for c in costs),
+        "cpu_seconds": round(sum(c["cpu_seconds"] for c in costs), 2)
+    }
+
+class AdmissionController:
+    """
+    Admits uploads while CPU slots and the memory budget allow, in arrival order.
+    Later uploads wait in a bounded queue for up to max_wait seconds; uploads that
+    find the queue full or time out are rejected with a suggested retry delay,
+    derived from the estimated work ahead of them. Limits apply per process, and
+    cache_bytes of the memory budget is left to the process's caches.
+    """
+    def __init__(self, cpu_slots=ADMISSION_CPU_SLOTS, memory_budget=ADMISSION_MEMORY_BUDGET_BYTES,
+                 max_queue=ADMISSION_MAX_QUEUE, max_wait=ADMISSION_MAX_WAIT_SECONDS,
+                 cache_bytes=ADMISSION_CACHE_BYTES):
+        self.cpu_slots = max(1, cpu_slots)
+        self.memory_budget = memory_budget
+        self.cache_bytes = cache_bytes
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._condition = threading.Condition()
+        self._queue = deque()
+        self.in_flight = 0
+        self.memory_reserved = 0
+        self.work_in_flight = 0.0
+        self.work_queued = 0.0
+
+    def _fits(self, cost):
+        if self.in_flight >= self.cpu_slots:
+            return False
+        return self.in_flight == 0 or \
+            self.cache_bytes + self.memory_reserved + cost["memory_bytes"] <= self.memory_budget
+
+    def _retry_after(self):
+        return max(1, math.ceil((self.work_in_flight + self.work_queued) / self.cpu_slots))
+
+    def _publish(self):
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        ADMISSION_QUEUE_DEPTH.set(len(self._queue))
+        ADMISSION_MEMORY_RESERVED.set(self.memory_reserved)
+
+    def _reject(self, reason):
+        ADMISSION_REJECTED.inc(reason=reason)
+        raise AdmissionRejectedError("Server is busy processing other uploads", {
+            "reason": reason,
+            "retry_after": self._retry_after(),
+            "queue_depth": len(self._queue),
+            "in_flight": self.in_flight
+        })
+
+    def acquire(self, cost):
+        """
+        Wait until the upload can run and reserve its cost. Returns the seconds waited;
+        raises AdmissionRejectedError when the queue is full or the wait times out.
+        """
+        started = time.monotonic()
+        with self._condition:
+            if not self._queue and self._fits(cost):
+                self._admit(cost)
+                ADMISSION_WAIT.observe(0.0)
+                return 0.0
+            if len(self._queue) >= self.max_queue:
+                self._reject("queue_full")
+
+            ticket = object()
+            self._queue.append(ticket)
+            self.work_queued += cost["cpu_seconds"]
+            self._publish()
+            deadline = started + self.max_wait
+            try:
+                while not (self._queue[0] is ticket and self._fits(cost)):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._reject("timeout")
+                    self._condition.wait(remaining)
+            finally:
+                self._queue.remove(ticket)
+                self.work_queued -= cost["cpu_seconds"]
+                self._publish()
+                # The next upload in line may fit now
+                self._condition.notify_all()
+            self._admit(cost)
+
+        waited = time.monotonic() - started
+        ADMISSION_WAIT.observe(waited)
+        return waited
+
+    def _admit(self, cost):
+        self.in_flight += 1
+        self.memory_reserved += cost["memory_bytes"]
+        self.work_in_flight += cost["cpu_seconds"]
+        self._publish()
+
+    def release(self, cost):
+        with self._condition:
+            self.in_flight -= 1
+            self.memory_reserved -= cost["memory_bytes"]
+            self.work_in_flight -= cost["cpu_seconds"]
+            self._publish()
+            self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "in_flight": self.in_flight,
+                "queue_depth": len(self._queue),
+                "memory_reserved_bytes": self.memory_reserved,
+                "cpu_slots": self.cpu_slots,
+                "memory_budget_bytes": self.memory_budget,
+                "cache_bytes": self.cache_bytes
+            }
+
+ADMISSION = AdmissionController()
@@ -0,0 +1,246 @@
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from io import BytesIO
+
+from src.pipeline import run_pipeline
+from src.errors import InvalidFileTypeError, FileSizeLimitError
+from src.metrics import REGISTRY, ERRORS, diff_snapshots
+from src.deadline import deadline_passed, remaining_seconds
+
+# Extensions that can be processed, inside or outside a zip archive
+SUPPORTED_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+
+# Size of the shared worker pool; each batch request may use up to this many workers
+BATCH_MAX_WORKERS = int(os.environ.get("BATCH_MAX_WORKERS", os.cpu_count() or 2))
+
+# Limits for a single batch (after unpacking zip archives)
+BATCH_MAX_FILES = 100
+BATCH_MAX_TOTAL_SIZE = 500 * 1024 * 1024
+
+# Zip entries are decompressed in blocks of this size so their real size can be checked
+ZIP_READ_BLOCK_BYTES = 1024 * 1024
+
+# The pool is created from a threaded server, so workers must not be forked from it
+BATCH_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Set in pool workers, where work must not fan out to a pool of its own
+_in_worker = False
+
+def _init_worker():
+    global _in_worker
+    _in_worker = True
+
+def get_batch_executor():
+    """
+    Lazily create the process pool shared by all batch requests, so worker start-up
+    and the per-process caches are reused between batches.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=BATCH_MAX_WORKERS,
+                                            mp_context=multiprocessing.get_context(BATCH_START_METHOD),
+                                            initializer=_init_worker)
+        return _executor
+
+def map_on_pool(func, items):
+    """
+    Map func over items on the shared worker pool. Inside a pool worker (a batch
+    file's pipeline) the items run serially instead, so each worker doesn't start
+    a pool of its own. func must be a module-level function.
+    """
+    if _in_worker:
+        return [func(item) for item in items]
+    return list(get_batch_executor().map(func, items))
+
+def read_zip_entry(archive, info, max_file_size):
+    """
+    Decompress one zip entry, stopping as soon as it exceeds max_file_size whatever
+    size the archive declares for it. Corrupt entries raise InvalidFileTypeError.
+    """
+    chunks = []
+    size = 0
+    try:
+        with archive.open(info) as entry:
+            while True:
+                chunk = entry.read(ZIP_READ_BLOCK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_file_size:
+                    raise FileSizeLimitError(f"File '{info.filename}' is too large",
+                                             {"filename": info.filename, "size": size})
+                chunks.append(chunk)
+    except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError, RuntimeError) as e:
+        # RuntimeError covers encrypted entries, NotImplementedError unsupported compression
+        raise InvalidFileTypeError(f"Could not read '{info.filename}' from zip archive: {str(e)}",
+                                   {"filename": info.filename})
+    return b"".join(chunks)
+
+def expand_batch_uploads(uploads, max_file_size):
+    """
+    Turn uploaded (filename, bytes) pairs into the list of files to process,
+    unpacking zip archives. Unsupported entries are reported as skipped.
+    Returns (files, skipped).
+    """
+    files = []
+    skipped = []
+    total_size = 0
+
+    def add_file(name, data):
+        nonlocal total_size
+        if len(data) > max_file_size:
+            raise FileSizeLimitError(f"File '{name}' is too large", {"filename": name, "size": len(data)})
+        total_size += len(data)
+        if total_size > BATCH_MAX_TOTAL_SIZE:
+            raise FileSizeLimitError("Batch is too large", {"total_size": total_size})
+        files.append((name, data))
+
+    for filename, data in uploads:
+        lower_name = filename.lower()
+        if lower_name.endswith('.zip'):
+            try:
+                archive = zipfile.ZipFile(BytesIO(data))
+            except zipfile.BadZipFile as e:
+                raise InvalidFileTypeError(f"Could not read zip archive '{filename}': {str(e)}")
+
+            with archive:
+                for info in archive.infolist():
+                    base_name = os.path.basename(info.filename)
+                    if info.is_dir() or info.filename.startswith('__MACOSX/') or base_name.startswith(('.', '~$')):
+                        continue
+                    if not base_name.lower().endswith(SUPPORTED_EXTENSIONS):
+                        skipped.append({"filename": f"{filename}/{info.filename}", "reason": "unsupported file type"})
+                        continue
+                    # Check the declared size before decompressing anything, then the real one
+                    if info.file_size > max_file_size:
+                        raise FileSizeLimitError(f"File '{info.filename}' is too large",
+                                                 {"filename": info.filename, "size": info.file_size})
+                    add_file(f"{filename}/{info.filename}", read_zip_entry(archive, info, max_file_size))
+        elif lower_name.endswith(SUPPORTED_EXTENSIONS):
+            add_file(filename, data)
+        else:
+            skipped.append({"filename": filename, "reason": "unsupported file type"})
+
+    if len(files) > BATCH_MAX_FILES:
+        raise FileSizeLimitError(f"Batch has too many files ({len(files)} > {BATCH_MAX_FILES})",
+                                 {"file_count": len(files)})
+    return files, skipped
+
+def process_batch_file(filename, file_bytes, submitted_at, expires_at=None):
+    """
+    Worker entry point: run the full pipeline on one file.
+    Errors are returned as part of the result so one bad file doesn't fail the batch.
+    The metrics the file added in this worker are returned under 'metrics'.
+    expires_at is the batch deadline as a time.time() value, since monotonic clocks
+    aren't comparable between processes.
+    """
+    started_at = time.time()
+    metrics_before = REGISTRY.snapshot()
+    debug_logs = {}
+    deadline = time.monotonic() + (expires_at - started_at) if expires_at is not None else None
+    try:
+        classification_result, extracted_data, has_data = run_pipeline(
+            lambda: BytesIO(file_bytes), filename=filename, debug_logs=debug_logs, deadline=deadline
+        )
+        result = {
+            "filename": filename,
+            "classification": classification_result,
+            "extracted_data": extracted_data,
+            "has_data": has_data,
+            "debug_logs": debug_logs
+        }
+    except Exception as e:
+        result = {
+            "filename": filename,
+            "error": str(e),
+            "error_type": "extraction_error",
+            "debug_logs": debug_logs
+        }
+
+    finished_at = time.time()
+    result["timings"] = dict(debug_logs.get("timings", {}))
+    result["timings"].update({
+        "queue_wait": round(started_at - submitted_at, 4),
+        "processing": round(finished_at - started_at, 4),
+        "worker_pid": os.getpid()
+    })
+    result["metrics"] = diff_snapshots(REGISTRY.snapshot(), metrics_before)
+    return result
+
+def run_batch(files, concurrency=None, deadline=None):
+    """
+    Process files in parallel on the shared worker pool with at most `concurrency`
+    files of this batch in flight. Returns (results in input order, timing report).
+    Each file's pipeline gets the batch deadline (a time.monotonic() value); files
+    not started when it passes are returned with error_type 'deadline_exceeded'.
+    """
+    concurrency = max(1, min(concurrency or BATCH_MAX_WORKERS, BATCH_MAX_WORKERS))
+    executor = get_batch_executor()
+
+    batch_start = time.time()
+    expires_at = batch_start + remaining_seconds(deadline) if deadline is not None else None
+    results = [None] * len(files)
+    pending = {}
+    next_index = 0
+
+    while next_index < len(files) or pending:
+        # Keep up to `concurrency` files in flight
+        while next_index < len(files) and len(pending) < concurrency:
+            filename, file_bytes = files[next_index]
+            if deadline_passed(deadline):
+                results[next_index] = {
+                    "filename": filename,
+                    "error": "Deadline passed before the file was processed",
+                    "error_type": "deadline_exceeded",
+                    "timings": {}
+                }
+                ERRORS.inc(error_type="deadline_exceeded")
+                next_index += 1
+                continue
+            future = executor.submit(process_batch_file, filename, file_bytes, time.time(), expires_at)
+            pending[future] = next_index
+            next_index += 1
+        if not pending:
+            break
+
+        done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+        for future in done:
+            index = pending.pop(future)
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                results[index] = {
+                    "filename": files[index][0],
+                    "error": f"Worker failed: {str(e)}",
+                    "error_type": "unexpected_error",
+                    "timings": {}
+                }
+            # Fold the worker's metrics into this process, which serves /metrics
+            REGISTRY.merge(results[index].pop("metrics", {}))
+            if "error_type" in results[index]:
+                ERRORS.inc(error_type=results[index]["error_type"])
+
+    wall_time = time.time() - batch_start
+    processing_times = [r["timings"].get("processing", 0.0) for r in results]
+    slowest = max(range(len(results)), key=lambda i: processing_times[i]) if results else None
+
+    timing_report = {
+        "files": len(files),
+        "concurrency": concurrency,
+        "wall_time": round(wall_time, 4),
+        "total_processing_time": round(sum(processing_times), 4),
+        "slowest_file": files[slowest][0] if slowest is not None else None,
+        "slowest_file_time": round(processing_times[slowest], 4) if slowest is not None else 0.0,
+        "speedup": round(sum(processing_times) / wall_time, 2) if wall_time > 0 else 0.0,
+        "failed": sum(1 for r in results if "error" in r)
+    }
+    return results, timing_report
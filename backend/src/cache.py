@@ -0,0 +1,83 @@
+import sys
+import threading
+from collections import OrderedDict
+
+# Records measured to approximate the size of a record list
+CACHE_SIZE_SAMPLE_RECORDS = 100
+
+def approximate_records_bytes(records, sample_size=CACHE_SIZE_SAMPLE_RECORDS):
+    """
+    Approximate memory held by a list of record dicts: the list plus the average
+    size of an evenly spaced sample of records and their values (keys are shared).
+    """
+    if not records:
+        return sys.getsizeof(records)
+    step = max(1, len(records) // sample_size)
+    sample = records[::step]
+    per_record = sum(sys.getsizeof(r) + sum(sys.getsizeof(v) for v in r.values()) for r in sample) / len(sample)
+    return int(sys.getsizeof(records) + per_record * len(records))
+
+class LRUCache:
+    """
+    Thread-safe bounded LRU cache with hit/miss counters.
+    The bound is on the total size of the entries, where each entry's size is
+    given by size_fn (every entry counts as 1 if no size_fn is provided).
+    """
+    def __init__(self, max_size, size_fn=None):
+        self.max_size = max_size
+        self.size_fn = size_fn or (lambda value: 1)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        size = self.size_fn(value)
+        if size > self.max_size:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._total_size -= self._sizes.pop(key)
+                del self._entries[key]
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._total_size += size
+            while self._total_size > self.max_size and self._entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._total_size -= self._sizes.pop(old_key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """
+        Return a JSON-friendly summary of the cache state and hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size": self._total_size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": float(self.hits / lookups) if lookups else 0.0
+        }
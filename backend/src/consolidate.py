@@ -0,0 +1,215 @@
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from src.extract_data import EXTRACTION_SCHEMAS
+from src.sketches import merge_sales_sketches
+
+# Categories that can be consolidated across workbooks
+CONSOLIDATION_CATEGORIES = ["inventory_on_hand", "sales_history", "purchase_orders", "item_master"]
+
+# Fields that identify the same fact in different workbooks. "location" falls back to
+# the source name when it is missing, so site-level stock without a location isn't merged.
+DEDUP_KEYS = {
+    "inventory_on_hand": ["sku", "location"],
+    "sales_history": ["sku", "time_period", "location", "channel"],
+    "purchase_orders": ["purchase_order_id", "sku", "arrival_date"],
+    "item_master": ["sku"]
+}
+
+# Records are aligned and hashed this many at a time
+CONSOLIDATION_CHUNK_ROWS = 100000
+
+# Consolidated data up to this many input rows is returned inline as records; larger
+# results are streamed to CSV files and downloaded separately
+CONSOLIDATION_MAX_RESPONSE_ROWS = 200000
+
+# Directory for consolidated CSV files (outside the source tree)
+CONSOLIDATION_DIR = os.environ.get(
+    "INVENTORY_CONSOLIDATION_DIR", os.path.join(tempfile.gettempdir(), "inventory_consolidations")
+)
+
+# Consolidated CSV files are deleted after this many seconds (1 hour)
+CONSOLIDATION_MAX_AGE_SECONDS = 3600
+
+_CONSOLIDATION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+class SortedHashIndex:
+    """
+    Set of 64-bit row hashes kept as a few sorted numpy runs. New runs are merged
+    with the previous one once it is no more than twice their size, so lookups stay
+    at O(log n) per run and memory is 8 bytes per distinct row.
+    """
+    def __init__(self):
+        self.runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    def contains(self, hashes):
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self.runs:
+            positions = np.searchsorted(run, hashes)
+            positions[positions == len(run)] = 0
+            found |= run[positions] == hashes
+        return found
+
+    def add(self, hashes):
+        if len(hashes) == 0:
+            return
+        self.runs.append(np.unique(hashes))
+        while len(self.runs) > 1 and len(self.runs[-2]) <= 2 * len(self.runs[-1]):
+            last = self.runs.pop()
+            self.runs[-1] = np.union1d(self.runs[-1], last)
+
+def align_records(records, category, source):
+    """
+    Build a dataframe with exactly the category's schema fields (in schema order)
+    plus a 'source' column; fields a workbook didn't provide are left empty.
+    """
+    fields = list(EXTRACTION_SCHEMAS[category].keys())
+    df = pd.DataFrame.from_records(records, columns=fields)
+    for field, info in EXTRACTION_SCHEMAS[category].items():
+        if info["type"] == "float":
+            df[field] = pd.to_numeric(df[field], errors="coerce")
+    df["source"] = source
+    return df
+
+def dedup_hashes(df, category):
+    """
+    64-bit hash per row of the category's dedup key columns.
+    """
+    key_frame = pd.DataFrame(index=df.index)
+    for field in DEDUP_KEYS[category]:
+        values = df[field]
+        if field == "location":
+            values = values.fillna(df["source"])
+        key_frame[field] = values.astype(str) if values.dtype == object else values
+    return pd.util.hash_pandas_object(key_frame, index=False).to_numpy()
+
+def iter_consolidated_chunks(sources, category, chunk_rows=CONSOLIDATION_CHUNK_ROWS, stats=None):
+    """
+    Concatenate one category across sources, yielding aligned and deduplicated chunks.
+    sources is a list of (source_name, extracted_data) pairs; earlier sources win on
+    duplicates. Only one chunk plus the hash indexes are held in memory at a time.
+    """
+    seen = SortedHashIndex()
+    input_rows = 0
+    output_rows = 0
+
+    for source, extracted_data in sources:
+        records = extracted_data.get(category) or []
+        source_hashes = SortedHashIndex()
+        for start in range(0, len(records), chunk_rows):
+            chunk = align_records(records[start:start + chunk_rows], category, source)
+            hashes = dedup_hashes(chunk, category)
+
+            # Drop rows an earlier source already provided; repeated rows within one
+            # workbook are separate facts (e.g. two transactions) and are kept
+            keep = ~seen.contains(hashes)
+            source_hashes.add(hashes)
+
+            input_rows += len(chunk)
+            output_rows += int(keep.sum())
+            if keep.any():
+                yield chunk[keep]
+
+        for run in source_hashes.runs:
+            seen.add(run)
+
+    if stats is not None:
+        stats[category] = {
+            "input_rows": input_rows,
+            "output_rows": output_rows,
+            "duplicates_removed": input_rows - output_rows,
+            "dedup_keys": DEDUP_KEYS[category]
+        }
+
+def _chunk_to_records(chunk):
+    records = []
+    for record in chunk.to_dict(orient="records"):
+        records.append({k: v for k, v in record.items() if not pd.isna(v)})
+    return records
+
+def count_records(sources, categories=None):
+    return sum(len(data.get(category) or []) for _, data in sources
+               for category in categories or CONSOLIDATION_CATEGORIES)
+
+def consolidate_extractions(sources, categories=None):
+    """
+    Combine the extraction results of several workbooks into one record list per category.
+    The workbooks' sales sketches are merged into one approximate 'sales_summary'.
+    Returns (consolidated_data, stats).
+    """
+    consolidated = {}
+    stats = {}
+    for category in categories or CONSOLIDATION_CATEGORIES:
+        consolidated[category] = []
+        for chunk in iter_consolidated_chunks(sources, category, stats=stats):
+            consolidated[category].extend(_chunk_to_records(chunk))
+
+    sales_sketch = merge_sales_sketches(data.get("sales_sketch") for _, data in sources)
+    if sales_sketch is not None:
+        consolidated["sales_summary"] = sales_sketch.summary()
+    return consolidated, stats
+
+def write_consolidated_csv(sources, output_dir, categories=None):
+    """
+    Stream the consolidated datasets to one CSV file per category, for combined
+    sizes that are too large to hold as records. Returns the stats per category.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stats = {}
+    for category in categories or CONSOLIDATION_CATEGORIES:
+        path = os.path.join(output_dir, f"{category}.csv")
+        header = True
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            for chunk in iter_consolidated_chunks(sources, category, stats=stats):
+                chunk.to_csv(f, index=False, header=header)
+                header = False
+        stats[category]["path"] = path
+    return stats
+
+def _remove_expired_consolidations(root, now=None):
+    now = now or time.time()
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if _CONSOLIDATION_ID.match(name) and now - os.path.getmtime(path) > CONSOLIDATION_MAX_AGE_SECONDS:
+            shutil.rmtree(path, ignore_errors=True)
+
+def write_consolidation(sources, categories=None, root=None):
+    """
+    Stream a consolidation to CSV files under a new id in CONSOLIDATION_DIR, so
+    only one chunk of the combined output is in memory at a time. Expired
+    consolidations are removed first. Returns (consolidation_id, consolidated_data,
+    stats); consolidated_data only holds the merged 'sales_summary'.
+    """
+    root = root or CONSOLIDATION_DIR
+    os.makedirs(root, exist_ok=True)
+    _remove_expired_consolidations(root)
+
+    consolidation_id = uuid.uuid4().hex
+    stats = write_consolidated_csv(sources, os.path.join(root, consolidation_id), categories)
+    for category_stats in stats.values():
+        category_stats.pop("path")
+
+    consolidated = {}
+    sales_sketch = merge_sales_sketches(data.get("sales_sketch") for _, data in sources)
+    if sales_sketch is not None:
+        consolidated["sales_summary"] = sales_sketch.summary()
+    return consolidation_id, consolidated, stats
+
+def consolidation_file(consolidation_id, category, root=None):
+    """
+    Path of a consolidated category's CSV file, or None if it doesn't exist.
+    """
+    if not _CONSOLIDATION_ID.match(consolidation_id or "") or category not in CONSOLIDATION_CATEGORIES:
+        return None
+    path = os.path.join(root or CONSOLIDATION_DIR, consolidation_id, f"{category}.csv")
+    return path if os.path.isfile(path) else None
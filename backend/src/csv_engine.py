@@ -0,0 +1,388 @@
+import csv
+import io
+import logging
+import os
+from contextlib import contextmanager
+
+import pandas as pd
+
+from src.extract_data import (
+    EXTRACTION_SCHEMAS, HEADER_SCAN_ROWS, get_field_mappings, detect_sheet_category,
+    identify_header_row, ensure_unique_columns, detect_column_data_types,
+    map_columns_to_fields, has_sufficient_mapping, clean_extracted_data,
+    convert_to_records, fuzzy_match, add_sales_sketch
+)
+from src.sketches import SalesSketch
+from src.deadline import deadline_passed
+from src.metrics import SHEETS_PROCESSED, stage_timer
+from src.file_classifier import score_business_type, calculate_confidence
+
+logger = logging.getLogger(__name__)
+
+# Rows per chunk when extracting CSV files; parsing memory is bounded by this, not the file size.
+# The extracted records are still collected, so uploads keep the regular size limit.
+CSV_CHUNK_ROWS = 50000
+
+# Bytes read from the start of the file to sniff the delimiter and encoding
+CSV_SNIFF_BYTES = 64 * 1024
+
+# Encodings tried in order; latin-1 always decodes so it is the last resort
+CSV_ENCODINGS = ["utf-8-sig", "utf-8", "cp1252", "latin-1"]
+
+CSV_DELIMITERS = ",;\t|"
+
+# Leading bytes of Excel containers (xlsx/zip and legacy xls/OLE)
+EXCEL_SIGNATURES = (b"PK\x03\x04", b"\xd0\xcf\x11\xe0")
+
+def is_csv_file(file, filename=None):
+    """
+    Decide whether an upload should go through the CSV engine: by extension when a
+    file name is known, otherwise by checking that it isn't an Excel container.
+    """
+    if filename:
+        return str(filename).lower().endswith(".csv")
+
+    position = file.tell()
+    head = file.read(4)
+    file.seek(position)
+    return bool(head) and not head.startswith(EXCEL_SIGNATURES)
+
+def sniff_csv_format(file):
+    """
+    Detect the encoding and delimiter from the first CSV_SNIFF_BYTES of the file.
+    Returns a dict with 'encoding' and 'delimiter'.
+    """
+    file.seek(0)
+    head = file.read(CSV_SNIFF_BYTES)
+    file.seek(0)
+
+    if isinstance(head, str):
+        text = head
+        encoding = "utf-8"
+    else:
+        text = None
+        for encoding in CSV_ENCODINGS:
+            try:
+                text = head.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                # A multi-byte character may be cut at the end of the sniffed block
+                try:
+                    text = head[:-3].decode(encoding)
+                    break
+                except UnicodeDecodeError:
+                    continue
+
+    # Only sniff complete lines
+    sample = text.rsplit("\n", 1)[0] if "\n" in text else text
+    try:
+        delimiter = csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ","
+
+    return {"encoding": encoding, "delimiter": delimiter}
+
+@contextmanager
+def open_csv_text(file, csv_format, skip_records=0):
+    """
+    Open a CSV file as text positioned after its first skip_records records.
+    Records are skipped with the same csv reader that found the header, so quoted
+    cells spanning several lines above it can't shift where reading starts.
+    Undecodable bytes are replaced rather than failing the whole extraction.
+    """
+    file.seek(0)
+    text_stream = io.TextIOWrapper(file, encoding=csv_format["encoding"], errors="replace", newline="")
+    try:
+        reader = csv.reader(text_stream, delimiter=csv_format["delimiter"])
+        for _ in range(skip_records):
+            if next(reader, None) is None:
+                break
+        yield text_stream
+    finally:
+        # Detach so closing the wrapper doesn't close the caller's file
+        text_stream.detach()
+        file.seek(0)
+
+def read_csv_frame(text_stream, csv_format, **kwargs):
+    """
+    pd.read_csv with the sniffed delimiter, from a stream opened by open_csv_text.
+    """
+    return pd.read_csv(text_stream, sep=csv_format["delimiter"], low_memory=False, **kwargs)
+
+def read_csv_top_rows(file, csv_format, max_rows=HEADER_SCAN_ROWS):
+    """
+    Read the first non-blank records of a CSV file without assuming a fixed width,
+    so banner lines above the header don't break parsing.
+    Returns (df_top, skip_counts) where skip_counts[i] is the number of raw records
+    before row i of df_top (the value to pass as skip_records to open_csv_text).
+    """
+    rows = []
+    skip_counts = []
+    with open_csv_text(file, csv_format) as text_stream:
+        for raw_index, record in enumerate(csv.reader(text_stream, delimiter=csv_format["delimiter"])):
+            if not any(cell.strip() for cell in record):
+                continue
+            rows.append([cell if cell.strip() else None for cell in record])
+            skip_counts.append(raw_index)
+            if len(rows) >= max_rows:
+                break
+
+    return pd.DataFrame(rows), skip_counts
+
+def get_pseudo_sheet_name(filename):
+    """
+    The file name without extension stands in for the sheet name of a CSV file.
+    """
+    if not filename:
+        return "csv"
+    return os.path.splitext(os.path.basename(str(filename)))[0].replace("_", " ")
+
+def match_csv_columns(columns_lower, category, field_mappings):
+    """
+    Count which of a category's schema fields have a matching column in the header.
+    """
+    schema = EXTRACTION_SCHEMAS[category]
+    required_fields = [f for f, s in schema.items() if s["required"]]
+    matched = [
+        field for field in schema
+        if any(fuzzy_match(col, field_mappings.get(field, []), threshold=80)[0] for col in columns_lower)
+    ]
+    required_matched = [f for f in matched if f in required_fields]
+    return {
+        "category": category,
+        "matches": matched,
+        "required_match_count": len(required_matched),
+        "total_match_count": len(matched),
+        "coverage": len(required_matched) / len(required_fields)
+    }
+
+def detect_csv_category(columns, sheet_name, business_type, field_mappings):
+    """
+    Pick the category of a CSV file: by its name first, then by which category's
+    required fields are best covered by the header.
+    Returns (category, column_match) where column_match has the matched field counts.
+    """
+    columns_lower = [str(c).lower().strip() for c in columns]
+
+    name_category = detect_sheet_category(sheet_name, business_type)
+    if name_category != "unclassified":
+        return name_category, match_csv_columns(columns_lower, name_category, field_mappings)
+
+    # Prefer full coverage, then the more specific category (more required fields)
+    best = None
+    for category in EXTRACTION_SCHEMAS:
+        column_match = match_csv_columns(columns_lower, category, field_mappings)
+        rank = (column_match["coverage"], column_match["required_match_count"])
+        if best is None or rank > (best["coverage"], best["required_match_count"]):
+            best = column_match
+
+    if best and best["coverage"] >= 0.6:
+        return best["category"], best
+    return "unclassified", best
+
+def analyze_csv(file, filename=None, business_type=None):
+    """
+    Read the header plus a sample of a CSV file and work out its format, header row,
+    business type and category. This is the shared first stage of classify and extract.
+    """
+    csv_format = sniff_csv_format(file)
+    sheet_name = get_pseudo_sheet_name(filename)
+
+    # Find the header row in the top rows, then skip everything above it when reading
+    df_top, skip_counts = read_csv_top_rows(file, csv_format)
+    if df_top.empty:
+        return None
+
+    # Header detection needs candidate fields, so use all required fields across categories
+    generic_mappings = get_field_mappings(business_type or "generic")
+    all_required = sorted({
+        f for schema in EXTRACTION_SCHEMAS.values() for f, s in schema.items() if s["required"]
+    })
+    header_row = skip_counts[identify_header_row(df_top, all_required, generic_mappings)]
+
+    with open_csv_text(file, csv_format, skip_records=header_row) as text_stream:
+        sample = read_csv_frame(text_stream, csv_format, nrows=200)
+    sample.columns = ensure_unique_columns(sample.columns)
+
+    if business_type is None:
+        with stage_timer("business_type"):
+            business_type = score_business_type([sheet_name], [sample])
+    field_mappings = get_field_mappings(business_type)
+
+    category, column_match = detect_csv_category(sample.columns, sheet_name, business_type, field_mappings)
+
+    return {
+        "format": csv_format,
+        "sheet_name": sheet_name,
+        "header_row": int(header_row),
+        "business_type": business_type,
+        "category": category,
+        "column_match": column_match,
+        "sample": sample,
+        "field_mappings": field_mappings
+    }
+
+def classify_csv(file, filename=None):
+    """
+    Classify a CSV file as a single pseudo-sheet, returning the same result shape as classify_file.
+    """
+    try:
+        analysis = analyze_csv(file, filename)
+    except Exception as e:
+        return {
+            'is_inventory_planning': False,
+            'confidence': 0.0,
+            'justification': f'File read error: {str(e)}',
+            'business_type': 'unknown'
+        }
+
+    if analysis is None:
+        return {
+            'is_inventory_planning': False,
+            'confidence': 0.0,
+            'justification': 'CSV file has no rows',
+            'business_type': 'generic'
+        }
+
+    category = analysis["category"]
+    column_match = analysis["column_match"]
+    sheet_name = analysis["sheet_name"]
+    justification_parts = [
+        f'CSV file read with delimiter {analysis["format"]["delimiter"]!r} '
+        f'and encoding {analysis["format"]["encoding"]}'
+    ]
+
+    category_confidence = {}
+    if category != "unclassified":
+        name_matched = detect_sheet_category(sheet_name, analysis["business_type"]) == category
+        sheet_matches = [{'sheet': sheet_name}] if name_matched else []
+        column_matches = [column_match] if column_match and column_match["coverage"] >= 0.6 else []
+        category_confidence[category] = calculate_confidence(sheet_matches, column_matches)
+
+        if name_matched:
+            justification_parts.append(f'File name "{sheet_name}" identified as {category} data')
+        if column_matches:
+            justification_parts.append(
+                f'File contains key {category} fields: {", ".join(column_match["matches"])}'
+            )
+
+    overall_confidence = max(category_confidence.values()) if category_confidence else 0.0
+    is_inventory_planning = overall_confidence >= 0.5
+
+    if is_inventory_planning:
+        justification_parts.insert(0, f'Detected business type: {analysis["business_type"]}')
+        justification_parts.append(
+            f'Overall confidence: {overall_confidence:.1%} - This is an inventory planning file'
+        )
+    else:
+        justification_parts.append(
+            f'Insufficient inventory planning signals detected (confidence: {overall_confidence:.1%})'
+        )
+
+    return {
+        'is_inventory_planning': bool(is_inventory_planning),
+        'confidence': float(overall_confidence),
+        'justification': '. '.join(justification_parts),
+        'business_type': str(analysis["business_type"]),
+        'category_confidence': {k: float(v) for k, v in category_confidence.items()}
+    }
+
+def iter_csv_records(file, business_type="generic", filename=None, chunk_rows=CSV_CHUNK_ROWS, stats=None,
+                     sample_every=1, deadline=None):
+    """
+    Extract a CSV file chunk by chunk through the same mapping and cleaning stages
+    as Excel sheets. Yields (category, records) per chunk. The field map is decided
+    once from the first rows, so memory stays bounded by the chunk size.
+    With sample_every > 1 only every sample_every-th data row is kept. Reading stops
+    between chunks once the deadline passes, which sets stats["partial"].
+    If a stats dict is given, the format, header row and row counts are recorded in it.
+    """
+    analysis = analyze_csv(file, filename, business_type)
+    if analysis is None:
+        return
+
+    category = analysis["category"]
+    if stats is not None:
+        stats.update({
+            "delimiter": analysis["format"]["delimiter"],
+            "encoding": analysis["format"]["encoding"],
+            "header_row": analysis["header_row"],
+            "category": category,
+            "chunks": 0,
+            "rows_read": 0,
+            "records": 0,
+            "sample_every": sample_every
+        })
+
+    if category == "unclassified":
+        logger.debug("CSV file '%s' could not be classified - skipping", analysis['sheet_name'])
+        return
+
+    schema = EXTRACTION_SCHEMAS[category]
+    sample = analysis["sample"]
+    column_types = detect_column_data_types(sample)
+    field_map = map_columns_to_fields(sample.columns, analysis["field_mappings"], column_types, category)
+    if not has_sufficient_mapping(field_map, schema):
+        logger.debug("Insufficient field mappings for CSV file '%s' - skipping", analysis['sheet_name'])
+        return
+
+    logger.info("Processing CSV file '%s' - Detected category: %s", analysis['sheet_name'], category)
+    rows_seen = 0
+    with open_csv_text(file, analysis["format"], skip_records=analysis["header_row"]) as text_stream, \
+            read_csv_frame(text_stream, analysis["format"], chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            if deadline_passed(deadline):
+                if stats is not None:
+                    stats["partial"] = True
+                break
+            rows_read = len(chunk)
+            if sample_every > 1:
+                # Keep the stride across chunk boundaries
+                chunk = chunk.iloc[(-rows_seen) % sample_every::sample_every]
+            rows_seen += rows_read
+            chunk.columns = ensure_unique_columns(chunk.columns)
+            cleaned_df = clean_extracted_data(chunk, field_map, schema)
+            records = convert_to_records(cleaned_df) if not cleaned_df.empty else []
+
+            if stats is not None:
+                stats["chunks"] += 1
+                stats["rows_read"] += rows_read
+                stats["records"] += len(records)
+            yield category, records
+
+def extract_csv_data(file, business_type="generic", filename=None, debug_logs=None, sample_every=1, deadline=None):
+    """
+    Extract a CSV file into the same result structure as extract_data.
+    """
+    extracted_data = {
+        "inventory_on_hand": [],
+        "sales_history": [],
+        "purchase_orders": [],
+        "item_master": [],
+        "unclassified": []
+    }
+
+    stats = {}
+    sales_sketch = SalesSketch()
+    try:
+        for category, records in iter_csv_records(file, business_type, filename, stats=stats,
+                                                  sample_every=sample_every, deadline=deadline):
+            extracted_data[category].extend(records)
+            if category == "sales_history":
+                sales_sketch.update(records)
+    except Exception as e:
+        return {"error": f"File read error: {str(e)}"}
+
+    add_sales_sketch(extracted_data, sales_sketch)
+    SHEETS_PROCESSED.inc(outcome="csv")
+
+    logger.info("Extracted %s records from CSV in %s chunks", stats.get('records', 0), stats.get('chunks', 0))
+    if debug_logs is not None:
+        debug_logs['csv'] = stats
+
+    # A CSV file is a single pseudo-sheet, so a partial read skips rows, not sheets
+    if stats.get("partial"):
+        extracted_data["partial"] = True
+        extracted_data["skipped_sheets"] = []
+
+    return extracted_data
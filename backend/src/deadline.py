@@ -0,0 +1,42 @@
+import os
+import time
+
+# Time an upload may take before the response is sent with whatever is finished
+# (0, the default, disables the deadline unless the client asks for one)
+UPLOAD_DEADLINE_SECONDS = float(os.environ.get("INVENTORY_UPLOAD_DEADLINE_SECONDS", "0"))
+
+# Clients can ask for a (shorter) deadline, in seconds, with this header
+DEADLINE_HEADER = "X-Deadline-Seconds"
+
+def make_deadline(seconds, started=None):
+    """
+    Deadline as a time.monotonic() value, seconds after started (default: now), or
+    None for no deadline.
+    """
+    if not seconds or seconds <= 0:
+        return None
+    return (started if started is not None else time.monotonic()) + seconds
+
+def request_deadline(header_value=None, started=None, default_seconds=UPLOAD_DEADLINE_SECONDS):
+    """
+    Deadline for a request: the configured default, shortened by the client's header.
+    """
+    seconds = default_seconds
+    try:
+        requested = float(header_value) if header_value else None
+    except ValueError:
+        requested = None
+    if requested and requested > 0:
+        seconds = min(seconds, requested) if seconds else requested
+    return make_deadline(seconds, started)
+
+def deadline_passed(deadline):
+    return deadline is not None and time.monotonic() >= deadline
+
+def remaining_seconds(deadline):
+    """
+    Seconds left before the deadline (never negative), or None without one.
+    """
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
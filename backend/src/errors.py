@@ -27,4 +27,16 @@ class DataExtractionError(InventoryPlannerError):
 
 class SheetProcessingError(InventoryPlannerError):
     """Raised when there's an issue processing a specific sheet"""
-    pass
\ No newline at end of file
+    pass
+
+class HistoryStoreError(InventoryPlannerError):
+    """Raised when the upload history store cannot be read or written"""
+    pass
+
+class ScenarioError(InventoryPlannerError):
+    """Raised when a what-if scenario has invalid overrides"""
+    pass
+
+class AdmissionRejectedError(InventoryPlannerError):
+    """Raised when an upload can't be admitted within the queue and wait limits"""
+    pass
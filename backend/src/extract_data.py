@@ -1,10 +1,24 @@
 import pandas as pd
 import numpy as np
 import warnings
+import logging
+import os
 import re
 from datetime import datetime
 from fuzzywuzzy import fuzz, process
 from collections import defaultdict
+from src.cache import LRUCache, approximate_records_bytes
+from src.match_cache import best_fuzzy_match, compile_candidates, ratio_match_any
+from src.sheet_fingerprint import compute_sheet_fingerprints, read_sheet_dimensions
+from src.sku_dictionary import canonicalize_sku_series
+from src.sketches import SalesSketch
+from src.metrics import REGISTRY, SHEETS_PROCESSED, timed_stage
+from src.deadline import deadline_passed
+from src.extraction_plans import (
+    compute_template_key, load_extraction_plan, new_extraction_plan, save_extraction_plan
+)
+
+logger = logging.getLogger(__name__)
 
 warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
 
@@ -286,6 +300,15 @@ DATE_FORMAT_PATTERNS = [
     {"pattern": r"^WK\s\d{1,2}$", "format": None, "handler": "week_number"},  # WK 12
 ]
 
+# How many rows from the top of a sheet are scanned for the header row
+HEADER_SCAN_ROWS = 60
+
+# Per-sheet extraction results keyed by (sheet fingerprint, business type, sampling),
+# bounded by the approximate memory of the cached records (256MB)
+SHEET_CACHE_MAX_BYTES = int(float(os.environ.get("INVENTORY_SHEET_CACHE_MB", "256")) * 1024 * 1024)
+SHEET_RESULT_CACHE = LRUCache(SHEET_CACHE_MAX_BYTES, size_fn=lambda result: approximate_records_bytes(result[1]))
+REGISTRY.register_cache("sheet_results", SHEET_RESULT_CACHE)
+
 def fuzzy_match(target, candidates, threshold=85):
     """
     Enhanced fuzzy matching with improved matching algorithm and threshold handling.
@@ -298,21 +321,10 @@ def fuzzy_match(target, candidates, threshold=85):
     if not target or target == 'nan':
         return None, 0
         
-    best_match = None
-    best_score = 0
-    
-    for candidate in candidates:
-        # Try multiple scoring methods for more accurate matching
-        ratio_score = fuzz.ratio(target, candidate.lower())
-        partial_score = fuzz.partial_ratio(target, candidate.lower())
-        token_sort_score = fuzz.token_sort_ratio(target, candidate.lower())
-        
-        # Use the best score among the different methods
-        score = max(ratio_score, partial_score, token_sort_score)
-        
-        if score > best_score and score >= threshold:
-            best_score = score
-            best_match = candidate
+    # Scores come from the shared memo; the threshold is applied afterwards
+    best_match, best_score = best_fuzzy_match(target, candidates)
+    if best_match is None or best_score < threshold:
+        return None, 0
     
     return best_match, best_score
 
@@ -388,34 +400,63 @@ def ensure_unique_columns(columns):
         unique_columns.append(col)
     return unique_columns
 
+@timed_stage("header_detection")
 def identify_header_row(df, required_fields, field_mappings):
     """
-    Identifies the most likely header row in a dataframe by looking for matches
-    to required field names.
+    Identifies the most likely header row in a dataframe read with header=None by
+    counting cells that match required field names. Returns the sheet row index.
+    
+    All rows in the scan window are scored together: rows with fewer than two text cells
+    can't reach the threshold and are skipped, exact variation hits are found with a set
+    lookup, and fuzzy matching only runs on rows that could still beat the best row.
+    Only text cells can match, so numeric headers (years in a pivot) are simply ignored.
     """
-    # Check first 10 rows at most
-    max_check_rows = min(10, len(df))
-    best_score = 0
-    best_row = 0
+    window = df.head(HEADER_SCAN_ROWS)
+    if window.empty:
+        return 0
     
     # Prepare all field variations to check against
     all_variations = []
     for field in required_fields:
         all_variations.extend(field_mappings[field])
+    _, compiled = compile_candidates(all_variations)
+    
+    # Normalized text of string cells (NaN everywhere else, including all-blank columns)
+    texts = window.map(lambda x: x.strip().lower() if isinstance(x, str) and x.strip() else np.nan)
+    
+    # Cheap per-row features, used to order rows (not to reject them)
+    non_null = window.notna().sum(axis=1).clip(lower=1)
+    string_count = texts.notna().sum(axis=1)
+    string_share = string_count / non_null
+    exact_hits = texts.isin(compiled["exact"]).sum(axis=1)
+    
+    is_candidate = string_count >= 2
+    candidates = pd.DataFrame({
+        "row": np.arange(len(window)),
+        "exact_hits": exact_hits.to_numpy(),
+        "string_share": string_share.to_numpy(),
+        "string_count": string_count.to_numpy()
+    })[is_candidate.to_numpy()]
+    
+    # Most promising rows first so the upper bound prunes the rest
+    candidates = candidates.sort_values(
+        ["exact_hits", "string_share", "row"], ascending=[False, False, True]
+    )
     
-    for row_idx in range(max_check_rows):
-        row_values = df.iloc[row_idx].astype(str).str.lower().tolist()
-        match_count = 0
+    best_score = 0
+    best_row = 0
+    for row_idx, max_possible in zip(candidates["row"], candidates["string_count"]):
+        if max_possible < best_score or (max_possible == best_score and row_idx > best_row):
+            continue
         
-        for val in row_values:
-            for var in all_variations:
-                if fuzz.ratio(val, var.lower()) >= 80:
-                    match_count += 1
-                    break
+        match_count = sum(
+            1 for val in texts.iloc[row_idx].dropna()
+            if ratio_match_any(val, all_variations, 80)
+        )
         
-        if match_count > best_score:
+        if match_count > best_score or (match_count == best_score and row_idx < best_row):
             best_score = match_count
-            best_row = row_idx
+            best_row = int(row_idx)
     
     return best_row if best_score >= 2 else 0  # Return 0 if no good match
 
@@ -521,7 +562,7 @@ def validate_and_convert_value(value, field_schema):
         if validation == "alphanumeric":
             # Allow alphanumeric plus common separators and reasonable punctuation
             if not re.match(r'^[A-Za-z0-9\-_\.\/\s\(\)\&\+\,\#\'\"\:\;\°\%\!]*$', value):
-                print(f"Rejecting non-alphanumeric value: '{value}'")
+                logger.debug("Rejecting non-alphanumeric value: '%s'", value)
                 return None
         
         return value
@@ -632,6 +673,7 @@ def detect_column_data_types(df, sample_rows=100):
     
     return column_types
 
+@timed_stage("mapping")
 def map_columns_to_fields(columns, field_mappings, observed_types=None, sheet_category=None, is_pivot=False):
     """
     Maps dataframe columns to expected fields based on name matching and data types.
@@ -728,39 +770,20 @@ def map_columns_to_fields(columns, field_mappings, observed_types=None, sheet_ca
                         matched_fields.add(field)
                         break
     
-    # Add debugging information
-    print(f"\n==== Column Mapping Results ====")
-    print(f"Sheet category: {sheet_category if sheet_category else 'unknown'}")
-    print(f"Is pivot table: {is_pivot}")
-    
-    # Print mapped fields
-    print("Mapped columns:")
-    for col, field in field_map.items():
-        print(f"  Column '{col}' → Field '{field}'")
-    
-    # Print unmapped columns
+    # Log the mapping for debugging
     unmapped_cols = [col for col in columns if col not in field_map]
-    if unmapped_cols:
-        print("Unmapped columns:")
-        for col in unmapped_cols:
-            print(f"  '{col}'")
-    
-    # Check for missing required fields
+    missing_required = []
     if sheet_category and sheet_category in EXTRACTION_SCHEMAS:
         schema = EXTRACTION_SCHEMAS[sheet_category]
         required_fields = [field for field, info in schema.items() if info.get('required', False)]
         mapped_fields = set(field_map.values())
         missing_required = [field for field in required_fields if field not in mapped_fields]
-        
-        if missing_required:
-            print("WARNING: Missing required fields:")
-            for field in missing_required:
-                print(f"  Required field '{field}' not mapped to any column")
-    
-    print("================================\n")
+    logger.debug("Column mapping for %s sheet (pivot: %s): mapped %s, unmapped %s, missing required %s",
+                 sheet_category or "unknown", is_pivot, field_map, unmapped_cols, missing_required)
     
     return field_map
 
+@timed_stage("cleaning")
 def clean_extracted_data(df, field_map, schema):
     """
     Cleans and validates extracted data based on the schema.
@@ -773,7 +796,7 @@ def clean_extracted_data(df, field_map, schema):
     
     # If any required fields are missing, return empty dataframe
     if missing_required:
-        print(f"Missing required fields for schema: {missing_required}. Skipping extraction.")
+        logger.debug("Missing required fields for schema: %s. Skipping extraction.", missing_required)
         return pd.DataFrame()
     
     # Create a new dataframe with mapped columns
@@ -788,6 +811,8 @@ def clean_extracted_data(df, field_map, schema):
             extracted_df[field] = df[col].apply(
                 lambda x: validate_and_convert_value(x, field_schema)
             )
+            if field == "sku":
+                extracted_df[field] = canonicalize_sku_series(extracted_df[field])
     
     # Remove rows where required fields are missing
     for field in required_fields:
@@ -1004,7 +1029,237 @@ def normalize_pivot_table(df, pivot_structure):
     else:
         return pd.DataFrame()
 
-def extract_data(file, business_type="generic"):
+def discover_sheet_plan(xl, sheet, business_type, field_mappings, sample_every=1):
+    """
+    Run full discovery on a sheet: category, header row, pivot structure and field map.
+    Returns (plan, df) where df is the loaded sheet ready for cleaning. The plan is None
+    if the sheet couldn't be analyzed, and df is None if there is nothing to clean.
+    With sample_every > 1 only every sample_every-th row below the header is loaded.
+    """
+    # Try to read the sheet - skip if it causes errors
+    try:
+        # First read just the top rows to analyze, without a header so banner rows show up
+        df_top = xl.parse(sheet, header=None, nrows=HEADER_SCAN_ROWS)
+        # Blank margin columns (a table starting in column B) aren't part of the layout
+        df_top = df_top.dropna(axis=1, how="all")
+        df_sample = sample_from_top_rows(df_top)
+        if df_sample.empty or len(df_sample.columns) < 2:
+            return None, None
+            
+        # Ensure unique column names
+        df_sample.columns = ensure_unique_columns(df_sample.columns)
+        
+    except Exception as e:
+        logger.warning("Error reading sample from sheet '%s': %s", sheet, e)
+        return None, None
+        
+    # Detect most likely sheet category
+    sheet_category = detect_sheet_category(sheet, business_type)
+    if sheet_category == "unclassified":
+        # Sheet names decide the category, so this can be replayed without reading the sheet
+        return {"category": None}, None
+        
+    # Get schema for this category
+    schema = EXTRACTION_SCHEMAS[sheet_category]
+    required_fields = [f for f, s in schema.items() if s["required"]]
+    
+    # Debug info
+    logger.info("Processing sheet '%s' - Detected category: %s", sheet, sheet_category)
+    
+    # Identify the header row first so banner rows above a table don't look like a pivot
+    header_row = identify_header_row(df_top, required_fields, field_mappings)
+    logger.debug("Identified header row at index %s", header_row)
+    if header_row > 0:
+        df_sample = sample_from_top_rows(df_top.iloc[header_row:])
+        df_sample.columns = ensure_unique_columns(df_sample.columns)
+    
+    # Check if this might be a pivot table
+    is_pivot = is_pivot_table(df_sample)
+    pivot_structure = None
+    
+    if is_pivot:
+        logger.debug("Sheet '%s' appears to be a pivot table, attempting to normalize", sheet)
+        # Read the full sheet for pivot processing
+        df = parse_sheet(xl, sheet, header_row, sample_every)
+        
+        # Extract pivot structure
+        pivot_structure = extract_pivot_header_structure(df)
+        
+        # Transform pivot to normalized form
+        normalized_df = normalize_pivot_table(df, pivot_structure)
+        
+        # Continue processing with the normalized dataframe
+        if not normalized_df.empty:
+            df = normalized_df
+            logger.debug("Successfully normalized pivot table to %s rows", len(df))
+        else:
+            # Failed to normalize, try regular processing
+            is_pivot = False
+            pivot_structure = None
+            logger.debug("Failed to normalize pivot table, falling back to regular processing")
+    
+    if not is_pivot:
+        # Regular table processing - read the full sheet with the correct header row
+        df = parse_sheet(xl, sheet, header_row, sample_every)
+    
+    if df.empty:
+        logger.debug("Sheet '%s' is empty after header detection", sheet)
+        return None, None
+        
+    # Ensure unique column names again after full load
+    df.columns = ensure_unique_columns(df.columns)
+    
+    # Detect data types for disambiguation
+    column_types = detect_column_data_types(df)
+    
+    # Map columns to expected fields
+    field_map = map_columns_to_fields(df.columns, field_mappings, column_types, sheet_category, is_pivot)
+
+    plan = {
+        "category": sheet_category,
+        "is_pivot": bool(is_pivot),
+        "pivot_structure": pivot_structure,
+        "header_row": int(header_row),
+        "columns": read_plan_columns(xl, sheet, header_row),
+        "field_map": {str(col): field for col, field in field_map.items()}
+    }
+    return plan, df
+
+def sample_from_top_rows(df_top, nrows=50):
+    """
+    Rebuild the default header=0 sample from rows read with header=None,
+    so the top of a sheet only has to be parsed once.
+    """
+    if df_top.empty:
+        return pd.DataFrame()
+    
+    columns = [f"Unnamed: {i}" if pd.isna(v) else v for i, v in enumerate(df_top.iloc[0])]
+    sample = df_top.iloc[1:nrows + 1].infer_objects().reset_index(drop=True)
+    sample.columns = columns
+    return sample
+
+def read_plan_columns(xl, sheet, header_row):
+    """
+    Read only the header row of a sheet; this is the per-sheet part of a plan's fingerprint.
+    """
+    return ensure_unique_columns(xl.parse(sheet, header=header_row, nrows=0).columns)
+
+def has_sufficient_mapping(field_map, schema):
+    """
+    A sheet needs at least 2 mapped fields, including at least one required field.
+    """
+    required_fields = [f for f, s in schema.items() if s["required"]]
+    mapped_required = [f for c, f in field_map.items() if f in required_fields]
+    return len(field_map) >= 2 and bool(mapped_required)
+
+def parse_sheet(xl, sheet, header_row, sample_every=1):
+    """
+    Load a sheet below its header row, keeping every sample_every-th data row.
+    """
+    if sample_every <= 1:
+        return xl.parse(sheet, header=header_row)
+    return xl.parse(sheet, header=header_row,
+                    skiprows=lambda i: i > header_row and (i - header_row - 1) % sample_every != 0)
+
+def load_sheet_with_plan(xl, sheet, plan, sample_every=1):
+    """
+    Load a sheet the way its plan says (header row or pivot normalization), skipping discovery.
+    """
+    if plan["is_pivot"]:
+        df = normalize_pivot_table(parse_sheet(xl, sheet, plan["header_row"], sample_every),
+                                   plan["pivot_structure"])
+    else:
+        df = parse_sheet(xl, sheet, plan["header_row"], sample_every)
+    df.columns = ensure_unique_columns(df.columns)
+    return df
+
+def clean_sheet_with_plan(sheet, df, plan):
+    """
+    Clean and validate a loaded sheet using the plan's field map.
+    Returns the list of extracted records.
+    """
+    schema = EXTRACTION_SCHEMAS[plan["category"]]
+    field_map = plan["field_map"]
+
+    # Skip sheets with insufficient mappings (less than 2 fields or no required fields)
+    if not has_sufficient_mapping(field_map, schema):
+        logger.debug("Insufficient field mappings for sheet '%s' - skipping", sheet)
+        return []
+        
+    # Clean and validate data
+    cleaned_df = clean_extracted_data(df, field_map, schema)
+    
+    if cleaned_df.empty:
+        logger.debug("No valid data extracted from sheet '%s' after cleaning", sheet)
+        return []
+        
+    # Convert to clean records
+    records = convert_to_records(cleaned_df)
+    
+    if records:
+        logger.info("Extracted %s records from sheet '%s'", len(records), sheet)
+    else:
+        logger.debug("No valid records extracted from sheet '%s'", sheet)
+        
+    return records
+
+def apply_sheet_plan(xl, sheet, plan, sample_every=1):
+    """
+    Extract a sheet using a stored plan. Returns (sheet_category, records), with
+    (None, []) for sheets the plan leaves unclassified, or None if the sheet's header
+    no longer matches the plan and full discovery is needed.
+    """
+    if plan.get("category") is None:
+        return None, []
+
+    try:
+        if read_plan_columns(xl, sheet, plan["header_row"]) != plan["columns"]:
+            return None
+    except Exception as e:
+        logger.warning("Error checking plan for sheet '%s': %s", sheet, e)
+        return None
+
+    schema = EXTRACTION_SCHEMAS[plan["category"]]
+    if not has_sufficient_mapping(plan["field_map"], schema):
+        return plan["category"], []
+
+    logger.info("Processing sheet '%s' with stored extraction plan - category: %s", sheet, plan['category'])
+    df = load_sheet_with_plan(xl, sheet, plan, sample_every)
+    if df.empty:
+        logger.debug("Sheet '%s' is empty after header detection", sheet)
+        return plan["category"], []
+    return plan["category"], clean_sheet_with_plan(sheet, df, plan)
+
+def extract_sheet(xl, sheet, business_type, field_mappings, sample_every=1):
+    """
+    Run the full extraction pipeline (discovery, load and clean) on a single sheet.
+    Returns (sheet_category, records, plan); the plan is None if the sheet couldn't be planned.
+    """
+    plan, df = discover_sheet_plan(xl, sheet, business_type, field_mappings, sample_every)
+    if plan is None or df is None:
+        return None, [], plan
+    return plan["category"], clean_sheet_with_plan(sheet, df, plan), plan
+
+def add_sales_sketch(extracted_data, sales_sketch):
+    """
+    Add a sales sketch's state and approximate summary to the extraction result.
+    """
+    if sales_sketch.rows:
+        extracted_data["sales_sketch"] = sales_sketch.to_dict()
+        extracted_data["sales_summary"] = sales_sketch.summary()
+
+def order_sheets_by_value(sheet_names, business_type, dimensions):
+    """
+    Sheets in the order most useful for a partial result: sheets whose names place
+    them in a data category first, then smaller sheets (by XML size) before larger ones.
+    """
+    def value_key(sheet):
+        size = (dimensions.get(sheet) or {}).get("xml_bytes") or 0
+        return (detect_sheet_category(sheet, business_type) == "unclassified", size)
+    return sorted(sheet_names, key=value_key)
+
+def extract_data(file, business_type="generic", debug_logs=None, filename=None,
+                 sheet_sample_every=None, sample_every=1, deadline=None):
     """
     Enhanced extraction engine that:
     1. Uses business-type specific logic
@@ -1012,7 +1267,30 @@ def extract_data(file, business_type="generic"):
     3. Handles various date formats
     4. Provides better data validation and cleaning
     5. Handles pivot tables with intelligent structure detection
+    6. Reuses cached results for sheets whose content fingerprint is unchanged
+    7. Replays stored extraction plans for known workbook layouts
+    8. Sketches the sales history into 'sales_sketch' (mergeable state) and
+       'sales_summary' (approximate distinct counts, quantiles and top SKUs)
+
+    If a debug_logs dict is given, the processed and reused sheets are recorded in it.
+    CSV files are extracted in chunks by the CSV engine. To bound memory, CSV files
+    can be sampled to every sample_every-th row, and workbook sheets likewise by
+    sheet_sample_every ({sheet name: stride}; the None entry covers other sheets).
+
+    With a deadline (a time.monotonic() value), sheets are taken in order of
+    expected value and sheets not started when it passes are skipped (cached sheets
+    are still used). The result then has 'partial': True and the 'skipped_sheets';
+    CSV files stop between chunks.
     """
+    # Imported here because the CSV engine builds on this module
+    from src.csv_engine import is_csv_file, extract_csv_data
+    if is_csv_file(file, filename):
+        return extract_csv_data(file, business_type, filename, debug_logs, sample_every=sample_every,
+                                deadline=deadline)
+
+    # Fingerprint sheets before opening the workbook so unchanged sheets can be reused
+    fingerprints = compute_sheet_fingerprints(file)
+
     try:
         xl = pd.ExcelFile(file)
     except Exception as e:
@@ -1025,111 +1303,91 @@ def extract_data(file, business_type="generic"):
         "item_master": [],
         "unclassified": []
     }
+    reused_sheets = []
+    processed_sheets = []
+    planned_sheets = []
+    skipped_sheets = []
+    sales_sketch = SalesSketch()
     
     # Get field mappings for this business type
     field_mappings = get_field_mappings(business_type)
-    
+
+    # Look up the stored extraction plan for this workbook layout
+    template_key = compute_template_key(xl.sheet_names, business_type)
+    plan = load_extraction_plan(template_key)
+    plan_changed = plan is None
+    if plan is None:
+        plan = new_extraction_plan(template_key, xl.sheet_names, business_type)
+    
+    # Under a deadline, take the sheets most worth having first
+    sheet_order = xl.sheet_names
+    if deadline is not None:
+        sheet_order = order_sheets_by_value(xl.sheet_names, business_type, read_sheet_dimensions(file))
+
     # Process each sheet
-    for sheet in xl.sheet_names:
+    for sheet in sheet_order:
         try:
-            # Try to read the sheet - skip if it causes errors
-            try:
-                # First read just a sample to analyze
-                df_sample = xl.parse(sheet, nrows=50)
-                if df_sample.empty or len(df_sample.columns) < 2:
-                    continue
-                    
-                # Ensure unique column names
-                df_sample.columns = ensure_unique_columns(df_sample.columns)
-                
-            except Exception as e:
-                print(f"Error reading sample from sheet '{sheet}': {str(e)}")
-                continue
-                
-            # Detect most likely sheet category
-            sheet_category = detect_sheet_category(sheet, business_type)
-            if sheet_category == "unclassified":
+            fingerprint = fingerprints.get(sheet)
+            stride = (sheet_sample_every or {}).get(sheet, (sheet_sample_every or {}).get(None, 1))
+            cache_key = (fingerprint, business_type, stride)
+            cached = SHEET_RESULT_CACHE.get(cache_key) if fingerprint else None
+
+            if cached is not None:
+                sheet_category, records = cached
+                reused_sheets.append(sheet)
+                logger.info("Reusing cached extraction for unchanged sheet '%s'", sheet)
+            elif deadline_passed(deadline):
+                skipped_sheets.append(sheet)
                 continue
-                
-            # Get schema for this category
-            schema = EXTRACTION_SCHEMAS[sheet_category]
-            required_fields = [f for f, s in schema.items() if s["required"]]
-            
-            # Debug info
-            print(f"\nProcessing sheet '{sheet}' - Detected category: {sheet_category}")
-            
-            # Check if this might be a pivot table
-            is_pivot = is_pivot_table(df_sample)
-            
-            if is_pivot:
-                print(f"Sheet '{sheet}' appears to be a pivot table, attempting to normalize")
-                # Read the full sheet for pivot processing
-                df = xl.parse(sheet)
-                
-                # Extract pivot structure
-                pivot_structure = extract_pivot_header_structure(df)
-                
-                # Transform pivot to normalized form
-                normalized_df = normalize_pivot_table(df, pivot_structure)
-                
-                # Continue processing with the normalized dataframe
-                if not normalized_df.empty:
-                    df = normalized_df
-                    print(f"Successfully normalized pivot table to {len(df)} rows")
-                else:
-                    # Failed to normalize, try regular processing
-                    is_pivot = False
-                    print(f"Failed to normalize pivot table, falling back to regular processing")
-                    header_row = identify_header_row(df_sample, required_fields, field_mappings)
-                    df = xl.parse(sheet, header=header_row)
             else:
-                # Regular table processing - identify header row
-                header_row = identify_header_row(df_sample, required_fields, field_mappings)
-                print(f"Identified header row at index {header_row}")
-                
-                # Now read the full sheet with the correct header row
-                df = xl.parse(sheet, header=header_row)
-            
-            if df.empty:
-                print(f"Sheet '{sheet}' is empty after header detection")
-                continue
-                
-            # Ensure unique column names again after full load
-            df.columns = ensure_unique_columns(df.columns)
-            
-            # Detect data types for disambiguation
-            column_types = detect_column_data_types(df)
-            
-            # Map columns to expected fields
-            field_map = map_columns_to_fields(df.columns, field_mappings, column_types, sheet_category, is_pivot)
-            
-            # Skip sheets with insufficient mappings (less than 2 fields or no required fields)
-            mapped_required = [f for c, f in field_map.items() if f in required_fields]
-            if len(field_map) < 2 or not mapped_required:
-                print(f"Insufficient field mappings for sheet '{sheet}' - skipping")
-                continue
-                
-            # Clean and validate data
-            cleaned_df = clean_extracted_data(df, field_map, schema)
-            
-            if cleaned_df.empty:
-                print(f"No valid data extracted from sheet '{sheet}' after cleaning")
-                continue
-                
-            # Convert to clean records and add to results
-            records = convert_to_records(cleaned_df)
-            
+                # Replay the stored plan; fall back to full discovery if the header changed
+                result = None
+                sheet_plan = plan["sheets"].get(sheet)
+                if sheet_plan is not None:
+                    result = apply_sheet_plan(xl, sheet, sheet_plan, stride)
+
+                if result is not None:
+                    sheet_category, records = result
+                    planned_sheets.append(sheet)
+                else:
+                    sheet_category, records, sheet_plan = extract_sheet(xl, sheet, business_type, field_mappings,
+                                                                        stride)
+                    if sheet_plan is not None:
+                        plan["sheets"][sheet] = sheet_plan
+                        plan_changed = True
+
+                processed_sheets.append(sheet)
+                if fingerprint:
+                    SHEET_RESULT_CACHE.put(cache_key, (sheet_category, records))
+
             # Add non-empty records to appropriate category
-            if records:
-                print(f"Extracted {len(records)} records from sheet '{sheet}'")
+            if sheet_category and records:
                 extracted_data[sheet_category].extend(records)
-            else:
-                print(f"No valid records extracted from sheet '{sheet}'")
+                if sheet_category == "sales_history":
+                    sales_sketch.update(records)
                 
         except Exception as e:
-            print(f"Error processing sheet '{sheet}': {str(e)}")
+            logger.warning("Error processing sheet '%s': %s", sheet, e)
             continue
 
+    if plan_changed and plan["sheets"]:
+        save_extraction_plan(plan)
+
+    SHEETS_PROCESSED.inc(len(processed_sheets), outcome="extracted")
+    SHEETS_PROCESSED.inc(len(reused_sheets), outcome="reused")
+
+    if debug_logs is not None:
+        debug_logs['processed_sheets'] = processed_sheets
+        debug_logs['reused_sheets'] = reused_sheets
+        debug_logs['skipped_sheets'] = skipped_sheets
+        debug_logs['sheet_cache'] = SHEET_RESULT_CACHE.stats()
+        debug_logs['extraction_plan'] = {
+            "template_key": template_key,
+            "planned_sheets": planned_sheets,
+            "discovered_sheets": [s for s in processed_sheets if s not in planned_sheets],
+            "plan_updated": bool(plan_changed and plan["sheets"])
+        }
+
     # Ensure all values are JSON serializable
     for category in extracted_data:
         for i in range(len(extracted_data[category])):
@@ -1138,11 +1396,17 @@ def extract_data(file, business_type="generic"):
                     extracted_data[category][i][field] = float(value)
                 elif isinstance(value, (datetime, pd.Timestamp)):
                     extracted_data[category][i][field] = value.strftime("%Y-%m-%d")
-    
+
+    add_sales_sketch(extracted_data, sales_sketch)
+
     # Summary report
-    print("\n=== Extraction Summary ===")
-    for category, records in extracted_data.items():
-        print(f"{category}: {len(records)} records extracted")
-    print("=========================\n")
+    logger.info("Extraction summary: %s",
+                ", ".join(f"{category}: {len(records)} records" for category, records in extracted_data.items()
+                          if isinstance(records, list)))
+
+    if skipped_sheets:
+        logger.warning("Deadline passed - skipped sheets: %s", ', '.join(skipped_sheets))
+        extracted_data["partial"] = True
+        extracted_data["skipped_sheets"] = skipped_sheets
 
     return extracted_data
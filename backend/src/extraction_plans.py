@@ -0,0 +1,79 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Where extraction plans are persisted (one JSON file per workbook template); outside
+# the source tree unless EXTRACTION_PLAN_DIR points elsewhere
+EXTRACTION_PLAN_DIR = os.environ.get(
+    "EXTRACTION_PLAN_DIR", os.path.join(tempfile.gettempdir(), "inventory_extraction_plans")
+)
+
+def compute_template_key(sheet_names, business_type):
+    """
+    Structural fingerprint of a workbook layout: business type plus the ordered sheet names.
+    Header rows are checked per sheet when a plan is applied.
+    """
+    digest = hashlib.sha1()
+    digest.update(str(business_type).encode("utf-8") + b"\x00")
+    for name in sheet_names:
+        digest.update(str(name).encode("utf-8") + b"\x00")
+    return digest.hexdigest()
+
+def new_extraction_plan(template_key, sheet_names, business_type):
+    """
+    Create an empty extraction plan for a workbook template.
+    """
+    return {
+        "template_key": template_key,
+        "business_type": business_type,
+        "sheet_names": list(sheet_names),
+        "sheets": {},
+        "updated_at": None
+    }
+
+def _plan_path(template_key, plan_dir=None):
+    return os.path.join(plan_dir or EXTRACTION_PLAN_DIR, f"{template_key}.json")
+
+def load_extraction_plan(template_key, plan_dir=None):
+    """
+    Load a stored extraction plan. Returns None if there is no usable plan for this template.
+    """
+    path = _plan_path(template_key, plan_dir)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            plan = json.load(f)
+        if plan.get("template_key") != template_key or not isinstance(plan.get("sheets"), dict):
+            return None
+        return plan
+    except Exception as e:
+        logger.warning("Could not load extraction plan '%s': %s", path, e)
+        return None
+
+def save_extraction_plan(plan, plan_dir=None):
+    """
+    Persist an extraction plan. The file is replaced atomically so concurrent
+    requests never read a half-written plan.
+    """
+    plan_dir = plan_dir or EXTRACTION_PLAN_DIR
+    path = _plan_path(plan["template_key"], plan_dir)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    try:
+        os.makedirs(plan_dir, exist_ok=True)
+        plan["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(plan, f, indent=2)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning("Could not save extraction plan '%s': %s", path, e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
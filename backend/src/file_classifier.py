@@ -1,8 +1,14 @@
 import pandas as pd
 import numpy as np
 import warnings
+import logging
 from fuzzywuzzy import fuzz
 from collections import Counter
+from src.match_cache import best_fuzzy_match
+from src.metrics import timed_stage
+from src.deadline import deadline_passed
+
+logger = logging.getLogger(__name__)
 
 warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
 
@@ -232,24 +238,15 @@ def fuzzy_match(target, candidates, threshold=80):
         return None, 0
     
     target = str(target).strip().lower()
-    best_match = None
-    best_score = 0
     
-    for candidate in candidates:
-        # Try multiple scoring methods for more accurate matching
-        ratio_score = fuzz.ratio(target, candidate.lower())
-        partial_score = fuzz.partial_ratio(target, candidate.lower())
-        token_sort_score = fuzz.token_sort_ratio(target, candidate.lower())
-        
-        # Use the best score among the different methods
-        score = max(ratio_score, partial_score, token_sort_score)
-        
-        if score > best_score and score >= threshold:
-            best_score = score
-            best_match = candidate
+    # Scores come from the shared memo; the threshold is applied afterwards
+    best_match, best_score = best_fuzzy_match(target, candidates)
+    if best_match is None or best_score < threshold:
+        return None, 0
     
     return best_match, best_score
 
+@timed_stage("business_type")
 def detect_business_type(file):
     """
     Analyze sheet names and sample content to determine the most likely business type.
@@ -259,6 +256,26 @@ def detect_business_type(file):
         xl = pd.ExcelFile(file)
         sheets = xl.sheet_names
         
+        # Sample content from sheets to look for industry-specific terms
+        samples = []
+        for sheet in sheets[:min(5, len(sheets))]:  # Check first 5 sheets
+            try:
+                samples.append(xl.parse(sheet, nrows=50))  # Read sample rows
+            except:
+                continue
+        
+        return score_business_type(sheets, samples)
+        
+    except Exception as e:
+        logger.warning("Error in business type detection: %s", e)
+        return "generic"  # Fallback to generic in case of errors
+
+def score_business_type(sheets, samples):
+    """
+    Score each business type from sheet (or file) names and sampled dataframes.
+    Returns the most likely business type, or "generic" if there are no signals.
+    """
+    try:
         # Initialize scores for each business type
         scores = {
             "retail": 0,
@@ -285,11 +302,10 @@ def detect_business_type(file):
                                              "warehouse", "logistics", "fulfillment"]):
                 scores["distribution"] += 2
         
-        # Sample content from sheets to look for industry-specific terms
+        # Collect sampled values to look for industry-specific terms
         product_terms = set()
-        for sheet in sheets[:min(5, len(sheets))]:  # Check first 5 sheets
+        for df in samples:
             try:
-                df = xl.parse(sheet, nrows=50)  # Read sample rows
                 for col in df.columns:
                     sample_values = df[col].astype(str).str.lower().tolist()[:20]  # Sample values
                     product_terms.update(sample_values)
@@ -328,13 +344,14 @@ def detect_business_type(file):
         return max(scores.items(), key=lambda x: x[1])[0]
         
     except Exception as e:
-        print(f"Error in business type detection: {str(e)}")
+        logger.warning("Error in business type detection: %s", e)
         return "generic"  # Fallback to generic in case of errors
 
-def analyze_column_matches(xl, sheet_category):
+def analyze_column_matches(xl, sheet_category, deadline=None):
     """
     Analyze how well the columns in each sheet match expected fields for this category.
     Returns a dictionary with matched fields and their confidence.
+    Sheets left when the deadline passes are not analyzed.
     """
     try:
         sheets = xl.sheet_names
@@ -359,6 +376,8 @@ def analyze_column_matches(xl, sheet_category):
         all_target_fields = required_fields + optional_fields
         
         for sheet in sheets:
+            if deadline_passed(deadline):
+                break
             try:
                 df = xl.parse(sheet, nrows=10)  # Read sample rows
                 if df.empty or len(df.columns) < 2:  # Skip empty or single-column sheets
@@ -400,13 +419,13 @@ def analyze_column_matches(xl, sheet_category):
                             "total_match_count": len(sheet_matches)
                         })
             except Exception as e:
-                print(f"Error analyzing columns in sheet '{sheet}': {str(e)}")
+                logger.warning("Error analyzing columns in sheet '%s': %s", sheet, e)
                 continue
                 
         return column_matches
         
     except Exception as e:
-        print(f"Error in column analysis: {str(e)}")
+        logger.warning("Error in column analysis: %s", e)
         return []
 
 def calculate_confidence(sheet_matches, column_matches):
@@ -441,7 +460,7 @@ def calculate_confidence(sheet_matches, column_matches):
     # Ensure score is between 0 and 1
     return min(max(total_score, 0.0), 1.0)
 
-def classify_file(file):
+def classify_file(file, filename=None, deadline=None):
     """
     Enhanced classifier that:
     1. Detects business type
@@ -449,7 +468,17 @@ def classify_file(file):
     3. Performs in-depth sheet and column analysis
     4. Calculates nuanced confidence score
     5. Provides detailed justification
+
+    CSV files are classified by the CSV engine as a single pseudo-sheet.
+    If the deadline (a time.monotonic() value) passes during column analysis, the
+    remaining categories are scored from sheet names only and the result is marked
+    'partial' with the 'skipped_categories'.
     """
+    # Imported here because the CSV engine builds on this module
+    from src.csv_engine import is_csv_file, classify_csv
+    if is_csv_file(file, filename):
+        return classify_csv(file, filename)
+
     try:
         xl = pd.ExcelFile(file)
         sheets = xl.sheet_names
@@ -496,8 +525,16 @@ def classify_file(file):
     
     # Column recognition - Check for expected fields
     all_column_matches = {}
+    skipped_categories = []
+    partial = False
     for category, matches in category_matches.items():
-        column_matches = analyze_column_matches(xl, category)
+        if deadline_passed(deadline):
+            skipped_categories.append(category)
+            partial = True
+            continue
+        column_matches = analyze_column_matches(xl, category, deadline)
+        # The analysis may have stopped before the last sheet
+        partial = partial or deadline_passed(deadline)
         if column_matches:
             all_column_matches[category] = column_matches
             
@@ -551,10 +588,14 @@ def classify_file(file):
     # Combine all justification parts
     justification = '. '.join(justification_parts)
     
-    return {
+    result = {
     'is_inventory_planning': bool(is_inventory_planning),
     'confidence': float(overall_confidence), 
     'justification': justification,
     'business_type': str(business_type), 
     'category_confidence': {k: float(v) for k, v in category_confidence.items()} 
-}
\ No newline at end of file
+}
+    if partial:
+        result['partial'] = True
+        result['skipped_categories'] = skipped_categories
+    return result
\ No newline at end of file
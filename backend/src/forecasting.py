@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+
+from src.planning import bucket_sales_periods, encode_sku_indexes, estimate_period_days
+
+# Periods forecast ahead, and periods held out at the end of the history to score the models
+FORECAST_HORIZON = 4
+FORECAST_HOLDOUT_PERIODS = 4
+
+# Model parameters
+FORECAST_MA_WINDOW = 4
+FORECAST_SES_ALPHA = 0.3
+
+# Season length in periods by period length in days (daily, weekly, monthly data)
+SEASON_LENGTHS = [(1, 7), (7, 52), (28, 12)]
+
+# Above this many SKUs the matrix is split into row blocks forecast on the worker pool
+FORECAST_PARALLEL_MIN_SKUS = 200000
+FORECAST_BLOCK_ROWS = 100000
+
+FORECAST_MODELS = ["moving_average", "exponential_smoothing", "seasonal_naive"]
+
+def build_demand_matrix(sales, sku_dictionary=None, frequency=None):
+    """
+    Pivot sales (records or a dataframe with the same fields) into a dense
+    SKU x period matrix of summed quantities. Periods are the calendar buckets of
+    src.planning.bucket_sales_periods (frequency "W" or "M" forces one), so a SKU
+    without sales in a period has zero demand there.
+    Returns (matrix, sku_labels, period_dates), with the start date of each period.
+    """
+    if not isinstance(sales, pd.DataFrame):
+        sales = pd.DataFrame.from_records(sales, columns=["sku", "time_period", "quantity"])
+    (sku_index,), sku_labels = encode_sku_indexes([sales], sku_dictionary)
+
+    columns, period_dates, _ = bucket_sales_periods(sales["time_period"], frequency)
+    if len(period_dates) == 0:
+        return np.zeros((0, 0)), sku_labels[:0], period_dates
+    period_count = len(period_dates)
+    rows = columns >= 0
+
+    # Only SKUs that appear in the sales get a row
+    used_skus, row_index = np.unique(sku_index[rows], return_inverse=True)
+    shape = (len(used_skus), period_count)
+    cells = row_index * shape[1] + columns[rows]
+    matrix = np.bincount(cells, weights=sales["quantity"].to_numpy(dtype=float)[rows],
+                         minlength=shape[0] * shape[1]).reshape(shape)
+    return matrix, sku_labels[used_skus], period_dates
+
+def season_length(period_days, period_count):
+    """
+    Season length in periods for the data's period length, or None if the history
+    is too short to hold a full season plus the holdout.
+    """
+    length = None
+    for min_days, periods in SEASON_LENGTHS:
+        if period_days >= min_days:
+            length = periods
+    if length is None or period_count < length + FORECAST_HOLDOUT_PERIODS:
+        return None
+    return length
+
+def forecast_models(history, horizon, season):
+    """
+    Forecast every row of a SKU x period matrix with each model at once.
+    Returns {model: (rows x horizon) forecasts}; seasonal naive is left out when
+    there is no season.
+    """
+    periods = history.shape[1]
+    window = min(FORECAST_MA_WINDOW, periods)
+    forecasts = {
+        "moving_average": np.repeat(history[:, -window:].mean(axis=1, keepdims=True), horizon, axis=1)
+    }
+
+    # Exponential smoothing runs along the (short) time axis, across all SKUs per step
+    level = history[:, 0].copy()
+    for t in range(1, periods):
+        level += FORECAST_SES_ALPHA * (history[:, t] - level)
+    forecasts["exponential_smoothing"] = np.repeat(level[:, None], horizon, axis=1)
+
+    if season:
+        last_season = history[:, periods - season:]
+        forecasts["seasonal_naive"] = np.tile(last_season, (1, horizon // season + 1))[:, :horizon]
+    return forecasts
+
+def forecast_block(matrix, horizon, season):
+    """
+    Score the models on a holdout at the end of the history, pick the model with the
+    lowest mean absolute error per SKU and refit it on the full history.
+    Returns (forecasts, errors, best model index per row).
+    """
+    holdout = min(FORECAST_HOLDOUT_PERIODS, matrix.shape[1] - 1)
+    models = [m for m in FORECAST_MODELS if season or m != "seasonal_naive"]
+
+    errors = {}
+    if holdout > 0:
+        train, actual = matrix[:, :-holdout], matrix[:, -holdout:]
+        for model, predicted in forecast_models(train, holdout, season).items():
+            absolute = np.abs(predicted - actual)
+            total = actual.sum(axis=1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                wape = np.where(total > 0, absolute.sum(axis=1) / total, np.nan)
+            errors[model] = {"mae": absolute.mean(axis=1), "wape": wape}
+
+    full = forecast_models(matrix, horizon, season)
+    stacked = np.stack([full[m] for m in models])
+    if errors:
+        best = np.argmin(np.stack([errors[m]["mae"] for m in models]), axis=0)
+    else:
+        best = np.zeros(matrix.shape[0], dtype=np.int64)
+    return stacked[best, np.arange(matrix.shape[0])], errors, best
+
+def _forecast_block_worker(args):
+    return forecast_block(*args)
+
+def forecast_matrix(matrix, horizon, season):
+    """
+    Forecast all rows, spreading row blocks over the worker pool for very large catalogs
+    (serially when already running in a pool worker).
+    """
+    if matrix.shape[0] < FORECAST_PARALLEL_MIN_SKUS:
+        return forecast_block(matrix, horizon, season)
+
+    # Imported here so the batch module's pool is only created when it is needed
+    from src.batch import map_on_pool
+    blocks = [(matrix[i:i + FORECAST_BLOCK_ROWS], horizon, season)
+              for i in range(0, matrix.shape[0], FORECAST_BLOCK_ROWS)]
+    results = map_on_pool(_forecast_block_worker, blocks)
+
+    forecasts = np.concatenate([r[0] for r in results])
+    errors = {
+        model: {metric: np.concatenate([r[1][model][metric] for r in results]) for metric in ("mae", "wape")}
+        for model in results[0][1]
+    }
+    best = np.concatenate([r[2] for r in results])
+    return forecasts, errors, best
+
+def future_period_labels(period_dates, period_days, horizon):
+    """
+    Dates of the forecast periods following the last period in the history.
+    """
+    last = pd.Timestamp(period_dates[-1])
+    if 28 <= period_days <= 31:
+        dates = [last + pd.DateOffset(months=k) for k in range(1, horizon + 1)]
+    else:
+        dates = [last + pd.Timedelta(days=period_days * k) for k in range(1, horizon + 1)]
+    return [d.strftime("%Y-%m-%d") for d in dates]
+
+def forecast_demand(extracted_data, horizon=FORECAST_HORIZON):
+    """
+    Forecast demand for every SKU in the sales history.
+    Returns a result with per-SKU forecasts and holdout errors, or None if there is
+    no dated sales history.
+    """
+    sales_records = extracted_data.get("sales_history")
+    if not sales_records:
+        return None
+
+    matrix, skus, period_dates = build_demand_matrix(sales_records, extracted_data.get("sku_dictionary"))
+    if matrix.size == 0:
+        return None
+
+    period_days = estimate_period_days(pd.Series(period_dates))
+    season = season_length(period_days, matrix.shape[1])
+    forecasts, errors, best = forecast_matrix(matrix, horizon, season)
+    models = [m for m in FORECAST_MODELS if season or m != "seasonal_naive"]
+
+    # Convert to lists once; NaN (no holdout demand) becomes None
+    forecast_lists = np.round(forecasts, 2).tolist()
+    error_lists = {
+        model: {
+            metric: [None if np.isnan(v) else v for v in np.round(values, 4).tolist()]
+            for metric, values in metrics.items()
+        }
+        for model, metrics in errors.items()
+    }
+    best_models = [models[i] for i in best.tolist()]
+    items = []
+    for row, sku in enumerate(skus):
+        items.append({
+            "sku": sku,
+            "model": best_models[row],
+            "forecast": forecast_lists[row],
+            "errors": {
+                model: {metric: values[row] for metric, values in metrics.items()}
+                for model, metrics in error_lists.items()
+            }
+        })
+
+    return {
+        "summary": {
+            "skus": int(matrix.shape[0]),
+            "periods": int(matrix.shape[1]),
+            "period_days": period_days,
+            "season_length": season,
+            "horizon": horizon,
+            "forecast_periods": future_period_labels(period_dates, period_days, horizon),
+            "models_selected": {m: int((best == i).sum()) for i, m in enumerate(models)}
+        },
+        "items": items
+    }
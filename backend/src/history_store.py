@@ -0,0 +1,179 @@
+import sqlite3
+from datetime import datetime
+from itertools import islice
+
+from src.extract_data import EXTRACTION_SCHEMAS
+from src.errors import HistoryStoreError
+
+# Categories that are appended to the history store on every upload
+HISTORY_CATEGORIES = ["inventory_on_hand", "sales_history", "purchase_orders", "item_master"]
+
+# How schema types are stored in SQLite (dates are kept as ISO "YYYY-MM-DD" text)
+SQLITE_TYPES = {
+    "str": "TEXT",
+    "float": "REAL",
+    "datetime": "TEXT",
+    "bool": "INTEGER"
+}
+
+# The date field that is indexed for each category (if it has one)
+HISTORY_DATE_FIELDS = {
+    "sales_history": "time_period",
+    "purchase_orders": "arrival_date"
+}
+
+# How numeric fields are aggregated when building a time series
+HISTORY_AGGREGATES = {
+    "quantity": "SUM",
+    "revenue": "SUM",
+    "cost": "AVG",
+    "price": "AVG"
+}
+
+# Rows per executemany() call; each upload is still a single transaction
+INSERT_BATCH_SIZE = 50000
+
+def connect_history_store(db_path):
+    """
+    Open the history database and make sure all tables and indexes exist.
+    """
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-65536")
+        create_history_schema(conn)
+        return conn
+    except sqlite3.Error as e:
+        raise HistoryStoreError(f"Could not open history store: {str(e)}", {"db_path": str(db_path)})
+
+def create_history_schema(conn):
+    """
+    Create the snapshot table plus one table per category, built from EXTRACTION_SCHEMAS,
+    with indexes on sku, location and the category's date field.
+    """
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS snapshots ("
+        "snapshot_id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "source TEXT, business_type TEXT, uploaded_at TEXT NOT NULL)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_uploaded_at ON snapshots (uploaded_at)")
+
+    for category in HISTORY_CATEGORIES:
+        schema = EXTRACTION_SCHEMAS[category]
+        columns = ", ".join(f"{field} {SQLITE_TYPES[info['type']]}" for field, info in schema.items())
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {category} ("
+            f"snapshot_id INTEGER NOT NULL REFERENCES snapshots (snapshot_id), {columns})"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{category}_sku ON {category} (sku, snapshot_id)")
+        if "location" in schema:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{category}_location ON {category} (location)")
+        date_field = HISTORY_DATE_FIELDS.get(category)
+        if date_field:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{category}_date ON {category} ({date_field})")
+    conn.commit()
+
+def _record_rows(snapshot_id, records, fields):
+    """
+    Lazily turn extracted records into tuples in table column order.
+    """
+    for record in records:
+        yield (snapshot_id,) + tuple(record.get(field) for field in fields)
+
+def append_snapshot(db_path, extracted_data, source=None, business_type=None):
+    """
+    Append one upload's extracted records to the history store as a new snapshot.
+    All categories are written in a single transaction using batched inserts.
+    Returns the snapshot id and the number of rows written per category.
+    """
+    conn = connect_history_store(db_path)
+    try:
+        row_counts = {}
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO snapshots (source, business_type, uploaded_at) VALUES (?, ?, ?)",
+                (source, business_type, datetime.now().isoformat(timespec="seconds"))
+            )
+            snapshot_id = cursor.lastrowid
+
+            for category in HISTORY_CATEGORIES:
+                records = extracted_data.get(category) or []
+                fields = list(EXTRACTION_SCHEMAS[category].keys())
+                placeholders = ", ".join("?" for _ in range(len(fields) + 1))
+                sql = f"INSERT INTO {category} (snapshot_id, {', '.join(fields)}) VALUES ({placeholders})"
+
+                rows = _record_rows(snapshot_id, records, fields)
+                while True:
+                    batch = list(islice(rows, INSERT_BATCH_SIZE))
+                    if not batch:
+                        break
+                    conn.executemany(sql, batch)
+                row_counts[category] = len(records)
+
+        return {"snapshot_id": snapshot_id, "rows": row_counts}
+    except sqlite3.Error as e:
+        raise HistoryStoreError(f"Could not append snapshot: {str(e)}", {"source": source})
+    finally:
+        conn.close()
+
+def list_snapshots(db_path):
+    """
+    List all stored snapshots, oldest first.
+    """
+    conn = connect_history_store(db_path)
+    try:
+        cursor = conn.execute(
+            "SELECT snapshot_id, source, business_type, uploaded_at FROM snapshots ORDER BY uploaded_at, snapshot_id"
+        )
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        raise HistoryStoreError(f"Could not list snapshots: {str(e)}", {"db_path": str(db_path)})
+    finally:
+        conn.close()
+
+def query_sku_history(db_path, sku, category="inventory_on_hand", location=None):
+    """
+    Build the time series of a SKU across snapshots for one category.
+    Rows are grouped by snapshot, location and the category's date field;
+    numeric fields are aggregated according to HISTORY_AGGREGATES.
+    """
+    if category not in HISTORY_CATEGORIES:
+        raise HistoryStoreError(f"Unknown history category: {category}", {"category": category})
+
+    schema = EXTRACTION_SCHEMAS[category]
+    group_fields = ["s.snapshot_id", "s.source", "s.uploaded_at"]
+    if "location" in schema:
+        group_fields.append("t.location")
+    date_field = HISTORY_DATE_FIELDS.get(category)
+    if date_field:
+        group_fields.append(f"t.{date_field}")
+
+    aggregates = [
+        f"{HISTORY_AGGREGATES[field]}(t.{field}) AS {field}"
+        for field in schema if field in HISTORY_AGGREGATES
+    ]
+
+    sql = (
+        f"SELECT {', '.join(group_fields + aggregates)}, COUNT(*) AS record_count "
+        f"FROM {category} t JOIN snapshots s ON s.snapshot_id = t.snapshot_id "
+        f"WHERE t.sku = ?"
+    )
+    params = [str(sku)]
+    if location is not None and "location" in schema:
+        sql += " AND t.location = ?"
+        params.append(location)
+    sql += f" GROUP BY {', '.join(group_fields)} ORDER BY s.uploaded_at, s.snapshot_id"
+    if date_field:
+        sql += f", t.{date_field}"
+
+    conn = connect_history_store(db_path)
+    try:
+        cursor = conn.execute(sql, params)
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        raise HistoryStoreError(f"History query failed: {str(e)}", {"sku": str(sku), "category": category})
+    finally:
+        conn.close()
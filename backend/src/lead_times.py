@@ -0,0 +1,113 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from src.planning import PLANNING_LEAD_TIME_DAYS
+
+# Percentiles reported for each lead time distribution
+LEAD_TIME_PERCENTILES = [0.5, 0.9, 0.95]
+
+# A SKU needs this many received orders before its own lead time is used for planning;
+# otherwise its vendor's (then the overall) lead time is used
+LEAD_TIME_MIN_SAMPLES = 3
+
+def received_lead_times(purchase_orders, as_of=None, target_days=PLANNING_LEAD_TIME_DAYS):
+    """
+    Lead time in days (order date to arrival date) for every received purchase order
+    line. Lines count as received when has_arrived is true, or when it is missing and
+    the arrival date has passed. Returns a dataframe with sku, vendor, order_date,
+    lead_time_days and on_time (lead time within target_days), and the number of open
+    lines past their arrival date.
+    """
+    orders = pd.DataFrame.from_records(purchase_orders or [],
+                                       columns=["sku", "vendor", "order_date", "arrival_date", "has_arrived"])
+    today = pd.Timestamp(as_of or date.today()).normalize()
+    order_date = pd.to_datetime(orders["order_date"], errors="coerce")
+    arrival_date = pd.to_datetime(orders["arrival_date"], errors="coerce")
+
+    arrived = orders["has_arrived"].eq(True) | (orders["has_arrived"].isna() & (arrival_date <= today))
+    overdue_open = int((orders["has_arrived"].eq(False) & (arrival_date < today)).sum())
+
+    lead_time = (arrival_date - order_date).dt.days
+    valid = arrived & lead_time.notna() & (lead_time >= 0)
+    received = pd.DataFrame({
+        "sku": orders["sku"][valid],
+        "vendor": orders["vendor"][valid].fillna("unknown"),
+        "order_date": order_date[valid],
+        "lead_time_days": lead_time[valid].astype(float)
+    })
+    received["on_time"] = received["lead_time_days"] <= target_days
+    return received, overdue_open
+
+def lead_time_distribution(received, key):
+    """
+    Count, mean, standard deviation, percentiles, range and on-time rate of lead
+    times per value of key ("vendor" or "sku"), as one grouped aggregation.
+    """
+    grouped = received.groupby(key, sort=True)
+    stats = grouped["lead_time_days"].agg(["count", "mean", "std", "min", "max"])
+    percentiles = grouped["lead_time_days"].quantile(LEAD_TIME_PERCENTILES).unstack()
+    percentiles.columns = [f"p{int(round(q * 100))}" for q in percentiles.columns]
+    stats = stats.join(percentiles)
+    stats["on_time_rate"] = grouped["on_time"].mean()
+    stats["std"] = stats["std"].fillna(0.0)
+    return stats
+
+def planning_lead_times(received, sku_stats, vendor_stats):
+    """
+    Lead time mean and standard deviation to plan each SKU with: its own history when
+    it has LEAD_TIME_MIN_SAMPLES received orders, else its most recent vendor's,
+    else the overall distribution. Returns a dataframe indexed by sku.
+    """
+    overall_mean = received["lead_time_days"].mean()
+    overall_std = received["lead_time_days"].std() if len(received) > 1 else 0.0
+
+    plan = pd.DataFrame(index=sku_stats.index)
+    # Most recent vendor by order date, whatever order the lines were uploaded in
+    plan["vendor"] = received.sort_values("order_date", kind="stable").groupby("sku")["vendor"].last()
+    vendor_mean = plan["vendor"].map(vendor_stats["mean"])
+    vendor_std = plan["vendor"].map(vendor_stats["std"])
+
+    own = sku_stats["count"] >= LEAD_TIME_MIN_SAMPLES
+    has_vendor = vendor_stats["count"].reindex(plan["vendor"]).to_numpy() >= LEAD_TIME_MIN_SAMPLES
+    plan["lead_time_days"] = np.select([own, has_vendor], [sku_stats["mean"], vendor_mean], overall_mean)
+    plan["lead_time_std_days"] = np.select([own, has_vendor], [sku_stats["std"], vendor_std], overall_std)
+    plan["source"] = np.select([own, has_vendor], ["sku", "vendor"], "overall")
+    return plan
+
+def _stats_records(stats, key):
+    records = stats.round(2).reset_index().rename(columns={"index": key})
+    records["count"] = records["count"].astype(int)
+    return records.to_dict(orient="records")
+
+def analyze_lead_times(extracted_data, as_of=None, target_days=PLANNING_LEAD_TIME_DAYS):
+    """
+    Lead time analytics over the purchase order history: distributions per vendor and
+    per SKU, plus the per-SKU lead times used for safety stock.
+    Returns (report, planning lead times dataframe), or (None, None) without any
+    received purchase orders that have both dates.
+    """
+    received, overdue_open = received_lead_times(extracted_data.get("purchase_orders"), as_of, target_days)
+    if received.empty:
+        return None, None
+
+    vendor_stats = lead_time_distribution(received, "vendor")
+    sku_stats = lead_time_distribution(received, "sku")
+    planning = planning_lead_times(received, sku_stats, vendor_stats)
+
+    report = {
+        "summary": {
+            "received_lines": int(len(received)),
+            "overdue_open_lines": overdue_open,
+            "target_days": target_days,
+            "mean_days": round(float(received["lead_time_days"].mean()), 2),
+            "on_time_rate": round(float(received["on_time"].mean()), 4),
+            "vendors": int(len(vendor_stats)),
+            "skus": int(len(sku_stats)),
+            "planning_sources": {k: int(v) for k, v in planning["source"].value_counts().items()}
+        },
+        "vendors": _stats_records(vendor_stats, "vendor"),
+        "skus": _stats_records(sku_stats, "sku")
+    }
+    return report, planning
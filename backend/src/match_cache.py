@@ -0,0 +1,122 @@
+import threading
+from collections import Counter
+from fuzzywuzzy import fuzz
+from src.cache import LRUCache
+from src.metrics import REGISTRY, FUZZY_COMPARISONS
+
+# Process-wide memo of header-to-candidate match decisions, shared by the
+# classifier and the extraction engine
+MATCH_CACHE_MAX_ENTRIES = 200000
+MATCH_CACHE = LRUCache(MATCH_CACHE_MAX_ENTRIES)
+REGISTRY.register_cache("match", MATCH_CACHE)
+
+# Candidate lists are interned to small integer ids so cache keys stay compact.
+# The number of distinct lists is fixed by the mapping tables, so this stays small.
+_CANDIDATE_SET_IDS = {}
+_CANDIDATE_SET_LOCK = threading.Lock()
+
+# Lowercased, de-duplicated candidates with lengths and character counts, per candidate set
+_COMPILED_CANDIDATES = {}
+
+def candidate_set_id(candidates):
+    """
+    Return a stable integer id for a list of candidate strings.
+    """
+    key = tuple(candidates)
+    set_id = _CANDIDATE_SET_IDS.get(key)
+    if set_id is None:
+        with _CANDIDATE_SET_LOCK:
+            set_id = _CANDIDATE_SET_IDS.setdefault(key, len(_CANDIDATE_SET_IDS))
+    return set_id
+
+def best_fuzzy_match(target, candidates):
+    """
+    Best candidate for an already normalized target, scored as the max of
+    ratio, partial_ratio and token_sort_ratio. Returns (match, score) before any
+    threshold is applied, so one cached decision serves every threshold.
+    """
+    key = ("best", target, candidate_set_id(candidates))
+    result = MATCH_CACHE.get(key)
+    if result is not None:
+        return result
+
+    best_match = None
+    best_score = 0
+    for candidate in candidates:
+        candidate_lower = candidate.lower()
+        score = max(
+            fuzz.ratio(target, candidate_lower),
+            fuzz.partial_ratio(target, candidate_lower),
+            fuzz.token_sort_ratio(target, candidate_lower)
+        )
+        if score > best_score:
+            best_score = score
+            best_match = candidate
+
+    FUZZY_COMPARISONS.inc(3 * len(candidates), kind="header")
+    result = (best_match, best_score)
+    MATCH_CACHE.put(key, result)
+    return result
+
+def compile_candidates(candidates):
+    """
+    Return (set_id, compiled) for a candidate list, where compiled holds the set of
+    lowercased candidates for exact lookups and (text, length, char counts) entries
+    used to bound fuzz.ratio before running it.
+    """
+    set_id = candidate_set_id(candidates)
+    compiled = _COMPILED_CANDIDATES.get(set_id)
+    if compiled is None:
+        lowered = list(dict.fromkeys(c.lower() for c in candidates))
+        compiled = {
+            "exact": frozenset(lowered),
+            "entries": [(c, len(c), Counter(c)) for c in lowered]
+        }
+        _COMPILED_CANDIDATES[set_id] = compiled
+    return set_id, compiled
+
+def ratio_match_any(value, candidates, threshold):
+    """
+    Whether fuzz.ratio of a normalized cell value reaches the threshold for any candidate.
+    Candidates whose length or shared characters make the threshold unreachable are
+    skipped without running the matcher.
+    """
+    set_id, compiled = compile_candidates(candidates)
+    if value in compiled["exact"]:
+        return True
+
+    key = ("ratio", value, set_id, threshold)
+    result = MATCH_CACHE.get(key)
+    if result is not None:
+        return result
+
+    result = False
+    comparisons = 0
+    value_len = len(value)
+    value_chars = None
+    for candidate, candidate_len, candidate_chars in compiled["entries"]:
+        total_len = value_len + candidate_len
+        if total_len == 0 or round(200 * min(value_len, candidate_len) / total_len) < threshold:
+            continue
+        if value_chars is None:
+            value_chars = Counter(value)
+        shared = sum((value_chars & candidate_chars).values())
+        if round(200 * shared / total_len) < threshold:
+            continue
+        comparisons += 1
+        if fuzz.ratio(value, candidate) >= threshold:
+            result = True
+            break
+
+    if comparisons:
+        FUZZY_COMPARISONS.inc(comparisons, kind="cell")
+    MATCH_CACHE.put(key, result)
+    return result
+
+def match_cache_stats():
+    """
+    Hit-rate counters for the shared match memo.
+    """
+    stats = MATCH_CACHE.stats()
+    stats["candidate_sets"] = len(_CANDIDATE_SET_IDS)
+    return stats
@@ -0,0 +1,195 @@
+import math
+import os
+import sys
+import threading
+import tracemalloc
+import weakref
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from src.sheet_fingerprint import read_sheet_dimensions
+
+# Per-request memory budget; uploads estimated above it are sampled instead of loaded whole
+MEMORY_BUDGET_BYTES = int(float(os.environ.get("INVENTORY_MEMORY_BUDGET_MB", "2048")) * 1024 * 1024)
+
+# Estimated peak bytes per worksheet cell (data frames, cleaned copies, records and the JSON response)
+MEMORY_BYTES_PER_CELL = 300
+
+# Estimated peak bytes per byte of a CSV file, which is streamed but whose records are kept
+MEMORY_BYTES_PER_CSV_BYTE = 25
+
+# Sheets that declare no used range, and legacy .xls files, are sized from their bytes
+MEMORY_XML_BYTES_PER_CELL = 40
+MEMORY_XLS_BYTES_PER_CELL = 10
+
+# Column count assumed when a sheet's width is unknown
+MEMORY_ASSUMED_COLUMNS = 20
+
+# Sampled workbooks still keep at least this many rows per sheet
+MEMORY_MIN_SAMPLE_ROWS = 1000
+
+# Trace Python allocations with tracemalloc for exact per-stage peaks. Slower, and the
+# trace is process-wide, so it is only meaningful with one request per worker process.
+MEMORY_TRACE_ALLOCATIONS = os.environ.get("INVENTORY_MEMORY_TRACE", "0") == "1"
+
+def _mb(value):
+    return round(value / (1024 * 1024), 1) if value is not None else None
+
+def current_rss_bytes():
+    """
+    Resident set size of this process, or None where /proc isn't available.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def peak_rss_bytes():
+    """
+    Highest resident set size this process has reached, or None if unknown.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def _file_size(file):
+    position = file.tell()
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(position)
+    return size
+
+def estimate_upload_memory(file, filename=None):
+    """
+    Estimate the peak memory of processing an upload, from sheet dimensions for xlsx
+    workbooks and from the file size otherwise. Returns a dict with the file kind,
+    'estimated_bytes' and, for workbooks, rows and columns per sheet.
+    """
+    # Imported here because the CSV engine builds on the extraction modules
+    from src.csv_engine import is_csv_file
+    size = _file_size(file)
+    if is_csv_file(file, filename):
+        return {"kind": "csv", "file_bytes": size, "estimated_bytes": size * MEMORY_BYTES_PER_CSV_BYTE}
+
+    dimensions = read_sheet_dimensions(file)
+    if not dimensions:
+        # Legacy .xls, or a package we couldn't read: one pseudo-sheet sized from the file
+        dimensions = {None: {"rows": None, "columns": None, "xml_bytes": None}}
+        cells = size // MEMORY_XLS_BYTES_PER_CELL
+        kind = "xls"
+    else:
+        cells = None
+        kind = "xlsx"
+
+    sheets = {}
+    for sheet, entry in dimensions.items():
+        rows, columns = entry["rows"], entry["columns"]
+        if rows is None or columns is None:
+            sheet_cells = cells if cells is not None else entry["xml_bytes"] // MEMORY_XML_BYTES_PER_CELL
+            columns = columns or MEMORY_ASSUMED_COLUMNS
+            rows = max(1, sheet_cells // columns)
+        sheets[sheet] = {"rows": rows, "columns": columns}
+    total_cells = sum(s["rows"] * s["columns"] for s in sheets.values())
+    return {"kind": kind, "file_bytes": size, "estimated_bytes": total_cells * MEMORY_BYTES_PER_CELL,
+            "sheets": sheets}
+
+def _sampled_cells(sheets, max_rows):
+    return sum(min(s["rows"], max_rows) * s["columns"] for s in sheets.values())
+
+def plan_memory_mode(estimate, budget=MEMORY_BUDGET_BYTES):
+    """
+    Choose how to process an upload within the memory budget:
+    'full' when the estimate fits; 'streaming_sample' for CSV files, which keep every
+    sample_every-th row; 'stride_sample' for workbooks, which keep every
+    sheet_sample_every[sheet]-th row so each sheet keeps about max_rows rows, with
+    max_rows chosen so the sampled estimate fits.
+    """
+    mode = {"budget_bytes": budget, "estimated_bytes": estimate["estimated_bytes"]}
+    if estimate["estimated_bytes"] <= budget:
+        mode["mode"] = "full"
+        return mode
+
+    if estimate["kind"] == "csv":
+        mode["mode"] = "streaming_sample"
+        mode["sample_every"] = math.ceil(estimate["estimated_bytes"] / budget)
+        return mode
+
+    # Largest per-sheet row limit whose estimate fits the budget
+    sheets = estimate["sheets"]
+    low, high = MEMORY_MIN_SAMPLE_ROWS, max(s["rows"] for s in sheets.values())
+    while low < high:
+        middle = (low + high + 1) // 2
+        if _sampled_cells(sheets, middle) * MEMORY_BYTES_PER_CELL <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    mode["mode"] = "stride_sample"
+    mode["max_rows"] = low
+    mode["sheet_sample_every"] = {sheet: max(1, math.ceil(s["rows"] / low)) for sheet, s in sheets.items()}
+    mode["sampled_estimated_bytes"] = _sampled_cells(sheets, low) * MEMORY_BYTES_PER_CELL
+    return mode
+
+class MemoryTracker:
+    """
+    Memory use of one request by stage. With tracing on, each stage reports the
+    peak of traced Python allocations during the stage (the peak is reset per
+    stage). Without it, only the process RSS after each stage and its change since
+    the previous stage are known; RSS rarely shrinks when a stage frees memory, so
+    these are labelled as process figures. Both are process-wide, so they are left
+    out when another request was tracked at the same time.
+    """
+    _active = weakref.WeakSet()
+    _lock = threading.Lock()
+
+    def __init__(self, trace=MEMORY_TRACE_ALLOCATIONS):
+        self.trace = trace
+        with MemoryTracker._lock:
+            self.concurrent = len(MemoryTracker._active) > 0
+            for other in MemoryTracker._active:
+                other.concurrent = True
+            MemoryTracker._active.add(self)
+            if trace and not tracemalloc.is_tracing():
+                tracemalloc.start()
+        if trace:
+            tracemalloc.reset_peak()
+        self.start_rss = current_rss_bytes()
+        self.last_rss = self.start_rss
+        self.stages = {}
+
+    def checkpoint(self, stage):
+        """
+        Record memory use for the stage that just finished.
+        """
+        rss = current_rss_bytes()
+        delta = rss - self.last_rss if rss is not None and self.last_rss is not None else None
+        entry = {"process_rss_mb": _mb(rss), "process_rss_delta_mb": _mb(delta)}
+        self.last_rss = rss
+        if self.trace:
+            _, peak = tracemalloc.get_traced_memory()
+            entry["traced_peak_mb"] = _mb(peak)
+            tracemalloc.reset_peak()
+        self.stages[stage] = entry
+
+    def report(self):
+        """
+        JSON-ready summary for debug_logs; stops tracing once no other request uses it.
+        Stage figures are omitted (with the reason) if other requests overlapped.
+        """
+        with MemoryTracker._lock:
+            MemoryTracker._active.discard(self)
+            if self.trace and not MemoryTracker._active:
+                tracemalloc.stop()
+        self.trace = False
+        report = {"start_rss_mb": _mb(self.start_rss), "process_peak_rss_mb": _mb(peak_rss_bytes())}
+        if self.concurrent:
+            report["stages"] = {}
+            report["stages_omitted"] = "concurrent_requests"
+        else:
+            report["stages"] = self.stages
+        return report
@@ -0,0 +1,231 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+METRICS_LATENCY_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Metric:
+    """
+    A named metric with a fixed set of labels. Each label combination holds a list
+    of floats (the value of a counter; bucket counts, sum and count of a
+    histogram), so snapshots of all metrics can be diffed and merged the same way.
+    """
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _empty(self):
+        return [0.0]
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def snapshot(self):
+        with self._lock:
+            return {key: list(values) for key, values in self._values.items()}
+
+    def merge(self, values_by_key):
+        with self._lock:
+            for key, values in values_by_key.items():
+                current = self._values.setdefault(key, self._empty())
+                for i, value in enumerate(values):
+                    current[i] += value
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = self._empty()
+            values[0] += amount
+
+    def render(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(values[0])}"
+                for key, values in sorted(self.snapshot().items())]
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = [float(value)]
+
+    def render(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(values[0])}"
+                for key, values in sorted(self.snapshot().items())]
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=METRICS_LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = list(buckets)
+
+    def _empty(self):
+        # One count per bucket plus +Inf, then the sum and the count of observations
+        return [0.0] * (len(self.buckets) + 3)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = self._empty()
+            values[bucket] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def render(self):
+        lines = []
+        bounds = [_format_value(b) for b in self.buckets] + ["+Inf"]
+        for key, values in sorted(self.snapshot().items()):
+            cumulative = 0.0
+            for bound, count in zip(bounds, values[:-2]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, 'le="' + bound + '"')
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(values[-1])}")
+        return lines
+
+class MetricsRegistry:
+    """
+    In-process metrics with Prometheus text exposition. Caches registered with
+    register_cache are reported from their own hit/miss counters at render time.
+    """
+    def __init__(self):
+        self.metrics = {}
+        self.caches = {}
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.metrics.setdefault(name, Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self.metrics.setdefault(name, Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=METRICS_LATENCY_BUCKETS):
+        return self.metrics.setdefault(name, Histogram(name, help_text, labelnames, buckets))
+
+    def register_cache(self, name, cache):
+        self.caches[name] = cache
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def merge(self, snapshot):
+        for name, values in snapshot.items():
+            if name in self.metrics:
+                self.metrics[name].merge(values)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+
+        cache_stats = {name: cache.stats() for name, cache in self.caches.items()}
+        for field, kind, help_text in (("hits", "counter", "Cache lookups that found an entry"),
+                                       ("misses", "counter", "Cache lookups that found no entry"),
+                                       ("entries", "gauge", "Entries held by the cache"),
+                                       ("hit_rate", "gauge", "Share of cache lookups that were hits")):
+            name = f"inventory_cache_{field}" + ("_total" if kind == "counter" else "")
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for cache, stats in cache_stats.items():
+                lines.append(f'{name}{{cache="{_escape(cache)}"}} {_format_value(stats[field])}')
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+REQUESTS = REGISTRY.counter("inventory_http_requests_total", "HTTP requests by endpoint and status",
+                            ["endpoint", "method", "status"])
+REQUEST_LATENCY = REGISTRY.histogram("inventory_http_request_duration_seconds", "HTTP request latency",
+                                     ["endpoint"])
+STAGE_LATENCY = REGISTRY.histogram("inventory_stage_duration_seconds", "Time spent per pipeline stage",
+                                   ["stage"])
+ROWS_PROCESSED = REGISTRY.counter("inventory_rows_processed_total", "Records extracted by data category",
+                                  ["category"])
+SHEETS_PROCESSED = REGISTRY.counter("inventory_sheets_processed_total", "Sheets extracted or reused from cache",
+                                    ["outcome"])
+FUZZY_COMPARISONS = REGISTRY.counter("inventory_fuzzy_comparisons_total", "Fuzzy string comparisons run",
+                                     ["kind"])
+ERRORS = REGISTRY.counter("inventory_errors_total", "Error responses and failed files by error type",
+                          ["error_type"])
+ADMISSION_IN_FLIGHT = REGISTRY.gauge("inventory_admission_in_flight", "Uploads admitted and still processing")
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge("inventory_admission_queue_depth", "Uploads waiting for admission")
+ADMISSION_MEMORY_RESERVED = REGISTRY.gauge("inventory_admission_memory_reserved_bytes",
+                                           "Estimated memory of the uploads in flight")
+ADMISSION_WAIT = REGISTRY.histogram("inventory_admission_wait_seconds", "Time uploads waited for admission")
+ADMISSION_REJECTED = REGISTRY.counter("inventory_admission_rejected_total", "Uploads turned away with 429",
+                                      ["reason"])
+
+def observe_stage(stage, seconds):
+    STAGE_LATENCY.observe(seconds, stage=stage)
+
+@contextmanager
+def stage_timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, stage=stage)
+
+def timed_stage(stage):
+    """
+    Decorator recording each call's duration under the given stage.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                STAGE_LATENCY.observe(time.perf_counter() - start, stage=stage)
+        return wrapper
+    return decorator
+
+def diff_snapshots(after, before):
+    """
+    Metric values added between two registry snapshots, e.g. by one batch file in a
+    worker process, to be merged into the registry of the serving process.
+    """
+    delta = {}
+    for name, values_by_key in after.items():
+        previous = before.get(name, {})
+        changed = {}
+        for key, values in values_by_key.items():
+            old = previous.get(key)
+            diff = values if old is None else [a - b for a, b in zip(values, old)]
+            if any(diff):
+                changed[key] = diff
+        if changed:
+            delta[name] = changed
+    return delta
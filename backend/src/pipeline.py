@@ -0,0 +1,172 @@
+import logging
+import time
+from src.file_classifier import classify_file
+from src.extract_data import extract_data
+from src.sku_dictionary import build_sku_dictionary
+from src.sku_reconcile import reconcile_skus
+from src.planning import compute_replenishment_plan, plan_to_records
+from src.lead_times import analyze_lead_times
+from src.forecasting import forecast_demand
+from src.projection import projection_inputs, project_inventory
+from src.segmentation import segment_skus
+from src.simulation import simulate_service_levels
+from src.metrics import ROWS_PROCESSED, observe_stage
+from src.deadline import deadline_passed
+from src.memory import MEMORY_BUDGET_BYTES, MemoryTracker, estimate_upload_memory, plan_memory_mode
+
+logger = logging.getLogger(__name__)
+
+# Categories that count as successfully extracted data
+DATA_CATEGORIES = ['inventory_on_hand', 'sales_history', 'purchase_orders', 'item_master']
+
+def run_pipeline(open_file, filename=None, debug_logs=None, planning_state=None, memory_budget=MEMORY_BUDGET_BYTES,
+                 memory_estimate=None, deadline=None):
+    """
+    Classify a file and extract its data with the detected business type.
+    open_file is a zero-argument callable returning a fresh file object for each stage.
+    Returns (classification_result, extracted_data, has_data); stage timings are
+    recorded in debug_logs['timings'] when a debug_logs dict is given.
+    extracted_data['sku_dictionary'] lists the upload's distinct canonical SKUs.
+    Depending on the data present, the planning stages add 'sku_reconciliation',
+    'lead_times', 'replenishment_plan', 'demand_forecast', 'inventory_projection',
+    'sku_segments' and 'service_levels' to extracted_data.
+    When a planning_state dict is given, the plan dataframe and projection inputs
+    are kept in it for what-if scenarios (see src.scenarios).
+    Memory use per stage is recorded in debug_logs['memory']. Uploads estimated to
+    need more than memory_budget bytes are sampled, and extracted_data['sampling']
+    says how; a memory_estimate already computed for the upload can be passed in.
+    A deadline (a time.monotonic() value) is passed to classification and extraction,
+    and planning stages not started when it passes are skipped and listed in
+    debug_logs['skipped_stages']. Cut-short results have extracted_data['partial']
+    set, with the 'skipped_sheets' that were never extracted.
+    """
+    if debug_logs is None:
+        debug_logs = {}
+    timings = debug_logs.setdefault('timings', {})
+    memory = MemoryTracker()
+    skipped_stages = []
+
+    def time_left(stage):
+        if deadline_passed(deadline):
+            skipped_stages.append(stage)
+            return False
+        return True
+
+    # Estimate memory from the sheet dimensions and sample the upload if it won't fit
+    if memory_estimate is None:
+        memory_estimate = estimate_upload_memory(open_file(), filename)
+    memory_mode = plan_memory_mode(memory_estimate, memory_budget)
+    if memory_mode["mode"] != "full":
+        logger.warning("Upload estimated at %s bytes exceeds the memory budget of %s bytes - using %s",
+                       memory_mode['estimated_bytes'], memory_budget, memory_mode['mode'])
+
+    start = time.perf_counter()
+    classification_result = classify_file(open_file(), filename=filename, deadline=deadline)
+    business_type = classification_result.get("business_type", "generic")
+    timings['classify'] = round(time.perf_counter() - start, 4)
+    memory.checkpoint('classify')
+
+    # Pass the detected business type into the extraction function
+    start = time.perf_counter()
+    extracted_data = extract_data(open_file(), business_type=business_type,
+                                  debug_logs=debug_logs, filename=filename,
+                                  sheet_sample_every=memory_mode.get("sheet_sample_every"),
+                                  sample_every=memory_mode.get("sample_every", 1),
+                                  deadline=deadline)
+    timings['extract'] = round(time.perf_counter() - start, 4)
+    memory.checkpoint('extract')
+    if memory_mode["mode"] != "full" and "error" not in extracted_data:
+        extracted_data["sampling"] = memory_mode
+
+    # One SKU dictionary for the whole upload; planning stages join categories on its
+    # integer codes. It is returned as 'sku_dictionary'
+    if "error" not in extracted_data:
+        sku_dictionary = build_sku_dictionary(extracted_data, DATA_CATEGORIES)
+        extracted_data["sku_dictionary"] = sku_dictionary.skus
+        debug_logs['sku_dictionary_size'] = len(sku_dictionary)
+
+        # Propose item master SKUs for transactional SKUs that don't match one exactly
+        if extracted_data.get("item_master") and time_left('reconcile'):
+            start = time.perf_counter()
+            extracted_data["sku_reconciliation"] = reconcile_skus(extracted_data)
+            timings['reconcile'] = round(time.perf_counter() - start, 4)
+            memory.checkpoint('reconcile')
+
+        # Lead time distributions from received POs; they set each SKU's planning lead time
+        start = time.perf_counter()
+        lead_time_report, lead_times = (analyze_lead_times(extracted_data)
+                                        if time_left('lead_times') else (None, None))
+        if lead_time_report is not None:
+            extracted_data["lead_times"] = lead_time_report
+            timings['lead_times'] = round(time.perf_counter() - start, 4)
+            memory.checkpoint('lead_times')
+
+        # Reorder points and suggested orders per SKU-location from stock, sales and open POs
+        start = time.perf_counter()
+        plan, plan_summary = (compute_replenishment_plan(extracted_data, lead_times=lead_times)
+                              if time_left('plan') else (None, None))
+        if plan is not None:
+            extracted_data["replenishment_plan"] = {"summary": plan_summary, "items": plan_to_records(plan)}
+            if planning_state is not None:
+                planning_state.update(plan=plan, plan_summary=plan_summary)
+            timings['plan'] = round(time.perf_counter() - start, 4)
+            memory.checkpoint('plan')
+
+        # Per-SKU demand forecasts from the sales history
+        start = time.perf_counter()
+        forecast = forecast_demand(extracted_data) if time_left('forecast') else None
+        if forecast is not None:
+            extracted_data["demand_forecast"] = forecast
+            timings['forecast'] = round(time.perf_counter() - start, 4)
+            memory.checkpoint('forecast')
+
+            # Week-by-week stock projection against the forecast and incoming POs
+            start = time.perf_counter()
+            projection = None
+            if time_left('projection'):
+                inputs = projection_inputs(extracted_data, forecast)
+                projection = project_inventory(extracted_data, inputs=inputs)
+            if projection is not None:
+                extracted_data["inventory_projection"] = projection
+                if planning_state is not None:
+                    planning_state["projection_inputs"] = inputs
+                timings['projection'] = round(time.perf_counter() - start, 4)
+                memory.checkpoint('projection')
+
+        # ABC/XYZ classes of the SKU portfolio
+        start = time.perf_counter()
+        segments = segment_skus(extracted_data) if time_left('segmentation') else None
+        if segments is not None:
+            extracted_data["sku_segments"] = segments
+            timings['segmentation'] = round(time.perf_counter() - start, 4)
+            memory.checkpoint('segmentation')
+
+        # Stockout risk and required safety stock from simulated demand and lead times
+        start = time.perf_counter()
+        service_levels = (simulate_service_levels(extracted_data, lead_times=lead_times)
+                          if time_left('simulation') else None)
+        if service_levels is not None:
+            extracted_data["service_levels"] = service_levels
+            timings['simulation'] = round(time.perf_counter() - start, 4)
+            memory.checkpoint('simulation')
+
+    debug_logs['memory'] = dict(memory.report(), mode=memory_mode)
+    if skipped_stages:
+        debug_logs['skipped_stages'] = skipped_stages
+        logger.warning("Deadline passed - skipped stages: %s", ', '.join(skipped_stages))
+    if (skipped_stages or classification_result.get("partial")) and "error" not in extracted_data:
+        extracted_data["partial"] = True
+        extracted_data.setdefault("skipped_sheets", [])
+
+    for stage, seconds in timings.items():
+        observe_stage(stage, seconds)
+    for category in DATA_CATEGORIES:
+        ROWS_PROCESSED.inc(len(extracted_data.get(category, [])), category=category)
+
+    # Check if we have any successful extractions
+    has_data = any(len(extracted_data.get(category, [])) > 0 for category in DATA_CATEGORIES)
+
+    if not has_data and classification_result.get("is_inventory_planning", False):
+        debug_logs['extraction_warning'] = "File classified as inventory planning but no data extracted"
+
+    return classification_result, extracted_data, has_data
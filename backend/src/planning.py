@@ -0,0 +1,273 @@
+import numpy as np
+import pandas as pd
+
+# Planning parameters used when the upload doesn't provide them
+PLANNING_LEAD_TIME_DAYS = 14
+PLANNING_REVIEW_PERIOD_DAYS = 7
+
+# Safety factor for the demand variability during lead time (1.65 ~ 95% service level)
+PLANNING_SERVICE_Z = 1.65
+
+# Length of a sales period when the data has a single date
+DEFAULT_PERIOD_DAYS = 1.0
+
+# Sales are summed into calendar buckets: weeks, or months when the data's dates are
+# at least this many days apart (monthly reporting). Buckets without sales are zero.
+DEMAND_MONTHLY_MIN_GAP_DAYS = 28
+
+# Only the most recent buckets are kept, so a stray old date can't blow up the matrix
+DEMAND_MAX_PERIODS = 260
+
+# Days per calendar bucket, for data that spans a single bucket
+DEMAND_BUCKET_DAYS = {"W": 7.0, "M": 365.25 / 12}
+
+def _frame(records, columns):
+    """
+    Dataframe of the given record fields; missing fields become empty columns.
+    """
+    return pd.DataFrame.from_records(records or [], columns=columns)
+
+def encode_sku_indexes(frames, sku_dictionary=None):
+    """
+    Integer SKU index per row of each frame plus the SKU labels they index.
+    The upload's SKU dictionary is used when it has every row's SKU; its codes are
+    looked up for the whole column at once.
+    """
+    if sku_dictionary is not None:
+        dictionary = pd.Index(sku_dictionary, dtype=object)
+        codes = [dictionary.get_indexer(pd.Index(f["sku"], dtype=object)).astype(np.int64) for f in frames]
+        if all((c >= 0).all() for c in codes):
+            return codes, np.asarray(sku_dictionary, dtype=object)
+    return _factorize_together([f["sku"] for f in frames])
+
+def _factorize_together(columns):
+    """
+    Factorize several columns against one shared vocabulary; missing values get a code too.
+    """
+    lengths = [len(c) for c in columns]
+    codes, uniques = pd.factorize(pd.concat(columns, ignore_index=True), use_na_sentinel=False)
+    return np.split(codes.astype(np.int64), np.cumsum(lengths)[:-1]), np.asarray(uniques, dtype=object)
+
+def estimate_period_days(dates):
+    """
+    Typical length of one sales period in days: the median gap between distinct dates.
+    """
+    distinct = np.sort(dates.dropna().unique())
+    if len(distinct) < 2:
+        return DEFAULT_PERIOD_DAYS
+    gaps = np.diff(distinct).astype("timedelta64[D]").astype(float)
+    return float(max(np.median(gaps), 1.0))
+
+def demand_bucket_frequency(dates):
+    """
+    Calendar bucket for a sales history: "M" (months) for monthly data, else "W" (weeks).
+    """
+    distinct = np.sort(dates.dropna().unique())
+    if len(distinct) < 2:
+        return "W"
+    gaps = np.diff(distinct).astype("timedelta64[D]").astype(float)
+    return "M" if np.median(gaps) >= DEMAND_MONTHLY_MIN_GAP_DAYS else "W"
+
+def bucket_sales_periods(time_periods, frequency=None):
+    """
+    Calendar bucket of each sale: consecutive weeks or months (see
+    demand_bucket_frequency; frequency "W" or "M" forces one) from the first to the
+    last sale, keeping the last DEMAND_MAX_PERIODS. Returns (bucket per sale, -1 for
+    dates that don't parse or fall before the kept buckets; start date of each
+    bucket; frequency). Planning and forecasting share these buckets.
+    """
+    # Only the distinct period values need parsing; each is parsed on its own, so
+    # different spellings of a date land in the same bucket
+    period_index, period_values = pd.factorize(pd.Series(time_periods, dtype=object))
+    parsed = pd.to_datetime(pd.Series(period_values, dtype=object), errors="coerce", format="mixed")
+    valid = parsed.notna().to_numpy()
+    frequency = frequency or demand_bucket_frequency(parsed)
+    if not valid.any():
+        return np.full(len(period_index), -1, dtype=np.int64), np.array([], dtype="datetime64[ns]"), frequency
+
+    # Bucket ordinal of each distinct value, renumbered from the first kept bucket
+    ordinals = np.full(len(period_values), -1, dtype=np.int64)
+    ordinals[valid] = parsed[valid].dt.to_period(frequency).array.asi8
+    last = ordinals[valid].max()
+    first = max(ordinals[valid].min(), last - DEMAND_MAX_PERIODS + 1)
+    position = np.where(ordinals >= first, ordinals - first, -1)
+    period_count = int(last - first + 1)
+    period_dates = pd.period_range(pd.Period(parsed[valid].max(), frequency) - (period_count - 1),
+                                   periods=period_count, freq=frequency).to_timestamp(how="start").to_numpy()
+    buckets = np.where(period_index >= 0, position[np.maximum(period_index, 0)], -1)
+    return buckets, period_dates, frequency
+
+def compute_demand(slots, time_periods, quantities, slot_count):
+    """
+    Mean and standard deviation of demand per day for each plan slot (SKU or
+    SKU-location), over the calendar buckets of bucket_sales_periods. Buckets without
+    sales count as zero demand, so the statistics are taken over every bucket from
+    the first to the last sale, not only those in which the SKU sold.
+    Returns (avg_daily_demand, demand_std_daily, period_days).
+    """
+    period_index, period_dates, frequency = bucket_sales_periods(time_periods)
+    period_count = max(len(period_dates), 1)
+    if len(period_dates) > 1:
+        period_days = estimate_period_days(pd.Series(period_dates))
+    else:
+        period_days = DEMAND_BUCKET_DAYS[frequency]
+
+    # Sum each slot's sales per period, then the sum and sum of squares per slot
+    valid = period_index >= 0
+    cells, cell_index = np.unique(slots[valid] * period_count + period_index[valid], return_inverse=True)
+    cell_totals = np.bincount(cell_index, weights=quantities[valid])
+    cell_slots = cells // period_count
+    total = np.bincount(cell_slots, weights=cell_totals, minlength=slot_count)
+    total_sq = np.bincount(cell_slots, weights=cell_totals ** 2, minlength=slot_count)
+
+    mean = total / period_count
+    variance = np.maximum(total_sq / period_count - mean ** 2, 0.0)
+    return mean / period_days, np.sqrt(variance / period_days), period_days
+
+def split_across_locations(slot_skus, order_skus, quantities, daily, sku_count):
+    """
+    On-order units per plan slot for orders that only name a SKU: each SKU's units
+    are split over its locations by their share of its demand, or evenly when the
+    SKU has no demand. SKUs without a plan slot get nothing.
+    """
+    units = np.bincount(order_skus, weights=quantities, minlength=sku_count)
+    sku_daily = np.bincount(slot_skus, weights=daily, minlength=sku_count)
+    sku_slots = np.bincount(slot_skus, minlength=sku_count)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(sku_daily[slot_skus] > 0, daily / sku_daily[slot_skus], 1.0 / sku_slots[slot_skus])
+    return units[slot_skus] * share
+
+def replenishment_policy(on_hand, on_order, daily, std_daily, lead_time, lead_time_std,
+                         service_z=PLANNING_SERVICE_Z, review_period_days=PLANNING_REVIEW_PERIOD_DAYS):
+    """
+    Safety stock, reorder point and suggested order quantity for arrays of plan
+    slots. The safety stock covers demand variability over the lead time and lead
+    time variability at the average demand; orders bring the inventory position up
+    to the reorder point plus one review period of demand.
+    """
+    position = on_hand + on_order
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_of_supply = np.where(daily > 0, on_hand / daily, np.inf)
+    safety_stock = service_z * np.sqrt(lead_time * std_daily ** 2 + (daily * lead_time_std) ** 2)
+    reorder_point = daily * lead_time + safety_stock
+    order_up_to = reorder_point + daily * review_period_days
+    needs_reorder = (position <= reorder_point) & (daily > 0)
+    suggested = np.where(needs_reorder, np.ceil(np.maximum(order_up_to - position, 0.0)), 0.0)
+    return {
+        "days_of_supply": days_of_supply,
+        "safety_stock": safety_stock,
+        "reorder_point": reorder_point,
+        "inventory_position": position,
+        "needs_reorder": needs_reorder,
+        "suggested_order_qty": suggested
+    }
+
+def compute_replenishment_plan(extracted_data, lead_time_days=PLANNING_LEAD_TIME_DAYS,
+                               review_period_days=PLANNING_REVIEW_PERIOD_DAYS,
+                               service_z=PLANNING_SERVICE_Z, lead_times=None):
+    """
+    Join on-hand stock, sales and open purchase orders per SKU (and location) and
+    compute average demand, days of supply, reorder points and suggested order
+    quantities for all of them at once. Returns (plan dataframe, summary), or
+    (None, None) when there is no inventory or sales data to plan from.
+    lead_times is an optional dataframe indexed by sku with lead_time_days and
+    lead_time_std_days (see src.lead_times); SKUs not in it use lead_time_days.
+    """
+    inventory = _frame(extracted_data.get("inventory_on_hand"), ["sku", "quantity", "location"])
+    sales = _frame(extracted_data.get("sales_history"), ["sku", "time_period", "quantity", "location"])
+    orders = _frame(extracted_data.get("purchase_orders"),
+                    ["sku", "quantity", "location", "has_arrived"])
+    if inventory.empty or sales.empty:
+        return None, None
+    orders = orders[orders["has_arrived"].ne(True)]
+
+    # Plan per location only when both stock and sales say where they are
+    by_location = bool(inventory["location"].notna().any() and sales["location"].notna().any())
+
+    frames = [inventory, sales, orders]
+    sku_indexes, sku_labels = encode_sku_indexes(frames, extracted_data.get("sku_dictionary"))
+    if by_location:
+        location_indexes, location_labels = _factorize_together([f["location"] for f in frames])
+    else:
+        location_indexes, location_labels = [np.zeros(len(f), dtype=np.int64) for f in frames], np.array([None])
+    keys = [s * len(location_labels) + l for s, l in zip(sku_indexes, location_indexes)]
+
+    # One plan slot per SKU(-location) with stock or sales; orders for others are ignored
+    slot_keys, slot_index = np.unique(np.concatenate(keys[:2]), return_inverse=True)
+    slot_count = len(slot_keys)
+    inventory_slots, sales_slots = slot_index[:len(inventory)], slot_index[len(inventory):]
+    order_slots = np.searchsorted(slot_keys, keys[2])
+    order_matched = (order_slots < slot_count) & (slot_keys[np.minimum(order_slots, slot_count - 1)] == keys[2])
+
+    on_hand = np.bincount(inventory_slots, weights=inventory["quantity"].to_numpy(dtype=float), minlength=slot_count)
+    order_quantities = orders["quantity"].to_numpy(dtype=float)
+    on_order = np.bincount(order_slots[order_matched], weights=order_quantities[order_matched],
+                           minlength=slot_count).astype(float)
+    daily, std_daily, period_days = compute_demand(
+        sales_slots, sales["time_period"],
+        sales["quantity"].to_numpy(dtype=float), slot_count
+    )
+
+    # Location is optional on POs: orders without one count toward their SKU's locations
+    unlocated = np.zeros(len(orders), dtype=bool)
+    if by_location:
+        unlocated = ~order_matched & orders["location"].isna().to_numpy()
+    if unlocated.any():
+        on_order += split_across_locations(slot_keys // len(location_labels), sku_indexes[2][unlocated],
+                                           order_quantities[unlocated], daily, len(sku_labels))
+
+    # Lead time per slot; its variability adds to the safety stock
+    slot_skus = sku_labels[slot_keys // len(location_labels)]
+    lead_time = np.full(slot_count, float(lead_time_days))
+    lead_time_std = np.zeros(slot_count)
+    known = np.zeros(slot_count, dtype=bool)
+    if lead_times is not None and not lead_times.empty:
+        found = lead_times.index.get_indexer(slot_skus)
+        known = found >= 0
+        lead_time[known] = lead_times["lead_time_days"].to_numpy(dtype=float)[found[known]]
+        lead_time_std[known] = lead_times["lead_time_std_days"].to_numpy(dtype=float)[found[known]]
+
+    policy = replenishment_policy(on_hand, on_order, daily, std_daily, lead_time, lead_time_std,
+                                  service_z, review_period_days)
+    needs_reorder, suggested = policy["needs_reorder"], policy["suggested_order_qty"]
+
+    plan = pd.DataFrame({
+        "sku": slot_skus,
+        "location": location_labels[slot_keys % len(location_labels)],
+        "on_hand": on_hand,
+        "on_order": on_order,
+        "avg_daily_demand": daily,
+        "demand_std_daily": std_daily,
+        "days_of_supply": policy["days_of_supply"],
+        "lead_time_days": lead_time,
+        "lead_time_std_days": lead_time_std,
+        "safety_stock": policy["safety_stock"],
+        "reorder_point": policy["reorder_point"],
+        "inventory_position": policy["inventory_position"],
+        "needs_reorder": needs_reorder,
+        "suggested_order_qty": suggested
+    })
+    summary = {
+        "sku_locations": slot_count,
+        "by_location": by_location,
+        "period_days": period_days,
+        "lead_time_days": lead_time_days,
+        "lead_times_from_history": int(known.sum()),
+        "unlocated_orders": int(unlocated.sum()),
+        "review_period_days": review_period_days,
+        "service_z": service_z,
+        "needs_reorder": int(needs_reorder.sum()),
+        "stockouts": int(((on_hand <= 0) & (daily > 0)).sum()),
+        "suggested_order_units": float(suggested.sum())
+    }
+    return plan, summary
+
+def plan_to_records(plan):
+    """
+    JSON-ready records of a replenishment plan; unlimited days of supply (no demand)
+    and missing locations become None.
+    """
+    rounded = plan.round(2).astype({"days_of_supply": object, "location": object})
+    rounded.loc[np.isinf(plan["days_of_supply"].to_numpy()), "days_of_supply"] = None
+    rounded.loc[plan["location"].isna().to_numpy(), "location"] = None
+    return rounded.to_dict(orient="records")
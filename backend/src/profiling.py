@@ -0,0 +1,87 @@
+import cProfile
+import os
+import pstats
+import random
+import re
+import tempfile
+import uuid
+
+# Profiles are written here as <request id>.prof (readable with pstats or snakeviz),
+# outside the source tree unless INVENTORY_PROFILE_DIR points elsewhere
+PROFILE_DIR = os.environ.get(
+    "INVENTORY_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "inventory_profiles")
+)
+
+# Share of uploads profiled without being asked (0 disables sampling)
+PROFILE_SAMPLE_RATE = float(os.environ.get("INVENTORY_PROFILE_SAMPLE_RATE", "0"))
+
+# Clients can ask for a profile with this header when INVENTORY_PROFILE_ALLOW_HEADER=1
+PROFILE_HEADER = "X-Profile"
+PROFILE_ALLOW_HEADER = os.environ.get("INVENTORY_PROFILE_ALLOW_HEADER", "0") == "1"
+
+# Functions listed in the debug_logs summary, by cumulative time
+PROFILE_TOP_N = 25
+
+def should_profile(header_value=None, sample_rate=PROFILE_SAMPLE_RATE):
+    """
+    Whether to profile a request: asked for by header, or picked by the sample rate.
+    """
+    if PROFILE_ALLOW_HEADER and header_value and header_value.strip().lower() in ("1", "true", "yes", "on"):
+        return True
+    return sample_rate > 0 and random.random() < sample_rate
+
+def profile_id(request_id=None):
+    """
+    File-safe profile id from the client's request id, or a new one.
+    """
+    if request_id:
+        cleaned = re.sub(r"[^A-Za-z0-9_.-]", "_", request_id)[:64].strip(".")
+        if cleaned:
+            return cleaned
+    return uuid.uuid4().hex
+
+def _function_name(key):
+    filename, line, name = key
+    if filename == "~":
+        return name
+    return f"{os.path.relpath(filename) if filename.startswith(os.getcwd()) else os.path.basename(filename)}:{line}({name})"
+
+def profile_summary(stats, top_n=PROFILE_TOP_N):
+    """
+    Top functions by cumulative time, with call counts and own time.
+    """
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:top_n]
+    return [
+        {
+            "function": _function_name(key),
+            "calls": calls,
+            "primitive_calls": primitive_calls,
+            "own_time": round(own_time, 4),
+            "cumulative_time": round(cumulative_time, 4)
+        }
+        for key, (primitive_calls, calls, own_time, cumulative_time, _) in rows
+    ]
+
+def run_profiled(func, request_id=None, profile_dir=PROFILE_DIR, top_n=PROFILE_TOP_N):
+    """
+    Run func() under cProfile and save the profile as <profile id>.prof in
+    profile_dir. Returns (func's result, profile report for debug_logs).
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = func()
+    finally:
+        profiler.disable()
+
+    report_id = profile_id(request_id)
+    stats = pstats.Stats(profiler)
+    report = {"id": report_id, "total_time": round(stats.total_tt, 4), "top": profile_summary(stats, top_n)}
+    try:
+        os.makedirs(profile_dir, exist_ok=True)
+        path = os.path.join(profile_dir, f"{report_id}.prof")
+        stats.dump_stats(path)
+        report["path"] = path
+    except OSError as e:
+        report["save_error"] = str(e)
+    return result, report
@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+
+from src.forecasting import forecast_demand
+
+# Weeks projected ahead of the start date
+PROJECTION_WEEKS = 52
+
+# Week-by-week balances are served on request for at most this many SKUs at a time
+PROJECTION_TIMELINE_MAX_SKUS = 100
+
+# Open orders overdue by more than this many days are left out as stale (their
+# arrival status is likely just not recorded)
+PROJECTION_OVERDUE_TOLERANCE_DAYS = 30
+
+def weekly_demand_rates(forecast):
+    """
+    Expected demand per week for each forecast SKU: the mean of its forecast periods,
+    scaled from the forecast's period length to a week. Returns (skus, rates).
+    """
+    items = forecast["items"]
+    per_period = np.array([item["forecast"] for item in items], dtype=np.float64).mean(axis=1)
+    period_days = forecast["summary"]["period_days"] or 1.0
+    return [item["sku"] for item in items], per_period * 7.0 / period_days
+
+def forecast_start_date(forecast):
+    """
+    First day after the sales history: the start of the forecast's first period.
+    """
+    return pd.Timestamp(forecast["summary"]["forecast_periods"][0]).normalize()
+
+def _week_starts(start, weeks):
+    return [(start + pd.Timedelta(weeks=w)).strftime("%Y-%m-%d") for w in range(weeks)]
+
+def _sum_by_sku(sku_index, values, sku_count):
+    valid = sku_index >= 0
+    return np.bincount(sku_index[valid], weights=values[valid], minlength=sku_count)
+
+def receipts_by_week(order_rows, arrival_days, quantities, row_count, weeks):
+    """
+    SKU x week matrix of incoming order quantities. Orders land in the week of their
+    arrival (in days from the start date); overdue orders land in the first week,
+    orders past the horizon or without a date are left out.
+    """
+    week = np.floor(arrival_days / 7.0)
+    in_horizon = ~np.isnan(week) & (week < weeks) & (order_rows >= 0)
+    week = np.clip(np.nan_to_num(week), 0, weeks - 1).astype(np.int64)
+    return np.bincount(
+        order_rows[in_horizon] * weeks + week[in_horizon],
+        weights=quantities[in_horizon],
+        minlength=row_count * weeks
+    ).reshape(row_count, weeks)
+
+def project_balances(on_hand, receipts, weekly_demand):
+    """
+    Closing balance of each week for every row, with the first week the balance is
+    negative (-1 if never), and the lowest balance and its week.
+    """
+    balance = on_hand[:, None] + np.cumsum(receipts - weekly_demand[:, None], axis=1)
+    short = balance < 0
+    first_stockout = np.where(short.any(axis=1), short.argmax(axis=1), -1)
+    min_week = balance.argmin(axis=1)
+    min_balance = balance[np.arange(len(balance)), min_week]
+    return balance, first_stockout, min_balance, min_week
+
+def projection_inputs(extracted_data, forecast, start_date=None, weeks=PROJECTION_WEEKS):
+    """
+    Per-SKU starting stock and weekly demand, and the open orders with their arrival
+    in days from the start date, that a projection is computed from. Kept separately
+    so scenarios (see src.scenarios) can re-project a few SKUs with changed inputs.
+    The start date defaults to the forecast's, right after the sales history. Orders
+    overdue by more than PROJECTION_OVERDUE_TOLERANCE_DAYS are left out and counted.
+    Returns None when there is no stock or demand to project.
+    """
+    inventory = pd.DataFrame.from_records(extracted_data.get("inventory_on_hand") or [], columns=["sku", "quantity"])
+    orders = pd.DataFrame.from_records(extracted_data.get("purchase_orders") or [],
+                                       columns=["sku", "quantity", "arrival_date", "has_arrived",
+                                                "vendor", "location"])
+    if inventory.empty or forecast is None:
+        return None
+
+    start = pd.Timestamp(start_date).normalize() if start_date else forecast_start_date(forecast)
+    forecast_skus, rates = weekly_demand_rates(forecast)
+
+    # One row per SKU with stock, demand or incoming orders
+    skus = pd.Index(pd.unique(pd.concat([inventory["sku"], pd.Series(forecast_skus, dtype=object), orders["sku"]],
+                                        ignore_index=True).dropna()))
+    sku_count = len(skus)
+
+    on_hand = _sum_by_sku(skus.get_indexer(inventory["sku"]), inventory["quantity"].to_numpy(dtype=float), sku_count)
+    weekly_demand = np.zeros(sku_count)
+    weekly_demand[skus.get_indexer(forecast_skus)] = rates
+
+    open_orders = orders[orders["has_arrived"].ne(True)]
+    arrival_day = (pd.to_datetime(open_orders["arrival_date"], errors="coerce") - start).dt.days.to_numpy(dtype=float)
+    quantity = open_orders["quantity"].to_numpy(dtype=float)
+    stale = arrival_day < -PROJECTION_OVERDUE_TOLERANCE_DAYS
+    open_orders = open_orders[~stale]
+    open_orders = pd.DataFrame({
+        "row": skus.get_indexer(open_orders["sku"]),
+        "arrival_day": arrival_day[~stale],
+        "quantity": quantity[~stale],
+        "vendor": open_orders["vendor"].to_numpy(dtype=object),
+        "location": open_orders["location"].to_numpy(dtype=object)
+    })
+    return {
+        "skus": skus,
+        "on_hand": on_hand,
+        "weekly_demand": weekly_demand,
+        "orders": open_orders,
+        "start": start,
+        "weeks": weeks,
+        "stale_orders": int(stale.sum()),
+        "stale_order_units": float(np.nansum(quantity[stale]))
+    }
+
+def project_inventory(extracted_data, forecast=None, start_date=None, weeks=PROJECTION_WEEKS, inputs=None):
+    """
+    Project each SKU's stock week by week: starting on-hand quantity, plus purchase
+    orders received in the week of their arrival date, minus forecast demand.
+    Balances for all SKUs are one cumulative sum over a SKU x week matrix.
+    Returns the first stockout week and minimum balance per SKU, or None when there
+    is no stock or demand to project; week-by-week balances are left to
+    projection_timeline. Precomputed projection_inputs can be passed as inputs.
+    """
+    if inputs is None:
+        if forecast is None:
+            forecast = forecast_demand(extracted_data)
+        inputs = projection_inputs(extracted_data, forecast, start_date, weeks)
+    if inputs is None:
+        return None
+
+    skus, on_hand, weekly_demand = inputs["skus"], inputs["on_hand"], inputs["weekly_demand"]
+    start, weeks, orders = inputs["start"], inputs["weeks"], inputs["orders"]
+    sku_count = len(skus)
+
+    receipts = receipts_by_week(orders["row"].to_numpy(), orders["arrival_day"].to_numpy(),
+                                orders["quantity"].to_numpy(), sku_count, weeks)
+    _, first_stockout, min_balance, min_week = project_balances(on_hand, receipts, weekly_demand)
+    stocks_out = first_stockout >= 0
+
+    week_starts = _week_starts(start, weeks)
+
+    items = []
+    first_list = first_stockout.tolist()
+    min_list = np.round(min_balance, 2).tolist()
+    min_week_list = min_week.tolist()
+    on_hand_list = on_hand.tolist()
+    demand_list = np.round(weekly_demand, 2).tolist()
+    for row, sku in enumerate(skus):
+        first = first_list[row]
+        items.append({
+            "sku": sku,
+            "on_hand": on_hand_list[row],
+            "weekly_demand": demand_list[row],
+            "first_stockout_week": first if first >= 0 else None,
+            "stockout_week_start": week_starts[first] if first >= 0 else None,
+            "min_balance": min_list[row],
+            "min_balance_week": min_week_list[row]
+        })
+
+    return {
+        "summary": {
+            "skus": sku_count,
+            "weeks": weeks,
+            "start_date": week_starts[0],
+            "stockouts": int(stocks_out.sum()),
+            "stockouts_next_4_weeks": int((stocks_out & (first_stockout < 4)).sum()),
+            "stale_orders": inputs["stale_orders"],
+            "stale_order_units": round(inputs["stale_order_units"], 2)
+        },
+        "items": items
+    }
+
+def projection_timeline(inputs, skus):
+    """
+    Week-by-week closing balances of the given SKUs from cached projection_inputs.
+    SKUs that aren't projected are listed under not_found.
+    """
+    rows = inputs["skus"].get_indexer(skus)
+    found = rows >= 0
+    rows = np.unique(rows[found])
+    weeks, orders = inputs["weeks"], inputs["orders"]
+
+    order_rows = orders["row"].to_numpy()
+    selected = np.isin(order_rows, rows)
+    receipts = receipts_by_week(np.searchsorted(rows, order_rows[selected]),
+                                orders["arrival_day"].to_numpy()[selected],
+                                orders["quantity"].to_numpy()[selected], len(rows), weeks)
+    balance, _, _, _ = project_balances(inputs["on_hand"][rows], receipts, inputs["weekly_demand"][rows])
+
+    timelines = np.round(balance, 2).tolist()
+    return {
+        "week_starts": _week_starts(inputs["start"], weeks),
+        "items": [{"sku": sku, "timeline": timelines[i]} for i, sku in enumerate(inputs["skus"][rows])],
+        "not_found": [sku for sku, hit in zip(skus, found) if not hit]
+    }
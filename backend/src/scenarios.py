@@ -0,0 +1,359 @@
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from src.cache import LRUCache
+from src.errors import ScenarioError
+from src.metrics import REGISTRY
+from src.planning import replenishment_policy
+from src.projection import PROJECTION_TIMELINE_MAX_SKUS, receipts_by_week, project_balances, projection_timeline
+from src.sku_dictionary import canonical_sku
+
+# Cached datasets are bounded by the approximate size of their planning state (128MB)
+SCENARIO_CACHE_MAX_BYTES = int(float(os.environ.get("INVENTORY_SCENARIO_CACHE_MB", "128")) * 1024 * 1024)
+
+# Changed plan and projection rows returned per scenario
+SCENARIO_MAX_ITEMS = 1000
+
+# Override types and the parameter each one takes
+SCENARIO_OVERRIDE_TYPES = {"demand": "percent", "lead_time": "days"}
+
+# Fields a scenario can select SKUs by, besides the SKU itself
+SCENARIO_DIMENSIONS = ["category", "vendor", "location"]
+
+# Plan columns reported before and after a scenario
+SCENARIO_PLAN_FIELDS = ["avg_daily_demand", "lead_time_days", "safety_stock", "reorder_point",
+                        "needs_reorder", "suggested_order_qty"]
+
+def _key(value):
+    return str(value).strip().casefold()
+
+def _keys(values):
+    """
+    Case-insensitive keys of a column (None where missing), normalising each
+    distinct value once.
+    """
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    keys = np.array([_key(u) for u in uniques] + [None], dtype=object)
+    return keys[codes]
+
+def _graph_size(graph):
+    size = 0
+    for links in graph.values():
+        size += sys.getsizeof(links)
+        for key, skus in links.items():
+            size += sys.getsizeof(key) + skus.nbytes
+    return size
+
+def _state_size(state):
+    size = state["plan"].memory_usage(index=False).sum() + _graph_size(state["graph"])
+    if state["projection"] is not None:
+        size += state["projection"]["orders"].memory_usage(index=False).sum()
+        size += 3 * state["projection"]["on_hand"].nbytes
+    return int(size)
+
+_datasets = LRUCache(SCENARIO_CACHE_MAX_BYTES, size_fn=_state_size)
+REGISTRY.register_cache("scenario_datasets", _datasets)
+
+def build_dependency_graph(extracted_data):
+    """
+    SKUs per category, vendor and location, from every record that links them:
+    item master categories and vendors, purchase order vendors and the locations of
+    stock, sales and orders. Keys are case-insensitive.
+    Returns {dimension: {key: array of SKUs}}.
+    """
+    frames = [
+        pd.DataFrame.from_records(extracted_data.get(category) or [], columns=["sku"] + SCENARIO_DIMENSIONS)
+        for category in ("item_master", "purchase_orders", "inventory_on_hand", "sales_history")
+    ]
+    links = pd.concat(frames, ignore_index=True)
+    graph = {}
+    for dimension in SCENARIO_DIMENSIONS:
+        pairs = links[["sku", dimension]].dropna()
+        pairs = pd.DataFrame({"sku": pairs["sku"], "key": _keys(pairs[dimension])}).drop_duplicates()
+        graph[dimension] = {
+            key: skus.to_numpy(dtype=object) for key, skus in pairs.groupby("key")["sku"]
+        }
+    return graph
+
+def register_dataset(extracted_data, planning_state):
+    """
+    Cache an upload's replenishment plan, projection inputs and dependency graph so
+    scenarios can be run against it later. Returns the dataset id, or None when the
+    upload had nothing to plan.
+    """
+    plan = planning_state.get("plan")
+    if plan is None:
+        return None
+
+    state = {
+        "plan": plan,
+        "plan_summary": planning_state["plan_summary"],
+        "plan_skus": pd.Index(plan["sku"]),
+        "plan_locations": _keys(plan["location"]),
+        "graph": build_dependency_graph(extracted_data),
+        "projection": None
+    }
+
+    inputs = planning_state.get("projection_inputs")
+    if inputs is not None:
+        orders = inputs["orders"]
+        state["projection"] = {
+            **inputs,
+            "order_vendors": _keys(orders["vendor"]),
+            "order_locations": _keys(orders["location"]),
+            # Planned daily demand per projected SKU, to scale its weekly demand by
+            "plan_daily_demand": plan.groupby("sku")["avg_daily_demand"].sum()
+                                     .reindex(inputs["skus"]).fillna(0.0).to_numpy(),
+            "stockouts": extracted_data.get("inventory_projection", {}).get("summary", {}).get("stockouts", 0)
+        }
+
+    dataset_id = uuid.uuid4().hex
+    _datasets.put(dataset_id, state)
+    return dataset_id
+
+def dataset_cache_stats():
+    return _datasets.stats()
+
+def _selector_values(override, field):
+    values = override.get(field)
+    if values is None:
+        return None
+    if not isinstance(values, list):
+        values = [values]
+    return [v for v in values if v is not None and str(v).strip()]
+
+def validate_overrides(overrides):
+    """
+    Check a scenario's overrides and normalise their values and selectors.
+    Each override has a type ("demand" with a percent change, or "lead_time" with
+    days added) and optional sku, category, vendor and location selectors; without
+    selectors it applies to every SKU.
+    """
+    if isinstance(overrides, dict):
+        overrides = [overrides]
+    if not isinstance(overrides, list) or not overrides:
+        raise ScenarioError("A scenario needs at least one override")
+
+    normalized = []
+    for override in overrides:
+        if not isinstance(override, dict):
+            raise ScenarioError("Each override must be an object")
+        override_type = override.get("type")
+        if override_type not in SCENARIO_OVERRIDE_TYPES:
+            raise ScenarioError(f"Unknown override type: {override_type}",
+                                {"supported_types": list(SCENARIO_OVERRIDE_TYPES)})
+        parameter = SCENARIO_OVERRIDE_TYPES[override_type]
+        try:
+            value = float(override[parameter])
+        except (KeyError, TypeError, ValueError):
+            raise ScenarioError(f"A {override_type} override needs a numeric '{parameter}'")
+        if not np.isfinite(value) or (override_type == "demand" and value <= -100):
+            raise ScenarioError(f"Invalid {parameter} for a {override_type} override: {value}")
+
+        entry = {"type": override_type, parameter: value}
+        for field in ["sku"] + SCENARIO_DIMENSIONS:
+            values = _selector_values(override, field)
+            if values is not None:
+                entry[field] = values
+        normalized.append(entry)
+    return normalized
+
+def _resolve_skus(state, override):
+    """
+    SKUs an override selects, following the dependency graph for category, vendor
+    and location; None when it has no selectors (every SKU).
+    """
+    selected = None
+    if "sku" in override:
+        selected = np.array([s for s in map(canonical_sku, override["sku"]) if s], dtype=object)
+    for dimension in SCENARIO_DIMENSIONS:
+        if dimension not in override:
+            continue
+        graph = state["graph"][dimension]
+        linked = [graph[k] for k in map(_key, override[dimension]) if k in graph]
+        skus = np.unique(np.concatenate(linked)) if linked else np.array([], dtype=object)
+        selected = skus if selected is None else np.intersect1d(selected, skus)
+    return selected
+
+def _plan_rows(state, override, skus):
+    if skus is None:
+        rows = np.arange(len(state["plan"]))
+    else:
+        rows = state["plan_skus"].get_indexer_for(skus)
+        rows = np.unique(rows[rows >= 0])
+    # Plans kept per location only take the selected locations' rows
+    if "location" in override and state["plan_summary"].get("by_location"):
+        locations = pd.Series(state["plan_locations"][rows])
+        rows = rows[locations.isin([_key(v) for v in override["location"]]).to_numpy()]
+    return rows
+
+def _order_mask(projection, override, skus):
+    orders = projection["orders"]
+    mask = np.ones(len(orders), dtype=bool)
+    if skus is not None:
+        mask &= np.isin(orders["row"].to_numpy(), projection["skus"].get_indexer_for(skus))
+    for field, keys in (("vendor", projection["order_vendors"]), ("location", projection["order_locations"])):
+        if field in override:
+            mask &= pd.Series(keys).isin([_key(v) for v in override[field]]).to_numpy()
+    return mask
+
+def _rounded(values):
+    return values.tolist() if values.dtype == bool else np.round(values, 2).tolist()
+
+def _plan_items(plan, rows, before, after):
+    before = {f: _rounded(before[f]) for f in SCENARIO_PLAN_FIELDS}
+    after = {f: _rounded(after[f]) for f in SCENARIO_PLAN_FIELDS}
+    skus = plan["sku"].to_numpy()[rows]
+    locations = plan["location"].to_numpy()[rows]
+    items = []
+    for i in range(min(len(rows), SCENARIO_MAX_ITEMS)):
+        item = {"sku": skus[i], "location": None if pd.isna(locations[i]) else locations[i]}
+        for field in SCENARIO_PLAN_FIELDS:
+            item[field] = {"before": before[field][i], "after": after[field][i]}
+        items.append(item)
+    return items
+
+def _project_scenario(projection, plan_skus, daily_change, lead_time_shifts):
+    """
+    Re-project only the SKUs whose demand or incoming orders the scenario changes.
+    Weekly demand scales with the SKU's planned daily demand; shifted orders move
+    to the week of their new arrival date.
+    """
+    skus, weeks = projection["skus"], projection["weeks"]
+    orders = projection["orders"]
+    order_rows = orders["row"].to_numpy()
+
+    demand_rows = skus.get_indexer(plan_skus)
+    known = demand_rows >= 0
+    delta = np.bincount(demand_rows[known], weights=daily_change[known], minlength=len(skus))
+    shift = np.zeros(len(orders))
+    for mask, days in lead_time_shifts:
+        shift[mask] += days
+
+    changed = np.union1d(demand_rows[known][daily_change[known] != 0], order_rows[shift != 0])
+    changed = changed[changed >= 0]
+
+    base_demand = projection["plan_daily_demand"][changed]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(base_demand > 0, (base_demand + delta[changed]) / base_demand, 1.0)
+    weekly_before = projection["weekly_demand"][changed]
+    weekly_after = weekly_before * np.maximum(ratio, 0.0)
+
+    in_changed = np.isin(order_rows, changed)
+    local_rows = np.searchsorted(changed, order_rows[in_changed])
+    arrival = orders["arrival_day"].to_numpy()[in_changed]
+    quantity = orders["quantity"].to_numpy()[in_changed]
+    on_hand = projection["on_hand"][changed]
+
+    _, first_before, min_before, _ = project_balances(
+        on_hand, receipts_by_week(local_rows, arrival, quantity, len(changed), weeks), weekly_before)
+    _, first_after, min_after, _ = project_balances(
+        on_hand, receipts_by_week(local_rows, arrival + shift[in_changed], quantity, len(changed), weeks),
+        weekly_after)
+
+    stockouts_after = projection["stockouts"] - int((first_before >= 0).sum()) + int((first_after >= 0).sum())
+    lists = {
+        "weekly_demand": (np.round(weekly_before, 2).tolist(), np.round(weekly_after, 2).tolist()),
+        "first_stockout_week": ([w if w >= 0 else None for w in first_before.tolist()],
+                                [w if w >= 0 else None for w in first_after.tolist()]),
+        "min_balance": (np.round(min_before, 2).tolist(), np.round(min_after, 2).tolist())
+    }
+    sku_labels = skus[changed]
+    items = []
+    for i in range(min(len(changed), SCENARIO_MAX_ITEMS)):
+        item = {"sku": sku_labels[i]}
+        for field, (before, after) in lists.items():
+            item[field] = {"before": before[i], "after": after[i]}
+        items.append(item)
+
+    summary = {
+        "affected_skus": int(len(changed)),
+        "stockouts": {"before": projection["stockouts"], "after": stockouts_after}
+    }
+    return summary, items
+
+def run_scenario(dataset_id, overrides):
+    """
+    Apply a scenario's overrides to a cached dataset. Only the plan rows and
+    projected SKUs the overrides reach through the dependency graph are recomputed.
+    Returns the changed rows before and after with summary deltas, or None when the
+    dataset is not (or no longer) cached.
+    """
+    state = _datasets.get(dataset_id)
+    if state is None:
+        return None
+    started = time.perf_counter()
+    overrides = validate_overrides(overrides)
+
+    plan, plan_summary = state["plan"], state["plan_summary"]
+    selected_skus = [_resolve_skus(state, o) for o in overrides]
+    selected_rows = [_plan_rows(state, o, skus) for o, skus in zip(overrides, selected_skus)]
+    rows = np.unique(np.concatenate(selected_rows))
+
+    inputs = {c: plan[c].to_numpy(dtype=float)[rows] for c in
+              ("on_hand", "on_order", "avg_daily_demand", "demand_std_daily", "lead_time_days", "lead_time_std_days")}
+    daily, std_daily = inputs["avg_daily_demand"].copy(), inputs["demand_std_daily"].copy()
+    lead_time = inputs["lead_time_days"].copy()
+    for override, override_rows in zip(overrides, selected_rows):
+        hit = np.isin(rows, override_rows, assume_unique=True)
+        if override["type"] == "demand":
+            factor = 1.0 + override["percent"] / 100.0
+            daily[hit] *= factor
+            std_daily[hit] *= factor
+        else:
+            lead_time[hit] = np.maximum(lead_time[hit] + override["days"], 0.0)
+
+    policy = replenishment_policy(inputs["on_hand"], inputs["on_order"], daily, std_daily, lead_time,
+                                  inputs["lead_time_std_days"], plan_summary["service_z"],
+                                  plan_summary["review_period_days"])
+    before = {f: plan[f].to_numpy()[rows] for f in SCENARIO_PLAN_FIELDS}
+    after = dict(policy, avg_daily_demand=daily, lead_time_days=lead_time)
+
+    needs_reorder_after = plan_summary["needs_reorder"] - int(before["needs_reorder"].sum()) + \
+        int(after["needs_reorder"].sum())
+    units_change = float(after["suggested_order_qty"].sum() - before["suggested_order_qty"].sum())
+    summary = {
+        "affected_sku_locations": int(len(rows)),
+        "needs_reorder": {"before": plan_summary["needs_reorder"], "after": needs_reorder_after},
+        "suggested_order_units": {
+            "before": plan_summary["suggested_order_units"],
+            "after": round(plan_summary["suggested_order_units"] + units_change, 2),
+            "change": round(units_change, 2)
+        }
+    }
+    result = {"dataset_id": dataset_id, "overrides": overrides, "summary": summary,
+              "items": _plan_items(plan, rows, before, after)}
+
+    projection = state["projection"]
+    if projection is not None:
+        shifts = [(_order_mask(projection, o, skus), o["days"])
+                  for o, skus in zip(overrides, selected_skus) if o["type"] == "lead_time"]
+        summary["projection"], result["projection"] = _project_scenario(
+            projection, plan["sku"].to_numpy()[rows], daily - inputs["avg_daily_demand"], shifts)
+
+    summary["items_truncated"] = len(rows) > SCENARIO_MAX_ITEMS
+    summary["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+def dataset_projection_timeline(dataset_id, skus):
+    """
+    Week-by-week projected balances of a few SKUs of a cached dataset, or None when
+    the dataset is not (or no longer) cached.
+    """
+    state = _datasets.get(dataset_id)
+    if state is None:
+        return None
+    if state["projection"] is None:
+        raise ScenarioError("This dataset has no inventory projection")
+    skus = list(dict.fromkeys(s for s in map(canonical_sku, skus) if s))
+    if not skus:
+        raise ScenarioError("Name at least one SKU")
+    if len(skus) > PROJECTION_TIMELINE_MAX_SKUS:
+        raise ScenarioError(f"At most {PROJECTION_TIMELINE_MAX_SKUS} SKUs per request",
+                            {"requested": len(skus)})
+    return {"dataset_id": dataset_id, **projection_timeline(state["projection"], skus)}
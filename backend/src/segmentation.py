@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from src.planning import encode_sku_indexes
+from src.forecasting import build_demand_matrix
+
+# Cumulative revenue share up to which SKUs are class A, then B; the rest are C
+ABC_THRESHOLDS = {"A": 0.80, "B": 0.95}
+
+# Coefficient of variation of per-period demand up to which SKUs are class X, then Y; the rest are Z
+XYZ_THRESHOLDS = {"X": 0.5, "Y": 1.0}
+
+# Demand variability is measured on monthly totals, whatever the sales history's granularity
+XYZ_PERIOD = "M"
+
+def item_prices(item_master):
+    """
+    Price per SKU from the item master (first price given), falling back to cost.
+    """
+    items = pd.DataFrame.from_records(item_master or [], columns=["sku", "price", "cost"])
+    if items.empty:
+        return pd.Series(dtype=float)
+    prices = items["price"].astype(float).fillna(items["cost"].astype(float))
+    return prices.groupby(items["sku"]).first().dropna()
+
+def abc_classes(values):
+    """
+    ABC class per SKU from its share of the total: SKUs are sorted by value and
+    assigned by the cumulative share of the SKUs ranked above them, so the SKU that
+    crosses a threshold still belongs to the higher class.
+    """
+    order = np.argsort(-values, kind="stable")
+    total = values.sum()
+    share_before = np.empty(len(values))
+    if total > 0:
+        share_before[order] = (np.cumsum(values[order]) - values[order]) / total
+    else:
+        share_before[:] = 1.0
+    return np.select(
+        [share_before < ABC_THRESHOLDS["A"], share_before < ABC_THRESHOLDS["B"]], ["A", "B"], "C"
+    ), share_before
+
+def xyz_classes(matrix):
+    """
+    XYZ class per SKU from the coefficient of variation of its per-period demand.
+    SKUs without positive mean demand are Z.
+    """
+    mean = matrix.mean(axis=1)
+    std = matrix.std(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cv = np.where(mean > 0, std / mean, np.inf)
+    return np.select([cv <= XYZ_THRESHOLDS["X"], cv <= XYZ_THRESHOLDS["Y"]], ["X", "Y"], "Z"), cv
+
+def segment_skus(extracted_data):
+    """
+    ABC/XYZ segmentation of the SKU portfolio. Revenue comes from the sales history,
+    or quantity x item master price where a sale has no revenue; if there is no
+    revenue information at all, SKUs are ranked by quantity. Item master SKUs
+    without sales are CZ.
+    Returns parallel 'skus' and 'codes' lists (e.g. "AX") plus class summaries,
+    or None without a sales history.
+    """
+    sales_records = extracted_data.get("sales_history")
+    if not sales_records:
+        return None
+    sales = pd.DataFrame.from_records(sales_records, columns=["sku", "time_period", "quantity", "revenue"])
+    sku_dictionary = extracted_data.get("sku_dictionary")
+
+    matrix, skus, _ = build_demand_matrix(sales, sku_dictionary, frequency=XYZ_PERIOD)
+    if matrix.size == 0:
+        return None
+
+    # Revenue per sale, filling gaps from the item master price
+    revenue = sales["revenue"].to_numpy(dtype=float)
+    missing = np.isnan(revenue)
+    prices = item_prices(extracted_data.get("item_master"))
+    if missing.any() and not prices.empty:
+        revenue[missing] = sales["quantity"].to_numpy(dtype=float)[missing] * \
+            sales["sku"][missing].map(prices).to_numpy(dtype=float)
+    basis = "revenue" if not np.isnan(revenue).all() else "quantity"
+    if basis == "quantity":
+        revenue = sales["quantity"].to_numpy(dtype=float)
+
+    (sku_index,), labels = encode_sku_indexes([sales], sku_dictionary)
+    valid = ~np.isnan(revenue)
+    totals_by_label = np.bincount(sku_index[valid], weights=revenue[valid], minlength=len(labels))
+    totals = totals_by_label[pd.Index(labels).get_indexer(skus)]
+
+    # Item master SKUs that never sold join the portfolio with no value or demand
+    master_skus = pd.Index(pd.unique(pd.Series([r.get("sku") for r in extracted_data.get("item_master") or []],
+                                               dtype=object).dropna()))
+    unsold = master_skus.difference(pd.Index(skus), sort=False)
+    all_skus = np.concatenate([skus, unsold.to_numpy(dtype=object)])
+    all_totals = np.concatenate([totals, np.zeros(len(unsold))])
+
+    abc, _ = abc_classes(all_totals)
+    xyz = np.concatenate([xyz_classes(matrix)[0], np.full(len(unsold), "Z")])
+    codes = np.char.add(abc.astype("U1"), xyz.astype("U1"))
+
+    total_value = all_totals.sum()
+    summary = {"basis": basis, "skus": int(len(all_skus)), "classes": {}, "matrix": {}}
+    for cls in ["A", "B", "C"]:
+        in_class = abc == cls
+        summary["classes"][cls] = {
+            "skus": int(in_class.sum()),
+            "value_share": round(float(all_totals[in_class].sum() / total_value), 4) if total_value > 0 else 0.0
+        }
+    for cls in ["X", "Y", "Z"]:
+        summary["classes"][cls] = {"skus": int((xyz == cls).sum())}
+    cells, counts = np.unique(codes, return_counts=True)
+    summary["matrix"] = {str(c): int(n) for c, n in zip(cells, counts)}
+
+    return {
+        "summary": summary,
+        "skus": all_skus.tolist(),
+        "codes": codes.tolist()
+    }
@@ -0,0 +1,132 @@
+import hashlib
+import logging
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+logger = logging.getLogger(__name__)
+
+# XML namespaces used by the xlsx package parts we read
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# Matches shared-string cells (t="s") and captures the shared string index
+SHARED_STRING_CELL = re.compile(rb'<(?:\w+:)?c\b[^>]*\bt="s"[^>]*>\s*<(?:\w+:)?v>(\d+)</(?:\w+:)?v>')
+
+def get_sheet_parts(zf):
+    """
+    Map each sheet name to its worksheet XML part inside the xlsx package.
+    """
+    workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+
+    targets = {}
+    for rel in rels.iter(f"{PKG_REL_NS}Relationship"):
+        target = rel.get("Target", "")
+        if target.startswith("/"):
+            target = target.lstrip("/")
+        else:
+            target = posixpath.normpath(posixpath.join("xl", target))
+        targets[rel.get("Id")] = target
+
+    sheet_parts = {}
+    for sheet in workbook.iter(f"{MAIN_NS}sheet"):
+        part = targets.get(sheet.get(f"{REL_NS}id"))
+        if part:
+            sheet_parts[sheet.get("name")] = part
+    return sheet_parts
+
+def read_shared_strings(zf):
+    """
+    Return the workbook's shared string table as a list of plain strings.
+    """
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return []
+
+    strings = []
+    with zf.open("xl/sharedStrings.xml") as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag == f"{MAIN_NS}si":
+                strings.append("".join(t.text or "" for t in elem.iter(f"{MAIN_NS}t")))
+                elem.clear()
+    return strings
+
+def compute_sheet_fingerprints(file):
+    """
+    Compute a content fingerprint for every sheet of an xlsx workbook.
+    The fingerprint covers the sheet name, the sheet's XML part, the shared strings
+    it references and the workbook styles (number formats decide which cells are dates).
+    Returns an empty dict for files that are not xlsx packages.
+    """
+    try:
+        file.seek(0)
+        with zipfile.ZipFile(file) as zf:
+            sheet_parts = get_sheet_parts(zf)
+            shared_strings = read_shared_strings(zf)
+            styles_hash = hashlib.sha1(
+                zf.read("xl/styles.xml") if "xl/styles.xml" in zf.namelist() else b""
+            ).digest()
+
+            fingerprints = {}
+            for sheet_name, part in sheet_parts.items():
+                sheet_xml = zf.read(part)
+                digest = hashlib.sha1()
+                digest.update(sheet_name.encode("utf-8") + b"\x00")
+                digest.update(styles_hash)
+                digest.update(sheet_xml)
+
+                used_indices = sorted({int(i) for i in SHARED_STRING_CELL.findall(sheet_xml)})
+                for idx in used_indices:
+                    value = shared_strings[idx] if idx < len(shared_strings) else ""
+                    digest.update(f"{idx}\x00{value}\x00".encode("utf-8"))
+
+                fingerprints[sheet_name] = digest.hexdigest()
+            return fingerprints
+    except Exception as e:
+        logger.warning("Could not fingerprint workbook sheets: %s", e)
+        return {}
+    finally:
+        file.seek(0)
+
+# Matches the used range declared at the top of a worksheet part, e.g. <dimension ref="A1:M5001"/>
+DIMENSION_REF = re.compile(rb'<(?:\w+:)?dimension\b[^>]*\bref="([A-Z]*)(\d*):?([A-Z]*)(\d*)"')
+
+# Bytes decompressed from the start of each worksheet part to find its dimension
+DIMENSION_SCAN_BYTES = 4096
+
+def _column_number(letters):
+    number = 0
+    for letter in letters.decode("ascii"):
+        number = number * 26 + ord(letter) - ord("A") + 1
+    return number
+
+def read_sheet_dimensions(file):
+    """
+    Rows and columns of every sheet of an xlsx workbook from the declared used range,
+    without loading the sheets. Sheets that declare no range get None, with the
+    uncompressed size of their XML part as 'xml_bytes'. Returns an empty dict for
+    files that are not xlsx packages.
+    """
+    try:
+        file.seek(0)
+        with zipfile.ZipFile(file) as zf:
+            dimensions = {}
+            for sheet_name, part in get_sheet_parts(zf).items():
+                with zf.open(part) as f:
+                    match = DIMENSION_REF.search(f.read(DIMENSION_SCAN_BYTES))
+                entry = {"rows": None, "columns": None, "xml_bytes": zf.getinfo(part).file_size}
+                if match:
+                    first_col, first_row, last_col, last_row = match.groups()
+                    last_col, last_row = last_col or first_col, last_row or first_row
+                    entry["rows"] = int(last_row) - int(first_row or 1) + 1 if last_row else None
+                    entry["columns"] = _column_number(last_col) - _column_number(first_col or b"A") + 1 \
+                        if last_col else None
+                dimensions[sheet_name] = entry
+            return dimensions
+    except Exception as e:
+        logger.warning("Could not read workbook sheet dimensions: %s", e)
+        return {}
+    finally:
+        file.seek(0)
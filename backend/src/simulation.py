@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+from src.planning import PLANNING_LEAD_TIME_DAYS, estimate_period_days
+from src.forecasting import build_demand_matrix
+
+# Scenarios drawn per SKU, and the default target service level (cycle service level)
+SIMULATION_SCENARIOS = 1000
+SIMULATION_SERVICE_LEVEL = 0.95
+
+# Fixed seed so repeated uploads give the same results; pass seed=None for fresh draws
+SIMULATION_SEED = 42
+
+# SKUs per simulated block. Each block has its own random stream spawned from the seed,
+# so results don't depend on how blocks are spread over the workers.
+SIMULATION_BLOCK_ROWS = 2000
+
+# Above this many SKUs the blocks run on the worker pool
+SIMULATION_PARALLEL_MIN_SKUS = 20000
+
+def _column(values):
+    return values.astype(np.float32)[:, None]
+
+def simulate_block(daily_mean, daily_std, lead_mean, lead_std, position, scenarios, service_level, seed_sequence):
+    """
+    Draw lead times and the demand over each lead time for a block of SKUs as
+    (SKUs x scenarios) matrices. Lead times are normal, at least one day; demand over
+    a lead time of L days is normal with mean L * daily_mean and variance
+    L * daily_std^2, floored at zero.
+    Returns (stockout probability at the current position, required safety stock,
+    mean lead time demand) per SKU.
+    """
+    rng = np.random.default_rng(seed_sequence)
+    shape = (len(daily_mean), scenarios)
+
+    # float32 halves the memory and time of the scenario matrices
+    lead_time = rng.standard_normal(shape, dtype=np.float32)
+    lead_time *= _column(lead_std)
+    lead_time += _column(lead_mean)
+    np.maximum(lead_time, 1.0, out=lead_time)
+
+    demand = rng.standard_normal(shape, dtype=np.float32)
+    demand *= np.sqrt(lead_time)
+    demand *= _column(daily_std)
+    demand += lead_time * _column(daily_mean)
+    np.maximum(demand, 0.0, out=demand)
+
+    stockout_probability = (demand > _column(position)).mean(axis=1)
+    expected = demand.mean(axis=1, dtype=np.float64)
+
+    # The service-level quantile is one order statistic, found by partitioning
+    k = min(int(np.ceil(service_level * scenarios)) - 1, scenarios - 1)
+    quantile = np.partition(demand, k, axis=1)[:, k]
+    required = np.maximum(quantile - expected, 0.0)
+    return stockout_probability, required, expected
+
+def _simulate_block_worker(args):
+    return simulate_block(*args)
+
+def run_simulation(daily_mean, daily_std, lead_mean, lead_std, position,
+                   scenarios=SIMULATION_SCENARIOS, service_level=SIMULATION_SERVICE_LEVEL, seed=SIMULATION_SEED):
+    """
+    Simulate all SKUs block by block, on the worker pool for large catalogs.
+    Results are reproducible for a given seed.
+    """
+    starts = list(range(0, len(daily_mean), SIMULATION_BLOCK_ROWS))
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    blocks = [
+        (daily_mean[i:i + SIMULATION_BLOCK_ROWS], daily_std[i:i + SIMULATION_BLOCK_ROWS],
+         lead_mean[i:i + SIMULATION_BLOCK_ROWS], lead_std[i:i + SIMULATION_BLOCK_ROWS],
+         position[i:i + SIMULATION_BLOCK_ROWS], scenarios, service_level, block_seed)
+        for i, block_seed in zip(starts, seeds)
+    ]
+
+    if len(daily_mean) >= SIMULATION_PARALLEL_MIN_SKUS:
+        # Imported here so the batch module's pool is only created when it is needed;
+        # inside a pool worker the blocks run serially
+        from src.batch import map_on_pool
+        results = map_on_pool(_simulate_block_worker, blocks)
+    else:
+        results = [simulate_block(*block) for block in blocks]
+
+    return tuple(np.concatenate([r[i] for r in results]) for i in range(3))
+
+def _sum_by_label(records, labels, only_open=False):
+    frame = pd.DataFrame.from_records(records or [], columns=["sku", "quantity", "has_arrived"])
+    if only_open:
+        frame = frame[frame["has_arrived"].ne(True)]
+    index = labels.get_indexer(frame["sku"])
+    known = index >= 0
+    return np.bincount(index[known], weights=frame["quantity"].to_numpy(dtype=float)[known], minlength=len(labels))
+
+def simulate_service_levels(extracted_data, lead_times=None, scenarios=SIMULATION_SCENARIOS,
+                            service_level=SIMULATION_SERVICE_LEVEL, seed=SIMULATION_SEED):
+    """
+    Estimate per SKU the probability of a stockout before a replenishment arrives,
+    given its current inventory position (on hand plus open orders), and the safety
+    stock needed to reach service_level. Demand comes from the sales history and
+    lead times from the PO history (see src.lead_times), or the planning default.
+    Returns a result with per-SKU items and a summary, or None without sales.
+    """
+    if not extracted_data.get("sales_history"):
+        return None
+    matrix, skus, period_dates = build_demand_matrix(extracted_data["sales_history"],
+                                                     extracted_data.get("sku_dictionary"))
+    if matrix.size == 0:
+        return None
+
+    period_days = estimate_period_days(pd.Series(period_dates))
+    daily_mean = matrix.mean(axis=1) / period_days
+    daily_std = matrix.std(axis=1) / np.sqrt(period_days)
+
+    labels = pd.Index(skus)
+    lead_mean = np.full(len(labels), float(PLANNING_LEAD_TIME_DAYS))
+    lead_std = np.zeros(len(labels))
+    if lead_times is not None and not lead_times.empty:
+        found = lead_times.index.get_indexer(labels)
+        known = found >= 0
+        lead_mean[known] = lead_times["lead_time_days"].to_numpy(dtype=float)[found[known]]
+        lead_std[known] = lead_times["lead_time_std_days"].to_numpy(dtype=float)[found[known]]
+
+    position = _sum_by_label(extracted_data.get("inventory_on_hand"), labels) + \
+        _sum_by_label(extracted_data.get("purchase_orders"), labels, only_open=True)
+
+    stockout_probability, required, expected = run_simulation(
+        daily_mean, daily_std, lead_mean, lead_std, position, scenarios, service_level, seed
+    )
+
+    items = pd.DataFrame({
+        "sku": skus,
+        "inventory_position": position,
+        "lead_time_days": lead_mean,
+        "expected_lead_time_demand": expected,
+        "stockout_probability": stockout_probability,
+        "required_safety_stock": required
+    }).round(4).to_dict(orient="records")
+
+    return {
+        "summary": {
+            "skus": int(len(skus)),
+            "scenarios": scenarios,
+            "service_level": service_level,
+            "seed": seed,
+            "at_risk": int((stockout_probability > 1 - service_level).sum()),
+            "required_safety_stock_units": round(float(required.sum()), 2)
+        },
+        "items": items
+    }
@@ -0,0 +1,304 @@
+import base64
+import math
+
+import numpy as np
+import pandas as pd
+
+# HyperLogLog registers are 2^precision bytes; the standard error is 1.04 / sqrt(2^precision)
+SKETCH_HLL_PRECISION = 12
+
+# Quantile estimates are within this relative error of a true quantile value
+SKETCH_RELATIVE_ACCURACY = 0.01
+
+# Bins kept per quantile store; the lowest bins are collapsed beyond this
+SKETCH_MAX_BINS = 2048
+
+# Quantiles reported in the summary
+SKETCH_QUANTILES = [0.5, 0.9, 0.95, 0.99]
+
+# Heavy hitters reported, and counters kept to find them (more counters, smaller error)
+SKETCH_TOP_K = 20
+SKETCH_HEAVY_HITTER_CAPACITY = 200
+
+def _hash_values(values):
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+class HyperLogLog:
+    """
+    Distinct count estimate in fixed memory. Each value's 64-bit hash picks a
+    register with its top bits and the register keeps the longest run of leading
+    zeros seen in the rest. Sketches merge by taking the register-wise maximum.
+    """
+    def __init__(self, precision=SKETCH_HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = registers if registers is not None else np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values):
+        if len(values) == 0:
+            return
+        hashes = _hash_values(values)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.precision)) - 1)
+        # Bit length from the float exponent; exact because rest has fewer than 53 bits
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = (64 - self.precision - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int((self.registers == 0).sum())
+        # Linear counting is more accurate for small cardinalities
+        if estimate <= 2.5 * m and zeros > 0:
+            estimate = m * math.log(m / zeros)
+        return estimate
+
+    def standard_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def to_dict(self):
+        return {"precision": self.precision, "registers": base64.b64encode(self.registers.tobytes()).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, data):
+        registers = np.frombuffer(base64.b64decode(data["registers"]), dtype=np.uint8).copy()
+        return cls(data["precision"], registers)
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative error guarantees (DDSketch): values are
+    counted in logarithmic bins, so any quantile is returned within
+    SKETCH_RELATIVE_ACCURACY of the true value. Positive and negative values have
+    separate bin stores; sketches merge by adding bin counts.
+    """
+    def __init__(self, relative_accuracy=SKETCH_RELATIVE_ACCURACY, max_bins=SKETCH_MAX_BINS):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.bins = {"positive": (np.empty(0, np.int64), np.empty(0)),
+                     "negative": (np.empty(0, np.int64), np.empty(0))}
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _add_bins(self, store, index, counts):
+        keys, values = self.bins[store]
+        keys, inverse = np.unique(np.concatenate([keys, index]), return_inverse=True)
+        values = np.bincount(inverse, weights=np.concatenate([values, counts]), minlength=len(keys))
+        # Collapse the bins nearest zero, where the relative error matters least
+        if len(keys) > self.max_bins:
+            cut = len(keys) - self.max_bins
+            values[cut] += values[:cut].sum()
+            keys, values = keys[cut:], values[cut:]
+        self.bins[store] = (keys, values)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.zeros += int((values == 0).sum())
+        for store, selected in (("positive", values[values > 0]), ("negative", -values[values < 0])):
+            if len(selected):
+                index, counts = np.unique(np.ceil(np.log(selected) / math.log(self.gamma)).astype(np.int64),
+                                          return_counts=True)
+                self._add_bins(store, index, counts.astype(float))
+
+    def merge(self, other):
+        for store in self.bins:
+            self._add_bins(store, *other.bins[store])
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantiles(self, qs):
+        """
+        Estimated value at each quantile, or None for an empty sketch.
+        """
+        if self.count == 0:
+            return [None for _ in qs]
+        negative_keys, negative_counts = self.bins["negative"]
+        positive_keys, positive_counts = self.bins["positive"]
+        # Bins in value order: most negative first, then zero, then positive
+        representative = 2 * self.gamma ** np.concatenate([negative_keys[::-1], positive_keys]) / (self.gamma + 1)
+        values = np.concatenate([-representative[:len(negative_keys)], [0.0], representative[len(negative_keys):]])
+        counts = np.concatenate([negative_counts[::-1], [self.zeros], positive_counts])
+        cumulative = np.cumsum(counts)
+        results = []
+        for q in qs:
+            position = int(np.searchsorted(cumulative, q * (self.count - 1), side="right"))
+            results.append(float(np.clip(values[min(position, len(values) - 1)], self.min, self.max)))
+        return results
+
+    def to_dict(self):
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "count": self.count, "sum": self.total, "zeros": self.zeros,
+            "min": self.min if self.count else None, "max": self.max if self.count else None,
+            "bins": {store: [keys.tolist(), values.tolist()] for store, (keys, values) in self.bins.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["relative_accuracy"])
+        sketch.count, sketch.total, sketch.zeros = data["count"], data["sum"], data["zeros"]
+        if sketch.count:
+            sketch.min, sketch.max = data["min"], data["max"]
+        for store, (keys, values) in data["bins"].items():
+            sketch.bins[store] = (np.asarray(keys, dtype=np.int64), np.asarray(values, dtype=float))
+        return sketch
+
+class HeavyHitters:
+    """
+    Weighted Misra-Gries summary of the largest keys. At most `capacity` counters are
+    kept; when there are more, the (capacity+1)-th largest count is subtracted from
+    all of them. Counts are underestimated by at most `error`, the total subtracted,
+    which is never more than the total weight / (capacity + 1).
+    """
+    def __init__(self, capacity=SKETCH_HEAVY_HITTER_CAPACITY, counts=None, error=0.0):
+        self.capacity = capacity
+        self.counts = counts if counts is not None else pd.Series(dtype=float)
+        self.error = error
+
+    def _reduce(self):
+        if len(self.counts) > self.capacity:
+            threshold = float(np.partition(self.counts.to_numpy(), -(self.capacity + 1))[-(self.capacity + 1)])
+            self.counts = self.counts[self.counts > threshold] - threshold
+            self.error += threshold
+
+    def update(self, keys, weights):
+        weights = np.asarray(weights, dtype=float)
+        valid = pd.notna(keys) & (weights > 0)
+        if not valid.any():
+            return
+        totals = pd.Series(weights[valid]).groupby(np.asarray(keys, dtype=object)[valid]).sum()
+        self.counts = self.counts.add(totals, fill_value=0.0)
+        self._reduce()
+
+    def merge(self, other):
+        self.counts = self.counts.add(other.counts, fill_value=0.0)
+        self.error += other.error
+        self._reduce()
+
+    def top(self, k=SKETCH_TOP_K):
+        return self.counts.nlargest(k)
+
+    def to_dict(self):
+        return {"capacity": self.capacity, "error": self.error,
+                "keys": self.counts.index.tolist(), "counts": self.counts.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        counts = pd.Series(data["counts"], index=pd.Index(data["keys"], dtype=object), dtype=float)
+        return cls(data["capacity"], counts, data["error"])
+
+class SalesSketch:
+    """
+    Bounded-memory approximate statistics of a sales history, updated one chunk of
+    records at a time: distinct SKUs and channels, quantity and revenue quantiles,
+    and the top SKUs by units sold. Sketches of different sheets, files or workers
+    merge into the sketch of their combined data (duplicated rows count twice,
+    except in the distinct counts).
+    """
+    def __init__(self):
+        self.rows = 0
+        self.skus = HyperLogLog()
+        self.channels = HyperLogLog()
+        self.quantity = QuantileSketch()
+        self.revenue = QuantileSketch()
+        self.top_skus = HeavyHitters()
+
+    def update(self, records):
+        frame = pd.DataFrame.from_records(records, columns=["sku", "channel", "quantity", "revenue"])
+        if frame.empty:
+            return
+        self.rows += len(frame)
+        self.skus.update(frame["sku"].dropna().to_numpy())
+        self.channels.update(frame["channel"].dropna().to_numpy())
+        quantity = frame["quantity"].to_numpy(dtype=float)
+        self.quantity.update(quantity)
+        self.revenue.update(frame["revenue"].to_numpy(dtype=float))
+        self.top_skus.update(frame["sku"].to_numpy(dtype=object), np.nan_to_num(quantity))
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.skus.merge(other.skus)
+        self.channels.merge(other.channels)
+        self.quantity.merge(other.quantity)
+        self.revenue.merge(other.revenue)
+        self.top_skus.merge(other.top_skus)
+        return self
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "skus": self.skus.to_dict(),
+            "channels": self.channels.to_dict(),
+            "quantity": self.quantity.to_dict(),
+            "revenue": self.revenue.to_dict(),
+            "top_skus": self.top_skus.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls()
+        sketch.rows = data["rows"]
+        sketch.skus = HyperLogLog.from_dict(data["skus"])
+        sketch.channels = HyperLogLog.from_dict(data["channels"])
+        sketch.quantity = QuantileSketch.from_dict(data["quantity"])
+        sketch.revenue = QuantileSketch.from_dict(data["revenue"])
+        sketch.top_skus = HeavyHitters.from_dict(data["top_skus"])
+        return sketch
+
+    def summary(self):
+        """
+        JSON-ready approximate summary with the error bound of each estimate.
+        """
+        def distinct(hll):
+            return {"estimate": int(round(hll.estimate())), "standard_error": round(hll.standard_error(), 4)}
+
+        def distribution(sketch):
+            if sketch.count == 0:
+                return None
+            values = sketch.quantiles(SKETCH_QUANTILES)
+            result = {"count": sketch.count, "sum": round(sketch.total, 2),
+                      "min": sketch.min, "max": sketch.max, "relative_error": sketch.relative_accuracy}
+            result.update({f"p{int(round(q * 100))}": round(v, 4) for q, v in zip(SKETCH_QUANTILES, values)})
+            return result
+
+        top = self.top_skus.top()
+        return {
+            "rows": self.rows,
+            "distinct_skus": distinct(self.skus),
+            "distinct_channels": distinct(self.channels),
+            "quantity": distribution(self.quantity),
+            "revenue": distribution(self.revenue),
+            "top_skus": {
+                "max_undercount": round(self.top_skus.error, 2),
+                "items": [{"sku": sku, "quantity": round(float(count), 2)} for sku, count in top.items()]
+            }
+        }
+
+def merge_sales_sketches(sketches):
+    """
+    Merge serialized sales sketches (SalesSketch.to_dict) into one, or None if there are none.
+    """
+    merged = None
+    for data in sketches:
+        if not data:
+            continue
+        sketch = SalesSketch.from_dict(data)
+        merged = sketch if merged is None else merged.merge(sketch)
+    return merged
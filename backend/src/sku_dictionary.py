@@ -0,0 +1,103 @@
+import os
+import re
+import sys
+import pandas as pd
+
+# How raw SKU values are canonicalized before they are compared or encoded:
+# - case: "upper", "lower" or "preserve"
+# - strip_float_suffix: "12345.0" (a numeric cell read as float) becomes "12345"
+# - leading_zeros: "keep" leaves them; "strip" drops leading zeros from all-digit SKUs,
+#   so "012345" and 12345 are the same item (Excel drops them from numeric cells).
+#   Stripping merges SKUs that really differ only by leading zeros, so it is opt-in.
+SKU_CANONICAL_RULES = {
+    "case": "upper",
+    "strip_float_suffix": True,
+    "leading_zeros": "strip" if os.environ.get("INVENTORY_SKU_STRIP_LEADING_ZEROS", "0") == "1" else "keep"
+}
+
+_FLOAT_SUFFIX = re.compile(r'^(\d+)\.0+$')
+_LEADING_ZEROS = re.compile(r'^0+(?=\d)')
+_WHITESPACE = re.compile(r'\s+')
+
+def canonical_sku(value, rules=SKU_CANONICAL_RULES):
+    """
+    Canonical string form of a SKU value, or None if it is empty.
+    The result is interned so records with the same SKU share one string.
+    """
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    sku = _WHITESPACE.sub(" ", str(value).strip())
+    if not sku:
+        return None
+
+    if rules.get("strip_float_suffix"):
+        sku = _FLOAT_SUFFIX.sub(r'\1', sku)
+    if rules.get("leading_zeros") == "strip" and sku.isdigit():
+        sku = _LEADING_ZEROS.sub("", sku)
+
+    case = rules.get("case")
+    if case == "upper":
+        sku = sku.upper()
+    elif case == "lower":
+        sku = sku.lower()
+
+    return sys.intern(sku)
+
+def canonicalize_sku_series(values, rules=SKU_CANONICAL_RULES):
+    """
+    Canonicalize a column of SKU values, working out each distinct value only once.
+    """
+    mapping = {value: canonical_sku(value, rules) for value in pd.unique(values)}
+    return values.map(mapping)
+
+class SkuDictionary:
+    """
+    Per-upload dictionary of canonical SKUs. Each distinct SKU gets a small integer
+    code, in order of first appearance, that is shared by every category.
+    """
+    def __init__(self, rules=SKU_CANONICAL_RULES):
+        self.rules = rules
+        self.codes = {}
+        self.skus = []
+
+    def __len__(self):
+        return len(self.skus)
+
+    def encode(self, value):
+        """
+        Code for a SKU value (canonicalized first), or None for an empty value.
+        """
+        # Canonical SKUs (the common case after extraction) map to themselves
+        code = self.codes.get(value) if isinstance(value, str) else None
+        if code is not None:
+            return code
+
+        sku = canonical_sku(value, self.rules)
+        if sku is None:
+            return None
+        code = self.codes.get(sku)
+        if code is None:
+            code = len(self.skus)
+            self.codes[sku] = code
+            self.skus.append(sku)
+        return code
+
+    def decode(self, code):
+        return self.skus[code]
+
+def build_sku_dictionary(extracted_data, categories, rules=SKU_CANONICAL_RULES):
+    """
+    Build the SKU dictionary for one upload from the records' 'sku' values, which
+    extraction has already canonicalized. Records are left as they are (they share the
+    interned SKU strings); stages that join on SKUs look a whole 'sku' column up in the
+    dictionary at once (see src.planning.encode_sku_indexes).
+    Returns the SkuDictionary.
+    """
+    dictionary = SkuDictionary(rules)
+    for category in categories:
+        for record in extracted_data.get(category) or []:
+            dictionary.encode(record.get("sku"))
+    return dictionary
@@ -0,0 +1,203 @@
+import re
+import time
+from collections import Counter, defaultdict
+from fuzzywuzzy import fuzz
+from src.metrics import FUZZY_COMPARISONS
+
+# Categories whose SKUs are reconciled against the item master
+RECONCILE_CATEGORIES = ["inventory_on_hand", "purchase_orders", "sales_history"]
+
+# Minimum score for a proposed match
+RECONCILE_MIN_SCORE = 80
+
+# Score given to suffix variants ("AB100" vs "AB100RED") whose ratio is lower
+SUFFIX_VARIANT_SCORE = 90
+
+# Shortest stem used as a blocking key, and how many trailing characters of a
+# SKU may be a size or color suffix
+BLOCK_STEM_MIN_LENGTH = 4
+BLOCK_SUFFIX_MAX_LENGTH = 4
+
+# Blocks larger than this are too unselective to use (e.g. a prefix every SKU shares)
+RECONCILE_MAX_BLOCK_SIZE = 500
+
+# At most this many candidates per SKU are scored, those sharing the most blocking keys
+RECONCILE_MAX_CANDIDATES = 10
+
+# Alternative matches reported besides the best one
+RECONCILE_MAX_ALTERNATIVES = 2
+
+_NON_ALNUM = re.compile(r'[^0-9A-Z]')
+_SEPARATORS = re.compile(r'[\s\-_\.\/]+')
+
+def normalize_sku_key(sku):
+    """
+    Upper-case SKU with separators and punctuation removed ("ab-100" -> "AB100").
+    """
+    return _NON_ALNUM.sub("", str(sku).upper())
+
+def sku_base_key(sku):
+    """
+    Normalized SKU without its last separated part, which is often a size or color
+    suffix ("AB-100-RED" -> "AB100"). None if the SKU has a single part.
+    """
+    parts = [p for p in _SEPARATORS.split(str(sku).upper()) if p]
+    if len(parts) < 2:
+        return None
+    return normalize_sku_key("".join(parts[:-1]))
+
+def sku_blocking_keys(key, base_key=None):
+    """
+    Blocking keys of a normalized SKU. Two SKUs share a key when they are:
+    - within one edit: the SKU and its one-character deletion signatures
+    - suffix variants: stems with up to BLOCK_SUFFIX_MAX_LENGTH trailing characters removed
+    - the same base once a separated suffix is dropped ("AB-100-RED" -> "AB100")
+    """
+    keys = {("del", key)}
+    if len(key) > BLOCK_STEM_MIN_LENGTH:
+        keys.update(("del", key[:i] + key[i + 1:]) for i in range(len(key)))
+    for cut in range(0, BLOCK_SUFFIX_MAX_LENGTH + 1):
+        if len(key) - cut < BLOCK_STEM_MIN_LENGTH:
+            break
+        keys.add(("stem", key[:len(key) - cut]))
+    if base_key:
+        keys.add(("stem", base_key))
+    return keys
+
+def score_sku_pair(key, master_key, key_chars, master_chars, min_score):
+    """
+    Score two normalized SKUs, given their character counts. Returns (score, match_type),
+    or (0, None) when length or shared characters rule out reaching min_score, in which
+    case fuzz.ratio isn't run.
+    """
+    if key == master_key:
+        return 100, "normalized"
+
+    total_len = len(key) + len(master_key)
+    shorter, longer = sorted((key, master_key), key=len)
+    if len(shorter) >= BLOCK_STEM_MIN_LENGTH and longer.startswith(shorter):
+        if round(200 * len(shorter) / total_len) < SUFFIX_VARIANT_SCORE:
+            return SUFFIX_VARIANT_SCORE, "suffix_variant"
+
+    if round(200 * len(shorter) / total_len) < min_score:
+        return 0, None
+    if round(200 * sum((key_chars & master_chars).values()) / total_len) < min_score:
+        return 0, None
+    return fuzz.ratio(key, master_key), "fuzzy"
+
+class MasterSkuIndex:
+    """
+    Blocking index over the item master SKUs: normalized key lookups plus an
+    inverted index from blocking key to master SKUs.
+    """
+    def __init__(self, master_skus):
+        self.by_key = defaultdict(list)
+        self.keys = {}
+        self.chars = {}
+        blocks = defaultdict(list)
+        for sku in master_skus:
+            key = normalize_sku_key(sku)
+            if not key:
+                continue
+            self.by_key[key].append(sku)
+            if len(self.by_key[key]) > 1:
+                continue
+            self.keys[sku] = key
+            for block_key in sku_blocking_keys(key, sku_base_key(sku)):
+                blocks[block_key].append(sku)
+        self.blocks = {k: v for k, v in blocks.items() if len(v) <= RECONCILE_MAX_BLOCK_SIZE}
+
+    def candidates(self, key, base_key):
+        """
+        Master SKUs sharing the most blocking keys with a normalized SKU.
+        """
+        shared = Counter()
+        for block_key in sku_blocking_keys(key, base_key):
+            shared.update(self.blocks.get(block_key, ()))
+        return [sku for sku, _ in shared.most_common(RECONCILE_MAX_CANDIDATES)]
+
+    def key_chars(self, sku):
+        """
+        Character counts of a master SKU's normalized key, built on first use.
+        """
+        chars = self.chars.get(sku)
+        if chars is None:
+            chars = self.chars[sku] = Counter(self.keys[sku])
+        return chars
+
+def collect_category_skus(extracted_data, categories):
+    """
+    Distinct SKUs per category, in order of first appearance.
+    """
+    skus = {}
+    for category in categories:
+        seen = dict.fromkeys(r["sku"] for r in extracted_data.get(category) or [] if r.get("sku"))
+        skus[category] = list(seen)
+    return skus
+
+def reconcile_skus(extracted_data, min_score=RECONCILE_MIN_SCORE):
+    """
+    Propose item master SKUs for transactional SKUs that don't exactly match one.
+    Candidate pairs are limited to SKUs sharing a blocking key and scored within
+    those blocks, so the cost grows with the number of SKUs rather than their square.
+    Returns a report with the proposed matches, the SKUs left unmatched and stats.
+    """
+    start = time.perf_counter()
+    master_skus = collect_category_skus(extracted_data, ["item_master"])["item_master"]
+    master_set = set(master_skus)
+    index = MasterSkuIndex(master_skus)
+
+    # Each unmatched SKU is reconciled once, whichever categories it appears in
+    unmatched = defaultdict(list)
+    for category, skus in collect_category_skus(extracted_data, RECONCILE_CATEGORIES).items():
+        for sku in skus:
+            if sku not in master_set:
+                unmatched[sku].append(category)
+
+    matches = []
+    unresolved = []
+    candidate_pairs = 0
+    for sku, categories in unmatched.items():
+        key = normalize_sku_key(sku)
+        scored = []
+        if key in index.by_key:
+            scored = [(100, "normalized", m) for m in index.by_key[key]]
+        elif key:
+            candidates = index.candidates(key, sku_base_key(sku))
+            candidate_pairs += len(candidates)
+            key_chars = Counter(key)
+            for master_sku in candidates:
+                score, match_type = score_sku_pair(key, index.keys[master_sku], key_chars,
+                                                   index.key_chars(master_sku), min_score)
+                if score >= min_score:
+                    scored.append((score, match_type, master_sku))
+
+        if not scored:
+            unresolved.append({"sku": sku, "categories": categories})
+            continue
+
+        scored.sort(key=lambda s: -s[0])
+        best_score, match_type, best_sku = scored[0]
+        matches.append({
+            "sku": sku,
+            "categories": categories,
+            "proposed_sku": best_sku,
+            "score": best_score,
+            "match_type": match_type,
+            "alternatives": [
+                {"sku": m, "score": s} for s, _, m in scored[1:RECONCILE_MAX_ALTERNATIVES + 1]
+            ]
+        })
+
+    FUZZY_COMPARISONS.inc(candidate_pairs, kind="sku")
+    return {
+        "matches": matches,
+        "unmatched": unresolved,
+        "stats": {
+            "master_skus": len(master_skus),
+            "unmatched_skus": len(unmatched),
+            "proposed": len(matches),
+            "candidate_pairs": candidate_pairs,
+            "elapsed": round(time.perf_counter() - start, 4)
+        }
+    }
@@ -0,0 +1,44 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the backend the way app.py does ("from src...")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import batch, extraction_plans
+from src.extract_data import SHEET_RESULT_CACHE
+from src.match_cache import MATCH_CACHE
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    """
+    Keep extraction plans out of the source tree and start every test with empty caches.
+    """
+    monkeypatch.setattr(extraction_plans, "EXTRACTION_PLAN_DIR", str(tmp_path / "extraction_plans"))
+    MATCH_CACHE.clear()
+    SHEET_RESULT_CACHE.clear()
+    yield
+
+class RecordingExecutor:
+    """
+    Runs map() in this process and records the items of every call.
+    """
+    def __init__(self):
+        self.calls = []
+
+    def map(self, func, items):
+        items = list(items)
+        self.calls.append(items)
+        return map(func, items)
+
+@pytest.fixture
+def batch_pool(monkeypatch):
+    """
+    Stand in for the shared batch pool, so tests can see when work fans out to it
+    and compare its results with a serial run without starting processes.
+    """
+    executor = RecordingExecutor()
+    monkeypatch.setattr(batch, "_in_worker", False)
+    monkeypatch.setattr(batch, "get_batch_executor", lambda: executor)
+    return executor
@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from src.admission import AdmissionController, estimate_request_cost, sum_request_costs
+from src.errors import AdmissionRejectedError
+
+def _cost(memory_bytes=0, cpu_seconds=1.0):
+    return {"memory_bytes": memory_bytes, "cpu_seconds": cpu_seconds}
+
+def test_request_cost_is_capped_at_the_memory_budget():
+    estimate = {"kind": "csv", "file_bytes": 1000, "estimated_bytes": 25000}
+    cost = estimate_request_cost(estimate, memory_budget=10000)
+    assert cost["memory_bytes"] == 10000
+    assert sum_request_costs([cost, cost])["memory_bytes"] == 20000
+
+def test_full_queue_is_rejected_with_retry_after():
+    controller = AdmissionController(cpu_slots=1, max_queue=0)
+    controller.acquire(_cost(cpu_seconds=5))
+    with pytest.raises(AdmissionRejectedError) as excinfo:
+        controller.acquire(_cost())
+    assert excinfo.value.details["reason"] == "queue_full"
+    assert excinfo.value.details["retry_after"] == 5
+
+def test_memory_budget_limits_uploads_in_flight():
+    controller = AdmissionController(cpu_slots=4, memory_budget=100, max_queue=1, max_wait=0.05, cache_bytes=0)
+    controller.acquire(_cost(memory_bytes=80))
+    with pytest.raises(AdmissionRejectedError) as excinfo:
+        controller.acquire(_cost(memory_bytes=30))
+    assert excinfo.value.details["reason"] == "timeout"
+    assert controller.stats()["queue_depth"] == 0
+
+def test_cache_memory_is_taken_off_the_budget():
+    controller = AdmissionController(cpu_slots=4, memory_budget=100, max_queue=0, cache_bytes=50)
+    controller.acquire(_cost(memory_bytes=30))
+    with pytest.raises(AdmissionRejectedError):
+        controller.acquire(_cost(memory_bytes=30))
+    assert controller.stats()["cache_bytes"] == 50
+
+def test_waiting_upload_runs_after_release():
+    controller = AdmissionController(cpu_slots=1, max_queue=1, max_wait=5)
+    controller.acquire(_cost())
+    waited = []
+    waiter = threading.Thread(target=lambda: waited.append(controller.acquire(_cost())))
+    waiter.start()
+    controller.release(_cost())
+    waiter.join(5)
+    assert waited and controller.stats()["in_flight"] == 1
+
+def test_one_upload_over_the_memory_budget_still_runs_alone():
+    controller = AdmissionController(memory_budget=100)
+    assert controller.acquire(_cost(memory_bytes=500)) == 0.0
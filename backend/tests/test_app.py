@@ -0,0 +1,67 @@
+import zipfile
+from io import BytesIO
+
+import pytest
+
+import app as app_module
+from src.admission import AdmissionController
+from src.metrics import ERRORS
+
+@pytest.fixture
+def client():
+    app_module.app.config["TESTING"] = True
+    return app_module.app.test_client()
+
+def _post(client, url, files, **kwargs):
+    return client.post(url, data=files, content_type="multipart/form-data", **kwargs)
+
+def test_csv_uploads_share_the_file_size_limit(client, monkeypatch):
+    monkeypatch.setattr(app_module, "MAX_FILE_SIZE", 100)
+    body = b"SKU,Quantity\n" + b"SKU-1,5\n" * 50
+    response = _post(client, "/api/upload", {"file": (BytesIO(body), "inventory.csv")})
+    assert response.status_code == 400
+    assert response.get_json()["error_type"] == "file_too_large"
+
+def test_corrupt_zip_in_batch_is_rejected(client):
+    output = BytesIO()
+    with zipfile.ZipFile(output, "w") as archive:
+        archive.writestr("inventory.csv", b"SKU,Quantity\nA-1,5\n")
+    corrupt = output.getvalue().replace(b"A-1,5", b"A-1,6")
+    response = _post(client, "/api/upload/batch", {"files": (BytesIO(corrupt), "batch.zip")})
+    assert response.status_code == 400
+    assert response.get_json()["error_type"] == "invalid_file_type"
+
+def test_batch_uploads_go_through_admission(client, monkeypatch):
+    controller = AdmissionController(cpu_slots=1, max_queue=0)
+    controller.acquire({"memory_bytes": 0, "cpu_seconds": 5})
+    monkeypatch.setattr(app_module, "ADMISSION", controller)
+    response = _post(client, "/api/upload/batch", {"files": (BytesIO(b"SKU,Quantity\nA-1,5\n"), "inventory.csv")})
+    assert response.status_code == 429
+    assert response.get_json()["error_type"] == "server_busy"
+    assert response.headers["Retry-After"]
+
+def test_batch_admission_is_released(client, monkeypatch):
+    controller = AdmissionController(cpu_slots=1)
+    monkeypatch.setattr(app_module, "ADMISSION", controller)
+    response = _post(client, "/api/upload/batch", {"files": (BytesIO(b"SKU,Quantity\nA-1,5\n"), "inventory.csv")},
+                     headers={"X-Deadline-Seconds": "60"})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["partial"] is False
+    assert body["timing"]["admission"]["cost"]["cpu_seconds"] > 0
+    assert controller.stats()["in_flight"] == 0
+
+def _error_count(error_type):
+    return ERRORS.snapshot().get((error_type,), [0])[0]
+
+def test_error_responses_are_counted_by_type(client):
+    before = _error_count("missing_file")
+    response = _post(client, "/api/upload", {})
+    assert response.status_code == 400
+    assert _error_count("missing_file") == before + 1
+
+def test_successful_responses_are_not_counted_as_errors(client):
+    before = sum(values[0] for values in ERRORS.snapshot().values())
+    assert client.get("/api/datasets/unknown/projection?sku=A").status_code == 404
+    assert client.get("/metrics").status_code == 200
+    assert sum(values[0] for values in ERRORS.snapshot().values()) == before + 1
@@ -0,0 +1,45 @@
+import time
+import zipfile
+from io import BytesIO
+
+import pytest
+
+from src.batch import expand_batch_uploads, read_zip_entry, run_batch
+from src.errors import FileSizeLimitError, InvalidFileTypeError
+
+CSV = b"SKU,Quantity\nA-1,5\nB-2,7\n"
+
+def _zip(entries, compression=zipfile.ZIP_STORED):
+    output = BytesIO()
+    with zipfile.ZipFile(output, "w", compression) as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return output.getvalue()
+
+def test_zip_archives_are_unpacked():
+    files, skipped = expand_batch_uploads([("batch.zip", _zip({"inventory.csv": CSV, "notes.txt": b"x"}))], 1024)
+    assert files == [("batch.zip/inventory.csv", CSV)]
+    assert skipped == [{"filename": "batch.zip/notes.txt", "reason": "unsupported file type"}]
+
+def test_corrupt_zip_entry_is_invalid_file():
+    archive = _zip({"inventory.csv": CSV})
+    corrupt = archive.replace(b"A-1,5", b"A-1,6")
+    with pytest.raises(InvalidFileTypeError):
+        expand_batch_uploads([("batch.zip", corrupt)], 1024)
+
+def test_zip_entry_size_is_checked_while_reading():
+    archive = zipfile.ZipFile(BytesIO(_zip({"inventory.csv": CSV * 100}, zipfile.ZIP_DEFLATED)))
+    info = archive.infolist()[0]
+    with pytest.raises(FileSizeLimitError):
+        read_zip_entry(archive, info, len(CSV))
+    assert read_zip_entry(archive, info, len(CSV) * 100) == CSV * 100
+
+def test_run_batch_processes_files_in_workers():
+    results, report = run_batch([("inventory.csv", CSV)], concurrency=1)
+    assert report["files"] == 1 and report["failed"] == 0
+    assert [r["sku"] for r in results[0]["extracted_data"]["inventory_on_hand"]] == ["A-1", "B-2"]
+
+def test_files_not_started_by_the_deadline_are_skipped():
+    results, report = run_batch([("a.csv", CSV), ("b.csv", CSV)], deadline=time.monotonic() - 1)
+    assert [r["error_type"] for r in results] == ["deadline_exceeded", "deadline_exceeded"]
+    assert report["failed"] == 2
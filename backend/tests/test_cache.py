@@ -0,0 +1,15 @@
+from src.cache import LRUCache, approximate_records_bytes
+
+def test_record_size_grows_with_records():
+    records = [{"sku": f"SKU-{i}", "quantity": float(i)} for i in range(1000)]
+    small, large = approximate_records_bytes(records[:100]), approximate_records_bytes(records)
+    assert 100 * 100 < small < large
+    assert large > 9 * small
+
+def test_cache_evicts_by_approximate_bytes():
+    records = [{"sku": f"SKU-{i}", "quantity": float(i)} for i in range(1000)]
+    cache = LRUCache(int(approximate_records_bytes(records) * 1.5), size_fn=approximate_records_bytes)
+    cache.put("a", records)
+    cache.put("b", records)
+    assert cache.get("a") is None
+    assert cache.get("b") is records
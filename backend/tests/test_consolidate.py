@@ -0,0 +1,39 @@
+from io import BytesIO
+
+import pandas as pd
+
+import app as app_module
+from src import consolidate
+from src.consolidate import consolidate_extractions, consolidation_file, write_consolidation
+
+def _sources():
+    return [
+        ("a.xlsx", {"inventory_on_hand": [{"sku": "A", "quantity": 5}, {"sku": "B", "quantity": 2}]}),
+        ("b.xlsx", {"inventory_on_hand": [{"sku": "A", "quantity": 5, "location": "a.xlsx"}]})
+    ]
+
+def test_streamed_consolidation_matches_inline(tmp_path):
+    inline, inline_stats = consolidate_extractions(_sources(), ["inventory_on_hand"])
+    consolidation_id, _, stats = write_consolidation(_sources(), ["inventory_on_hand"], root=str(tmp_path))
+    written = pd.read_csv(consolidation_file(consolidation_id, "inventory_on_hand", root=str(tmp_path)))
+    assert written["sku"].tolist() == [r["sku"] for r in inline["inventory_on_hand"]] == ["A", "B"]
+    assert stats["inventory_on_hand"]["duplicates_removed"] == inline_stats["inventory_on_hand"]["duplicates_removed"] == 1
+    assert "path" not in stats["inventory_on_hand"]
+
+def test_consolidation_file_rejects_unknown_ids(tmp_path):
+    assert consolidation_file("../etc", "inventory_on_hand", root=str(tmp_path)) is None
+    assert consolidation_file("0" * 32, "passwords", root=str(tmp_path)) is None
+
+def test_large_batch_consolidation_is_downloaded(tmp_path, monkeypatch):
+    monkeypatch.setattr(consolidate, "CONSOLIDATION_DIR", str(tmp_path))
+    monkeypatch.setattr(app_module, "CONSOLIDATION_MAX_RESPONSE_ROWS", 0)
+    client = app_module.app.test_client()
+    body = b"SKU,Quantity on Hand,Warehouse\nA-1,5,East\nA-2,7,East\n"
+    response = client.post("/api/upload/batch?consolidate=1", content_type="multipart/form-data",
+                           data={"files": [(BytesIO(body), "one.csv"), (BytesIO(body), "two.csv")]})
+    payload = response.get_json()
+    assert "inventory_on_hand" not in payload["consolidated_data"]
+    url = payload["consolidation"]["inventory_on_hand"]["download_url"]
+    download = client.get(url)
+    assert download.status_code == 200
+    assert download.data.decode().count("A-1") == 1
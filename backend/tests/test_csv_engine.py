@@ -0,0 +1,39 @@
+from io import BytesIO
+
+from src.csv_engine import extract_csv_data, iter_csv_records, sniff_csv_format
+
+def _csv(rows, delimiter=","):
+    lines = [delimiter.join(["SKU", "Quantity", "Location"])]
+    lines += [delimiter.join([f"SKU-{i:04d}", str(i + 1), "East"]) for i in range(rows)]
+    return BytesIO(("\n".join(lines) + "\n").encode("utf-8"))
+
+def test_sniffs_semicolon_delimiter():
+    assert sniff_csv_format(_csv(5, ";"))["delimiter"] == ";"
+
+def test_records_are_extracted_in_chunks():
+    stats = {}
+    chunks = list(iter_csv_records(_csv(25), filename="inventory.csv", chunk_rows=10, stats=stats))
+    assert [len(records) for _, records in chunks] == [10, 10, 5]
+    assert {category for category, _ in chunks} == {"inventory_on_hand"}
+    assert stats["rows_read"] == 25 and stats["chunks"] == 3
+
+def test_sample_stride_continues_across_chunks():
+    chunks = iter_csv_records(_csv(25), filename="inventory.csv", chunk_rows=10, sample_every=4)
+    skus = [r["sku"] for _, records in chunks for r in records]
+    assert skus == [f"SKU-{i:04d}" for i in range(0, 25, 4)]
+
+def test_extract_csv_data_matches_extract_data_shape():
+    extracted = extract_csv_data(_csv(3), filename="inventory.csv")
+    assert set(extracted) >= {"inventory_on_hand", "sales_history", "purchase_orders", "item_master"}
+    assert [r["quantity"] for r in extracted["inventory_on_hand"]] == [1, 2, 3]
+
+def test_header_below_multiline_quoted_preamble_cell():
+    preamble = 'Stock report\n"Exported by the\nwarehouse system\non Monday",draft\n\n'
+    data = preamble + "SKU,Quantity,Location\n" + "".join(f"SKU-{i:04d},{i + 1},East\n" for i in range(25))
+    stats = {}
+    chunks = list(iter_csv_records(BytesIO(data.encode("utf-8")), filename="inventory.csv",
+                                   chunk_rows=10, stats=stats))
+    records = [r for _, records in chunks for r in records]
+    assert stats["header_row"] == 3
+    assert [r["sku"] for r in records] == [f"SKU-{i:04d}" for i in range(25)]
+    assert [r["quantity"] for r in records[:3]] == [1, 2, 3]
@@ -0,0 +1,53 @@
+import os
+import time
+from io import BytesIO
+
+import pandas as pd
+
+from src import deadline
+from src import extract_data as extract_data_module
+from src.extract_data import extract_data
+from src.deadline import deadline_passed, make_deadline, remaining_seconds, request_deadline
+
+def test_no_deadline_when_disabled():
+    assert make_deadline(0) is None
+    assert request_deadline(None, default_seconds=0) is None
+    assert not deadline_passed(None)
+    assert remaining_seconds(None) is None
+
+def test_header_can_only_shorten_the_default():
+    assert request_deadline("5", started=100.0, default_seconds=60) == 105.0
+    assert request_deadline("600", started=100.0, default_seconds=60) == 160.0
+    assert request_deadline("soon", started=100.0, default_seconds=60) == 160.0
+    assert request_deadline("5", started=100.0, default_seconds=0) == 105.0
+
+def test_passed_deadline_has_no_time_left():
+    deadline = time.monotonic() - 1
+    assert deadline_passed(deadline)
+    assert remaining_seconds(deadline) == 0.0
+
+def test_default_deadline_is_off():
+    assert deadline.UPLOAD_DEADLINE_SECONDS == 0 or "INVENTORY_UPLOAD_DEADLINE_SECONDS" in os.environ
+    assert request_deadline(None) is None or "INVENTORY_UPLOAD_DEADLINE_SECONDS" in os.environ
+
+def test_extraction_takes_valuable_sheets_first_and_skips_the_rest(monkeypatch):
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+        pd.DataFrame({"Comment": ["see attached"] * 50}).to_excel(writer, sheet_name="Notes", index=False)
+        pd.DataFrame({"SKU": [f"A-{i}" for i in range(500)], "Date": "2025-01-06",
+                      "Quantity Sold": 1}).to_excel(writer, sheet_name="Sales History", index=False)
+        pd.DataFrame({"SKU": ["A-1"], "Quantity on Hand": [5]}).to_excel(writer, sheet_name="Inventory", index=False)
+    output.seek(0)
+
+    # The deadline passes once the first sheet has started
+    checks = []
+    def passed_after_first_sheet(value):
+        checks.append(value)
+        return len(checks) > 1
+    monkeypatch.setattr(extract_data_module, "deadline_passed", passed_after_first_sheet)
+
+    result = extract_data(output, deadline=time.monotonic() + 60)
+    assert len(result["inventory_on_hand"]) == 1
+    assert result["sales_history"] == []
+    assert result["skipped_sheets"] == ["Sales History", "Notes"]
+    assert result["partial"] is True
@@ -0,0 +1,58 @@
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from src.extract_data import apply_sheet_plan, extract_data, get_field_mappings, identify_header_row
+
+INVENTORY_FIELDS = ["sku", "quantity"]
+
+def _workbook(frames, **to_excel_options):
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+        for name, frame in frames.items():
+            frame.to_excel(writer, sheet_name=name, index=False, **to_excel_options)
+    output.seek(0)
+    return output
+
+def test_header_row_with_blank_leading_column():
+    top = pd.DataFrame([
+        [np.nan, "Stock report", np.nan],
+        [np.nan, "SKU", "Quantity"],
+        [np.nan, "A-1", 5],
+        [np.nan, "B-2", 7]
+    ])
+    assert identify_header_row(top, INVENTORY_FIELDS, get_field_mappings("generic")) == 1
+
+def test_header_row_with_unlabeled_numeric_column():
+    top = pd.DataFrame([
+        [np.nan, "SKU", "Qty"],
+        [1, "A-1", 5],
+        [2, "B-2", 7]
+    ])
+    assert identify_header_row(top, INVENTORY_FIELDS, get_field_mappings("generic")) == 0
+
+def test_header_row_with_year_columns():
+    # Mostly numeric header cells (a pivot by year) must not rule the row out
+    top = pd.DataFrame([
+        ["Units by year", np.nan, np.nan, np.nan, np.nan, np.nan],
+        ["SKU", "Quantity", 2022, 2023, 2024, 2025],
+        ["A-1", 10, 1, 2, 3, 4]
+    ])
+    assert identify_header_row(top, INVENTORY_FIELDS, get_field_mappings("generic")) == 1
+
+def test_extracts_table_starting_in_column_b():
+    table = pd.DataFrame({"SKU": ["A-1", "B-2", "C-3"], "Quantity": [5, 6, 7], "Location": ["East", "West", "East"]})
+    for startrow in (0, 2):
+        extracted = extract_data(_workbook({"Inventory": table}, startcol=1, startrow=startrow), "generic")
+        records = extracted["inventory_on_hand"]
+        assert [r["sku"] for r in records] == ["A-1", "B-2", "C-3"]
+        assert [r["quantity"] for r in records] == [5, 6, 7]
+
+def test_workbook_sheets_are_stride_sampled():
+    frame = pd.DataFrame({"SKU": [f"A-{i}" for i in range(30)], "Quantity": range(30)})
+    result = extract_data(_workbook({"Inventory": frame}), sheet_sample_every={"Inventory": 10})
+    assert [r["sku"] for r in result["inventory_on_hand"]] == ["A-0", "A-10", "A-20"]
+
+def test_unclassified_sheet_plan_gives_no_records():
+    assert apply_sheet_plan(None, "Notes", {"category": None}) == (None, [])
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from src import batch, forecasting, planning
+from src.forecasting import build_demand_matrix, forecast_block, forecast_demand, forecast_matrix
+
+def _assert_same_forecasts(actual, expected):
+    assert np.array_equal(actual[0], expected[0]) and np.array_equal(actual[2], expected[2])
+    for model, metrics in expected[1].items():
+        for metric, values in metrics.items():
+            assert np.array_equal(actual[1][model][metric], values)
+
+def test_large_catalogs_are_forecast_on_the_pool(monkeypatch, batch_pool):
+    monkeypatch.setattr(forecasting, "FORECAST_PARALLEL_MIN_SKUS", 5)
+    monkeypatch.setattr(forecasting, "FORECAST_BLOCK_ROWS", 2)
+    matrix = np.arange(30, dtype=float).reshape(5, 6) % 7
+
+    forecast_matrix(matrix[:4], 2, None)
+    assert batch_pool.calls == []
+
+    pooled = forecast_matrix(matrix, 2, None)
+    assert [len(blocks) for blocks in batch_pool.calls] == [3]
+    _assert_same_forecasts(pooled, forecast_block(matrix, 2, None))
+
+def test_pool_workers_forecast_serially(monkeypatch, batch_pool):
+    monkeypatch.setattr(forecasting, "FORECAST_PARALLEL_MIN_SKUS", 2)
+    monkeypatch.setattr(batch, "_in_worker", True)
+    matrix = np.arange(30, dtype=float).reshape(5, 6) % 7
+    forecasts = forecast_matrix(matrix, 2, None)
+    assert batch_pool.calls == []
+    _assert_same_forecasts(forecasts, forecast_block(matrix, 2, None))
+
+def _sale(sku, day, quantity=1):
+    return {"sku": sku, "time_period": day, "quantity": quantity}
+
+def test_demand_is_bucketed_into_calendar_weeks():
+    sales = [_sale("A", "2025-01-06", 3), _sale("A", "2025-01-08", 2), _sale("B", "2025-02-03", 5),
+             _sale("A", "not a date", 9)]
+    matrix, skus, period_dates = build_demand_matrix(sales)
+    assert skus.tolist() == ["A", "B"]
+    assert matrix.tolist() == [[5, 0, 0, 0, 0], [0, 0, 0, 0, 5]]
+    assert str(period_dates[1])[:10] == "2025-01-13"
+
+def test_monthly_data_gets_monthly_buckets():
+    sales = [_sale("A", f"2024-{month:02d}-28", month) for month in (1, 2, 4)]
+    matrix, _, period_dates = build_demand_matrix(sales)
+    assert matrix.tolist() == [[1, 2, 0, 4]]
+    assert [str(d)[:10] for d in period_dates] == ["2024-01-01", "2024-02-01", "2024-03-01", "2024-04-01"]
+
+def test_stray_old_dates_are_dropped(monkeypatch):
+    monkeypatch.setattr(planning, "DEMAND_MAX_PERIODS", 3)
+    sales = [_sale("A", "1999-01-04"), _sale("A", "2025-01-06"), _sale("A", "2025-01-07"),
+             _sale("A", "2025-01-20", 2)]
+    matrix, _, _ = build_demand_matrix(sales)
+    assert matrix.tolist() == [[2, 0, 2]]
+
+def test_sparse_sales_still_forecast_demand():
+    # One sale every ten days: most days have no sales, but every week or two does
+    sales = [_sale("A", str(day.date()), 7) for day in pd.date_range("2024-01-01", periods=40, freq="10D")]
+    forecast = forecast_demand({"sales_history": sales})
+    assert forecast["summary"]["period_days"] == 7
+    assert all(value > 0 for value in forecast["items"][0]["forecast"])
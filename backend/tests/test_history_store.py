@@ -0,0 +1,18 @@
+import sqlite3
+
+import pytest
+
+from src import history_store
+from src.errors import HistoryStoreError
+from src.history_store import append_snapshot, list_snapshots, query_sku_history
+
+def test_snapshots_round_trip(tmp_path):
+    db_path = str(tmp_path / "history.db")
+    append_snapshot(db_path, {"inventory_on_hand": [{"sku": "A", "quantity": 5}]}, source="a.xlsx")
+    assert [s["source"] for s in list_snapshots(db_path)] == ["a.xlsx"]
+    assert query_sku_history(db_path, "A")[0]["quantity"] == 5
+
+def test_list_snapshots_wraps_database_errors(monkeypatch):
+    monkeypatch.setattr(history_store, "connect_history_store", lambda db_path: sqlite3.connect(":memory:"))
+    with pytest.raises(HistoryStoreError, match="Could not list snapshots"):
+        list_snapshots("history.db")
@@ -0,0 +1,26 @@
+from src.lead_times import analyze_lead_times
+
+def _order(sku, vendor, order_date, arrival_date):
+    return {"sku": sku, "vendor": vendor, "order_date": order_date, "arrival_date": arrival_date,
+            "has_arrived": True}
+
+def test_planning_vendor_is_the_most_recent_by_order_date():
+    # Rows arrive newest first; the SKU moved from Acme to Globex in March
+    orders = [
+        _order("A", "Globex", "2025-03-01", "2025-03-05"),
+        _order("A", "Acme", "2025-01-01", "2025-01-21"),
+        _order("A", "Acme", "2025-02-01", "2025-02-21"),
+    ] + [_order("B", "Globex", f"2025-0{m}-01", f"2025-0{m}-05") for m in range(1, 4)]
+    _, planning = analyze_lead_times({"purchase_orders": orders}, as_of="2025-06-01")
+    assert planning.loc["A", "vendor"] == "Globex"
+    assert planning.loc["A", "source"] == "sku"
+
+def test_sku_without_history_uses_its_latest_vendor():
+    orders = [
+        _order("A", "Globex", "2025-03-01", "2025-03-05"),
+        _order("A", "Acme", "2025-01-01", "2025-01-21"),
+    ] + [_order("B", vendor, f"2025-0{m}-01", f"2025-0{m}-{d}")
+         for vendor, d in [("Acme", "21"), ("Globex", "05")] for m in range(1, 4)]
+    _, planning = analyze_lead_times({"purchase_orders": orders}, as_of="2025-06-01")
+    assert planning.loc["A", "source"] == "vendor"
+    assert planning.loc["A", "lead_time_days"] == 4.0
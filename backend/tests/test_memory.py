@@ -0,0 +1,42 @@
+from src.memory import MemoryTracker, plan_memory_mode
+
+def test_large_workbooks_are_stride_sampled_per_sheet():
+    estimate = {"kind": "xlsx", "estimated_bytes": 10 ** 12,
+                "sheets": {"Sales": {"rows": 100000, "columns": 10}, "Items": {"rows": 500, "columns": 10}}}
+    mode = plan_memory_mode(estimate, budget=30000 * 10 * 300)
+    assert mode["mode"] == "stride_sample"
+    assert mode["sheet_sample_every"]["Items"] == 1
+    assert mode["sheet_sample_every"]["Sales"] * mode["max_rows"] >= 100000
+    assert mode["sampled_estimated_bytes"] <= mode["budget_bytes"]
+
+def test_stages_report_labelled_process_rss_delta():
+    tracker = MemoryTracker(trace=False)
+    block = bytearray(64 * 1024 * 1024)
+    block[::4096] = b"x" * len(block[::4096])
+    tracker.checkpoint("allocate")
+    del block
+    stages = tracker.report()["stages"]
+    assert set(stages["allocate"]) == {"process_rss_mb", "process_rss_delta_mb"}
+    if stages["allocate"]["process_rss_delta_mb"] is not None:
+        assert stages["allocate"]["process_rss_delta_mb"] >= 32
+
+def test_traced_peak_is_reset_per_stage():
+    tracker = MemoryTracker(trace=True)
+    block = bytearray(32 * 1024 * 1024)
+    del block
+    tracker.checkpoint("allocate")
+    tracker.checkpoint("idle")
+    stages = tracker.report()["stages"]
+    assert stages["allocate"]["traced_peak_mb"] >= 32
+    assert stages["idle"]["traced_peak_mb"] < 8
+
+def test_overlapping_requests_omit_stage_figures():
+    first = MemoryTracker(trace=False)
+    second = MemoryTracker(trace=False)
+    first.checkpoint("extract")
+    second.checkpoint("extract")
+    assert first.report()["stages_omitted"] == "concurrent_requests"
+    assert second.report()["stages"] == {}
+    alone = MemoryTracker(trace=False)
+    alone.checkpoint("extract")
+    assert "extract" in alone.report()["stages"]
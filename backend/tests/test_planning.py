@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from src.forecasting import build_demand_matrix
+from src.planning import compute_replenishment_plan, compute_demand, split_across_locations
+
+def _sales(sku, location, quantity, days=10):
+    return [{"sku": sku, "location": location, "time_period": f"2025-01-{d + 1:02d}", "quantity": quantity}
+            for d in range(days)]
+
+def test_unlocated_po_counts_toward_located_stock():
+    extracted = {
+        "inventory_on_hand": [{"sku": "A", "location": "East", "quantity": 5}],
+        "sales_history": _sales("A", "East", 1),
+        "purchase_orders": [{"sku": "A", "quantity": 100, "has_arrived": False}]
+    }
+    plan, summary = compute_replenishment_plan(extracted)
+    row = plan.iloc[0]
+    assert row["on_order"] == 100
+    assert row["suggested_order_qty"] == 0
+    assert summary["unlocated_orders"] == 1
+
+def test_unlocated_po_split_by_demand_share():
+    extracted = {
+        "inventory_on_hand": [{"sku": "A", "location": "East", "quantity": 0},
+                              {"sku": "A", "location": "West", "quantity": 0}],
+        "sales_history": _sales("A", "East", 30) + _sales("A", "West", 10),
+        "purchase_orders": [{"sku": "A", "quantity": 80, "has_arrived": False},
+                            {"sku": "A", "location": "West", "quantity": 5, "has_arrived": False}]
+    }
+    plan, _ = compute_replenishment_plan(extracted)
+    on_order = dict(zip(plan["location"], plan["on_order"]))
+    assert on_order == pytest.approx({"East": 60, "West": 25})
+
+def test_split_across_locations_without_demand_is_even():
+    share = split_across_locations(np.array([0, 0, 1]), np.array([0]), np.array([10.0]), np.zeros(3), 2)
+    assert share.tolist() == [5.0, 5.0, 0.0]
+
+def test_compute_demand_counts_periods_without_sales():
+    # Weeks of 2025-01-06, 01-13 (no sales at all) and 01-20
+    slots = np.array([0, 1, 1])
+    periods = np.array(["2025-01-06", "2025-01-07", "2025-01-20"], dtype=object)
+    daily, std, period_days = compute_demand(slots, periods, np.array([21.0, 7.0, 14.0]), 2)
+    assert period_days == 7.0
+    assert daily == pytest.approx([1.0, 1.0])
+    assert std[1] == pytest.approx(np.std([7.0, 0.0, 14.0]) / np.sqrt(7.0))
+
+def test_compute_demand_ignores_unparseable_and_respelled_periods():
+    slots = np.zeros(4, dtype=np.int64)
+    periods = np.array(["2025-01-06", "2025-01-06 00:00", "not a date", "2025-01-13"], dtype=object)
+    daily, _, period_days = compute_demand(slots, periods, np.array([7.0, 7.0, 700.0, 14.0]), 1)
+    assert period_days == 7.0
+    assert daily == pytest.approx([2.0])
+
+def test_planning_and_forecasting_share_demand_buckets():
+    sales = _sales("A", None, 3) + [{"sku": "A", "time_period": "2025-02-10", "quantity": 6}]
+    matrix, _, period_dates = build_demand_matrix(sales)
+    daily, _, period_days = compute_demand(np.zeros(len(sales), dtype=np.int64),
+                                           np.array([s["time_period"] for s in sales], dtype=object),
+                                           np.array([s["quantity"] for s in sales], dtype=float), 1)
+    assert daily[0] * period_days == pytest.approx(matrix.mean())
+
+def test_arrived_orders_are_not_on_order():
+    extracted = {
+        "inventory_on_hand": [{"sku": "A", "quantity": 5}],
+        "sales_history": _sales("A", None, 10),
+        "purchase_orders": [{"sku": "A", "quantity": 100, "has_arrived": True}]
+    }
+    plan, summary = compute_replenishment_plan(extracted)
+    assert plan.iloc[0]["on_order"] == 0
+    assert plan.iloc[0]["suggested_order_qty"] > 0
+    assert not summary["by_location"]
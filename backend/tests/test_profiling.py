@@ -0,0 +1,22 @@
+import os
+
+from src import profiling
+from src.profiling import profile_id, should_profile
+
+def test_profile_header_is_ignored_by_default():
+    assert not profiling.PROFILE_ALLOW_HEADER
+    assert not should_profile("1", sample_rate=0)
+
+def test_profile_header_when_allowed(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_ALLOW_HEADER", True)
+    assert should_profile("true", sample_rate=0)
+    assert not should_profile("0", sample_rate=0)
+
+def test_profile_dir_is_outside_the_source_tree():
+    if "INVENTORY_PROFILE_DIR" not in os.environ:
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(profiling.__file__)))
+        assert os.path.isabs(profiling.PROFILE_DIR)
+        assert not profiling.PROFILE_DIR.startswith(backend_dir)
+
+def test_profile_id_is_file_safe():
+    assert profile_id("../../etc/passwd") == "_.._etc_passwd"
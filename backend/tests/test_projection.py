@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+import app as app_module
+from src.projection import projection_inputs, project_inventory, projection_timeline
+from src.scenarios import register_dataset
+
+def _forecast(rates, period_days=7.0, first_period="2025-03-03"):
+    return {
+        "summary": {"period_days": period_days, "forecast_periods": [first_period]},
+        "items": [{"sku": sku, "forecast": [rate]} for sku, rate in rates.items()]
+    }
+
+def _extracted(orders):
+    return {
+        "inventory_on_hand": [{"sku": "A", "quantity": 100}],
+        "purchase_orders": orders
+    }
+
+def test_projection_starts_where_the_forecast_starts():
+    inputs = projection_inputs(_extracted([]), _forecast({"A": 10}))
+    assert inputs["start"].strftime("%Y-%m-%d") == "2025-03-03"
+
+def test_stale_overdue_orders_are_left_out():
+    orders = [{"sku": "A", "quantity": 500, "arrival_date": "2022-01-01", "has_arrived": None},
+              {"sku": "A", "quantity": 20, "arrival_date": "2025-02-20", "has_arrived": False}]
+    projection = project_inventory(_extracted(orders), inputs=projection_inputs(_extracted(orders), _forecast({"A": 10})))
+    summary = projection["summary"]
+    assert summary["stale_orders"] == 1
+    assert summary["stale_order_units"] == 500
+    # The recently overdue order still lands in the first week
+    assert projection["items"][0]["min_balance"] == pytest.approx(120 - 52 * 10)
+    assert "timeline" not in projection["items"][0]
+
+def test_projection_timeline_for_selected_skus():
+    orders = [{"sku": "A", "quantity": 30, "arrival_date": "2025-03-17", "has_arrived": False}]
+    inputs = projection_inputs(_extracted(orders), _forecast({"A": 10, "B": 5}))
+    timeline = projection_timeline(inputs, ["A", "missing"])
+    assert timeline["week_starts"][:2] == ["2025-03-03", "2025-03-10"]
+    assert timeline["items"][0]["sku"] == "A"
+    assert timeline["items"][0]["timeline"][:3] == [90, 80, 100]
+    assert timeline["not_found"] == ["missing"]
+
+def _plan():
+    return pd.DataFrame({"sku": ["A"], "location": [None], "avg_daily_demand": [10 / 7]})
+
+def test_projection_timeline_endpoint():
+    extracted = _extracted([])
+    extracted["sales_history"] = [{"sku": "A", "time_period": "2025-03-01", "quantity": 10}]
+    inputs = projection_inputs(extracted, _forecast({"A": 10}))
+    extracted["inventory_projection"] = project_inventory(extracted, inputs=inputs)
+    dataset_id = register_dataset(extracted, {"plan": _plan(), "plan_summary": {}, "projection_inputs": inputs})
+
+    client = app_module.app.test_client()
+    response = client.get(f"/api/datasets/{dataset_id}/projection?sku=A")
+    assert response.status_code == 200
+    assert response.get_json()["items"][0]["timeline"][0] == 90
+    assert client.get(f"/api/datasets/{dataset_id}/projection").status_code == 400
+    assert client.get("/api/datasets/unknown/projection?sku=A").status_code == 404
@@ -0,0 +1,29 @@
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+import app as app_module
+from src.scenarios import _state_size, build_dependency_graph
+
+def _upload(client, url):
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+        pd.DataFrame({"SKU": ["A-1"], "Quantity on Hand": [5]}).to_excel(writer, sheet_name="Inventory", index=False)
+        pd.DataFrame({"SKU": ["A-1", "A-1"], "Date": ["2025-01-06", "2025-01-13"],
+                      "Quantity Sold": [5, 3]}).to_excel(writer, sheet_name="Sales History", index=False)
+    output.seek(0)
+    return client.post(url, data={"file": (output, "stock.xlsx")}, content_type="multipart/form-data")
+
+def test_state_size_counts_the_dependency_graph():
+    extracted = {"item_master": [{"sku": f"SKU-{i}", "category": f"C{i % 10}"} for i in range(5000)]}
+    state = {"plan": pd.DataFrame({"sku": ["A"]}), "graph": build_dependency_graph(extracted), "projection": None}
+    assert _state_size(state) > state["plan"].memory_usage(index=False).sum() + 5000 * np.dtype(object).itemsize
+
+def test_datasets_are_only_kept_on_request():
+    client = app_module.app.test_client()
+    assert _upload(client, "/api/upload").get_json()["dataset_id"] is None
+    dataset_id = _upload(client, "/api/upload?keep_dataset=1").get_json()["dataset_id"]
+    assert dataset_id
+    response = client.post(f"/api/datasets/{dataset_id}/scenarios", json={"type": "demand", "percent": 10})
+    assert response.status_code == 200
@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+
+from src.segmentation import abc_classes, segment_skus, xyz_classes
+
+def test_abc_keeps_threshold_crossing_sku_in_higher_class():
+    classes, _ = abc_classes(np.array([70.0, 20.0, 6.0, 4.0]))
+    assert classes.tolist() == ["A", "A", "B", "C"]
+
+def test_xyz_without_demand_is_z():
+    classes, _ = xyz_classes(np.array([[5.0, 5.0, 5.0], [0.0, 0.0, 0.0], [1.0, 0.0, 5.0]]))
+    assert classes.tolist() == ["X", "Z", "Z"]
+
+def test_sparse_daily_sales_are_not_all_z():
+    # Steady demand sold a few times a month: daily buckets would make it look erratic
+    days = pd.date_range("2024-01-01", "2024-12-31", freq="9D")
+    sales = [{"sku": "A", "time_period": str(day.date()), "quantity": 10, "revenue": 100} for day in days]
+    segments = segment_skus({"sales_history": sales})
+    assert segments["codes"] == ["AX"]
@@ -0,0 +1,34 @@
+import numpy as np
+
+from src import batch, simulation
+from src.simulation import run_simulation
+
+def _inputs(skus):
+    return (np.full(skus, 10.0), np.full(skus, 3.0), np.full(skus, 14.0), np.full(skus, 2.0), np.full(skus, 150.0))
+
+def test_results_are_reproducible_per_block_size(monkeypatch):
+    monkeypatch.setattr(simulation, "SIMULATION_BLOCK_ROWS", 2)
+    first = run_simulation(*_inputs(6), scenarios=200)
+    second = run_simulation(*_inputs(6), scenarios=200)
+    assert all(np.array_equal(a, b) for a, b in zip(first, second))
+
+def test_large_catalogs_are_simulated_on_the_pool(monkeypatch, batch_pool):
+    monkeypatch.setattr(simulation, "SIMULATION_BLOCK_ROWS", 2)
+    monkeypatch.setattr(simulation, "SIMULATION_PARALLEL_MIN_SKUS", 6)
+    serial = run_simulation(*_inputs(5), scenarios=200)
+    assert batch_pool.calls == []
+
+    monkeypatch.setattr(simulation, "SIMULATION_PARALLEL_MIN_SKUS", 5)
+    pooled = run_simulation(*_inputs(5), scenarios=200)
+    assert [len(blocks) for blocks in batch_pool.calls] == [3]
+    assert all(np.array_equal(a, b) for a, b in zip(pooled, serial))
+
+def test_pool_workers_simulate_serially(monkeypatch, batch_pool):
+    monkeypatch.setattr(simulation, "SIMULATION_PARALLEL_MIN_SKUS", 2)
+    monkeypatch.setattr(simulation, "SIMULATION_BLOCK_ROWS", 2)
+    monkeypatch.setattr(batch, "_in_worker", True)
+    stockout, required, expected = run_simulation(*_inputs(5), scenarios=500)
+    assert batch_pool.calls == []
+    assert stockout.shape == required.shape == expected.shape == (5,)
+    assert np.allclose(expected, 140.0, rtol=0.05)
+    assert ((stockout > 0) & (stockout < 0.5)).all()
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from src.sketches import HeavyHitters, HyperLogLog, QuantileSketch, SalesSketch, merge_sales_sketches
+
+def test_hyperloglog_estimate_within_error():
+    sketch = HyperLogLog()
+    sketch.update([f"SKU-{i}" for i in range(20000)])
+    assert sketch.estimate() == pytest.approx(20000, rel=4 * sketch.standard_error())
+
+def test_hyperloglog_merge_counts_shared_values_once():
+    left, right = HyperLogLog(), HyperLogLog()
+    left.update([f"SKU-{i}" for i in range(5000)])
+    right.update([f"SKU-{i}" for i in range(2500, 7500)])
+    merged = HyperLogLog.from_dict(left.to_dict())
+    merged.merge(right)
+    assert merged.estimate() == pytest.approx(7500, rel=4 * merged.standard_error())
+
+def test_quantiles_within_relative_accuracy():
+    values = np.random.default_rng(0).lognormal(3, 1, 50000)
+    sketch = QuantileSketch()
+    sketch.update(values)
+    for q, estimate in zip([0.5, 0.9, 0.99], sketch.quantiles([0.5, 0.9, 0.99])):
+        assert estimate == pytest.approx(np.quantile(values, q), rel=0.03)
+
+def test_heavy_hitters_find_the_top_sku():
+    hitters = HeavyHitters(capacity=10)
+    keys = np.array(["BIG"] * 100 + [f"SKU-{i}" for i in range(500)], dtype=object)
+    hitters.update(keys, np.ones(len(keys)))
+    top = hitters.top(1)
+    assert top.index.tolist() == ["BIG"]
+    assert top["BIG"] >= 100 - hitters.error
+
+def test_merged_sales_sketches_match_one_sketch_of_all_rows():
+    records = [{"sku": f"SKU-{i % 50}", "channel": "web", "quantity": i % 7 + 1, "revenue": 10.0}
+               for i in range(1000)]
+    parts = [SalesSketch(), SalesSketch()]
+    parts[0].update(records[:400])
+    parts[1].update(records[400:])
+    whole = SalesSketch()
+    whole.update(records)
+
+    merged = merge_sales_sketches([parts[0].to_dict(), None, parts[1].to_dict()])
+    assert merged.summary() == whole.summary()
+    assert merge_sales_sketches([None]) is None
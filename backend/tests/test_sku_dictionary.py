@@ -0,0 +1,37 @@
+import pandas as pd
+
+from src.planning import encode_sku_indexes
+from src.sku_dictionary import SKU_CANONICAL_RULES, build_sku_dictionary, canonical_sku
+
+def test_leading_zeros_are_kept_by_default():
+    assert canonical_sku("012345") == "012345"
+    assert canonical_sku("012345") != canonical_sku("12345")
+
+def test_leading_zeros_can_be_stripped():
+    rules = dict(SKU_CANONICAL_RULES, leading_zeros="strip")
+    assert canonical_sku("012345", rules) == canonical_sku(12345, rules) == "12345"
+
+def test_float_cells_and_case():
+    assert canonical_sku(12345.0) == "12345"
+    assert canonical_sku("12345.0") == "12345"
+    assert canonical_sku("  ab-1 ") == "AB-1"
+    assert canonical_sku(float("nan")) is None
+
+def test_dictionary_leaves_records_untouched():
+    record = {"sku": "A-1", "quantity": 3}
+    extracted = {"inventory_on_hand": [record], "sales_history": [{"sku": "B-2"}, {"sku": "A-1"}]}
+    dictionary = build_sku_dictionary(extracted, ["inventory_on_hand", "sales_history"])
+    assert dictionary.skus == ["A-1", "B-2"]
+    assert extracted["inventory_on_hand"][0] is record
+    assert record == {"sku": "A-1", "quantity": 3}
+
+def test_encode_sku_indexes_uses_dictionary_codes():
+    frames = [pd.DataFrame({"sku": ["B-2", "A-1"]}), pd.DataFrame({"sku": ["A-1"]})]
+    (first, second), labels = encode_sku_indexes(frames, ["A-1", "B-2"])
+    assert first.tolist() == [1, 0] and second.tolist() == [0]
+    assert labels.tolist() == ["A-1", "B-2"]
+
+def test_encode_sku_indexes_falls_back_for_unknown_skus():
+    frames = [pd.DataFrame({"sku": ["C-3", "A-1", None]})]
+    (codes,), labels = encode_sku_indexes(frames, ["A-1"])
+    assert [labels[c] for c in codes[:2]] == ["C-3", "A-1"]